@@ -0,0 +1,173 @@
+"""
+Консольный запуск загрузчика без GUI
+
+Примеры:
+    python -m cli upload clip1.mp4 clip2.mp4 -p youtube tiktok -d "Описание" -t "shorts fun"
+    python -m cli enqueue clip.mp4 -p instagram
+    python -m cli upload clip.mp4 -p youtube tiktok -g brands   # всем аккаунтам группы
+    python -m cli enqueue promo.mp4 -p youtube tiktok --publish-at "2026-05-01 18:00" --priority 5
+    python -m cli accounts   # профили аккаунтов и группы
+    python -m cli run        # разобрать очередь и выйти (cron)
+    python -m cli daemon     # разбирать очередь постоянно (systemd)
+    python -m cli status
+"""
+
+import argparse
+import os
+import signal
+import sys
+import time
+from datetime import datetime
+
+from core.config import Config, ALL_ACCOUNTS
+from core.engine import create_engine, EngineEvents
+from core.job_queue import JobQueue
+from core.metrics import metrics
+from core.quota import QuotaLedger
+from core.utils import format_bytes, format_eta
+from uploaders import PLATFORMS
+
+
+class ConsoleEvents(EngineEvents):
+    def __init__(self, quiet=False):
+        self.quiet = quiet
+        self.failed = 0
+        self._progress_steps = {}
+
+    def on_log(self, text):
+        if not self.quiet:
+            print(f"[{time.strftime('%H:%M:%S')}] {text}", flush=True)
+
+    def on_upload_progress(self, job_id, platform, info):
+        # В консоль — не чаще чем раз в 10%
+        step = info["percent"] // 10
+        if self.quiet or step <= self._progress_steps.get(job_id, -1):
+            return
+        self._progress_steps[job_id] = step
+        print(f"[{time.strftime('%H:%M:%S')}] 📶 {platform.capitalize()} #{job_id}: {info['percent']}% "
+              f"({format_bytes(info['bytes_per_sec'])}/с, осталось {format_eta(info['eta'])})", flush=True)
+
+    def on_job_finished(self, job_id, result):
+        if not result.get("ok"):
+            self.failed += 1
+
+
+def publish_time(value):
+    """Время публикации из аргумента (локальное время, ISO: 2026-05-01 18:00)"""
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"не удалось разобрать время: {value}")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m cli", description="Video Uploader без GUI")
+    parser.add_argument("-q", "--quiet", action="store_true", help="не печатать лог")
+    parser.add_argument("-w", "--workers", type=int, default=None,
+                        help="число параллельных загрузок (по умолчанию из settings.json)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    for name, help_text in (("upload", "поставить видео в очередь и дождаться загрузки"),
+                            ("enqueue", "только поставить видео в очередь")):
+        cmd = sub.add_parser(name, help=help_text)
+        cmd.add_argument("videos", nargs="+", help="видеофайлы")
+        cmd.add_argument("-p", "--platforms", nargs="+", choices=PLATFORMS, required=True)
+        cmd.add_argument("-d", "--description", action="append", default=[],
+                         help="описание: одно на все видео или по одному на каждое")
+        cmd.add_argument("-t", "--tags", default="", help="теги через пробел или запятую")
+        target = cmd.add_mutually_exclusive_group()
+        target.add_argument("-a", "--accounts", nargs="+", metavar="PROFILE",
+                            help=f"профили аккаунтов ({ALL_ACCOUNTS} — все профили платформы)")
+        target.add_argument("-g", "--group", help="группа аккаунтов из account_groups")
+        cmd.add_argument("--priority", type=int, default=0, help="больше — раньше в очереди")
+        cmd.add_argument("--publish-at", type=publish_time, metavar="TIME",
+                         help="время публикации; YouTube и TikTok загружаются заранее с отложенной публикацией")
+
+    sub.add_parser("run", help="разобрать очередь и выйти")
+    sub.add_parser("daemon", help="разбирать очередь до SIGTERM/SIGINT")
+    sub.add_parser("status", help="показать состояние очереди")
+    sub.add_parser("accounts", help="показать профили аккаунтов и группы")
+    return parser
+
+
+def enqueue_videos(engine, args):
+    descriptions = args.description
+    if len(descriptions) > 1 and len(descriptions) != len(args.videos):
+        raise SystemExit("Число описаний должно быть 1 или совпадать с числом видео")
+
+    for index, video in enumerate(args.videos):
+        video = os.path.abspath(video)
+        if not os.path.exists(video):
+            raise SystemExit(f"Видеофайл не найден: {video}")
+        description = descriptions[index] if len(descriptions) > 1 else (descriptions or [""])[0]
+        try:
+            engine.enqueue({
+                "video": video,
+                "description": description,
+                "tags": args.tags,
+                "platforms": args.platforms,
+                "accounts": args.accounts,
+                "group": args.group,
+                "priority": args.priority,
+                "publish_at": args.publish_at,
+            })
+        except ValueError as e:
+            raise SystemExit(str(e))
+
+
+def print_timings():
+    """Перцентили длительности этапов и скорости передачи за этот запуск"""
+    summary = metrics.summary()
+    if not summary:
+        return
+    print(f"{'этап':<28}{'n':>5}{'p50':>12}{'p95':>12}{'p99':>12}")
+    for key, row in summary.items():
+        if key.startswith("throughput/"):
+            cells = [f"{format_bytes(row[p])}/с" for p in ("p50", "p95", "p99")]
+        else:
+            cells = [f"{row[p]:.2f} с" for p in ("p50", "p95", "p99")]
+        print(f"{key:<28}{row['count']:>5}" + "".join(f"{cell:>12}" for cell in cells))
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    queue = JobQueue()
+
+    if args.command == "status":
+        for state, count in queue.counts().items():
+            print(f"{state}: {count}")
+        for row in QuotaLedger(Config()).usage():
+            print(f"квота {row['project']}: {row['used']} из {row['limit'] or '∞'}, "
+                  f"сброс в {time.strftime('%H:%M', time.localtime(row['reset']))}")
+        return 0
+
+    config = Config()
+    if args.command == "accounts":
+        for platform in PLATFORMS:
+            print(f"{platform}: {', '.join(config.get_accounts(platform)) or '—'}")
+        for group, accounts in config.get_groups().items():
+            print(f"группа {group}: {', '.join(accounts)}")
+        return 0
+
+    events = ConsoleEvents(quiet=args.quiet)
+    engine = create_engine(config, queue, max_workers=args.workers, events=events)
+
+    if args.command in ("upload", "enqueue"):
+        enqueue_videos(engine, args)
+        if args.command == "enqueue":
+            return 0
+
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: engine.stop())
+
+    if args.command == "daemon":
+        engine.run_forever()
+    else:
+        engine.run_until_drained()
+        if not args.quiet:
+            print_timings()
+    return 1 if events.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,165 @@
+"""
+Движок загрузки на asyncio
+
+Задачи выполняются корутинами в одном цикле событий. Загрузчики, умеющие
+работать без блокировок (upload_async, сейчас — YouTube через aiohttp),
+передают байты прямо в цикле, поэтому сотни одновременных resumable-загрузок
+не требуют сотен потоков. Блокирующие SDK (instagrapi, Selenium для TikTok)
+и подготовка файла (копия, хэш, перекодирование) уходят в пул из
+async_threads потоков. Короткие обращения к диску и базе — очередь, чтение
+чанков и сохранение resumable-сессий — идут через отдельный небольшой пул
+async_io_threads, чтобы занятые SDK потоки не задерживали передачу байтов.
+
+События отправляются тем же EngineEvents, что и у UploadEngine, поэтому
+Qt-воркер и CLI работают с обоими движками одинаково.
+"""
+
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from core.engine import UploadEngine
+from core.metrics import metrics
+from core.utils import account_label
+
+HTTP_CONNECT_TIMEOUT = 30
+HTTP_READ_TIMEOUT = 120
+
+
+class AsyncUploadEngine(UploadEngine):
+    def __init__(self, config, queue=None, max_workers=None, events=None):
+        settings = config.settings["engine"]
+        super().__init__(config, queue, max_workers or settings["async_max_jobs"], events)
+        self.threads = settings["async_threads"]
+        self.io_threads = settings["async_io_threads"]
+        self.http = None
+        self._loop = None
+        self._wake_event = None
+        self._job_slots = None
+        self._blocking = None
+        self._io = None
+
+    def wake(self):
+        self._wake.set()
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            try:
+                loop.call_soon_threadsafe(self._wake_event.set)
+            except RuntimeError:
+                pass  # цикл уже остановлен
+
+    def release_slot(self):
+        # finish_job выполняется в пуле потоков, семафор asyncio — только из цикла
+        self._loop.call_soon_threadsafe(self._job_slots.release)
+        self.wake()
+
+    async def in_thread(self, fn, *args, blocking=False):
+        """
+        Вызов в пуле потоков; открытые span'ы задачи видны внутри. blocking —
+        долгие вызовы (SDK, подготовка файла): они идут в свой пул и не
+        занимают потоки коротких обращений к очереди.
+        """
+        ctx = contextvars.copy_context()
+        executor = self._blocking if blocking else self._io
+        return await self._loop.run_in_executor(executor, functools.partial(ctx.run, fn, *args))
+
+    def _run(self, until_drained):
+        asyncio.run(self._main(until_drained))
+
+    async def _main(self, until_drained):
+        self._loop = asyncio.get_running_loop()
+        # Пул цикла по умолчанию — для коротких вызовов, в том числе run_in_executor(None)
+        # у загрузчиков. Блокирующие загрузки — в своём пуле: asyncio.run дожидается
+        # пула по умолчанию, а брошенные при stop(wait=False) загрузки ждать не нужно
+        self._io = ThreadPoolExecutor(max_workers=self.io_threads, thread_name_prefix="engine-io")
+        self._loop.set_default_executor(self._io)
+        self._blocking = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix="engine-sdk")
+        self._wake_event = asyncio.Event()
+        self._job_slots = asyncio.Semaphore(self.max_workers)
+        if aiohttp is not None:
+            self.http = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(
+                total=None, sock_connect=HTTP_CONNECT_TIMEOUT, sock_read=HTTP_READ_TIMEOUT))
+        else:
+            self.events.on_log("⚠️ aiohttp не установлен: все загрузки идут через пул потоков")
+
+        await self.in_thread(self.announce)
+        tasks = set()
+        try:
+            while not self._stopping.is_set():
+                await self._job_slots.acquire()
+                self._wake_event.clear()
+                self._wake.clear()
+                job = None
+                if not self._stopping.is_set():
+                    job = await self.in_thread(self.claim_next)
+                if job is None:
+                    self._job_slots.release()
+                    if until_drained and await self.in_thread(self._drained):
+                        break
+                    try:
+                        await asyncio.wait_for(self._wake_event.wait(),
+                                               self.scheduler.next_ready_in(self.IDLE_POLL_SECONDS))
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+
+                await self.in_thread(self.start_job, job)
+                task = asyncio.ensure_future(self.process_job_async(job))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+                await self.in_thread(self.prefetch_upcoming)
+
+            # Как и пул потоков, дожидаемся уже начатых задач, если их не бросили при stop
+            if tasks and not self._abandon:
+                await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            if self.http is not None:
+                await self.http.close()
+                self.http = None
+            await self.in_thread(self.shutdown)
+            self._blocking.shutdown(wait=not self._abandon)
+            self._loop = None
+
+    async def process_job_async(self, job):
+        with metrics.span("job", platform=job["platform"], account=job["account"],
+                          job_id=job["id"], attempt=job["attempts"]) as job_span:
+            try:
+                result = await self.in_thread(self.prepare_job, job, blocking=True)
+                if result is None:
+                    result = await self.upload_to_platform_async(job)
+            except Exception as e:
+                result = self.job_error(job, e)
+            self.close_job_span(job_span, result)
+        await self.in_thread(self.finish_job, job, result)
+
+    async def upload_to_platform_async(self, job):
+        platform = job["platform"]
+        video_path = job["upload_path"]
+        label = account_label(platform, job["account"])
+        publish_at = self.scheduled_publish(job)
+        self.upload_started(platform, label, video_path, publish_at)
+        with metrics.span("upload") as span:
+            try:
+                with metrics.span("init"):
+                    uploader = await self.in_thread(self.uploader_for, platform, blocking=True)
+                credentials = self.config.get_platform_creds(platform, job["account"])
+                args = (video_path, job["description"], job["tags"], credentials)
+                progress_fn = self.progress_callback(job)
+
+                if self.http is not None and uploader.supports_async():
+                    result = await uploader.upload_async(*args, log_fn=self.events.on_log, progress_fn=progress_fn,
+                                                         publish_at=publish_at, http=self.http)
+                else:
+                    # Блокирующий SDK (Selenium, instagrapi) — в пуле потоков
+                    result = await self.in_thread(functools.partial(
+                        uploader.upload, *args, log_fn=self.events.on_log, progress_fn=progress_fn,
+                        publish_at=publish_at), blocking=True)
+                return self.upload_succeeded(platform, label, uploader, result)
+            except Exception as e:
+                return self.upload_failed(label, span, e)
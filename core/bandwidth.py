@@ -0,0 +1,188 @@
+"""
+Общий лимит исходящей скорости для параллельных загрузок
+
+Без лимита параллельные загрузки делят канал как придётся: большой мастер
+на YouTube забивает канал, и маленькие Reels еле ползут, а офисный канал
+общий и с другими сервисами. BandwidthBudget задаёт общий потолок
+(max_mbps) и делит его между загрузками по весам платформ.
+
+Каждая загрузка открывает поток (stream) и перед отправкой каждого чанка
+запрашивает у бюджета его размер. Запросы обслуживаются в порядке
+взвешенной справедливой очереди (self-clocked fair queueing): поток с весом 2
+получает вдвое больше, чем поток с весом 1, а место, освободившееся после
+завершения загрузки, сразу делится между оставшимися.
+
+Загрузки, байты которых отправляет сам SDK (instagrapi, браузер TikTok),
+придержать нельзя — для них открывается поток без темпа (paced=False):
+его доля вычитается из скорости, которую получают управляемые потоки.
+"""
+
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict
+
+# Сколько можно отправить без ожидания после простоя
+BURST_SECONDS = 1.0
+# Как часто ожидающий поток перепроверяет очередь
+POLL_INTERVAL = 0.05
+
+
+class _Ticket:
+    __slots__ = ("stream", "nbytes", "tag")
+
+    def __init__(self, stream, nbytes, tag):
+        self.stream = stream
+        self.nbytes = nbytes
+        self.tag = tag
+
+
+class Stream:
+    """Поток одной загрузки; consume() / consume_async() — перед отправкой очередного чанка"""
+
+    def __init__(self, budget: "BandwidthBudget", platform: str, weight: float, paced: bool):
+        self.budget = budget
+        self.platform = platform
+        self.weight = weight
+        self.paced = paced
+        self.last_tag = 0.0
+
+    def consume(self, nbytes: int) -> None:
+        """Ожидание, пока поток вправе отправить nbytes байт"""
+        self.budget._consume(self, nbytes)
+
+    async def consume_async(self, nbytes: int) -> None:
+        """consume() без блокировки цикла событий"""
+        await self.budget._consume_async(self, nbytes)
+
+    def close(self) -> None:
+        self.budget.close(self)
+
+
+class BandwidthBudget:
+    def __init__(self):
+        self.rate = 0.0  # байт/с на все загрузки, 0 — без ограничения
+        self.weights: Dict[str, float] = {}
+        # Фабрика потоков в дочернем процессе изоляции: доли выдаёт основной процесс
+        self.relay = None
+        self._cond = threading.Condition()
+        self._streams = set()
+        self._waiting = []  # куча (метка, номер, билет)
+        self._seq = itertools.count()
+        self._virtual = 0.0
+        self._tokens = 0.0
+        self._updated = time.monotonic()
+
+    def configure(self, settings: Dict[str, Any]):
+        with self._cond:
+            self._refill()
+            self.rate = settings.get("max_mbps", 0) * 1_000_000 / 8
+            self.weights = dict(settings.get("weights", {}))
+            self._cond.notify_all()
+
+    def open(self, platform: str, paced: bool = True):
+        """Регистрация загрузки; её доля учитывается до close()"""
+        if self.relay is not None:
+            return self.relay(platform, paced)
+        stream = Stream(self, platform, float(self.weights.get(platform, 1)) or 1.0, paced)
+        with self._cond:
+            self._refill()
+            stream.last_tag = self._virtual
+            self._streams.add(stream)
+        return stream
+
+    def close(self, stream: Stream):
+        with self._cond:
+            self._refill()
+            self._streams.discard(stream)
+            self._cond.notify_all()
+
+    @contextmanager
+    def stream(self, platform: str, paced: bool = True):
+        stream = self.open(platform, paced)
+        try:
+            yield stream
+        finally:
+            stream.close()
+
+    def paced_rate(self) -> float:
+        """Скорость, которую сейчас делят управляемые потоки"""
+        total = sum(stream.weight for stream in self._streams)
+        paced = sum(stream.weight for stream in self._streams if stream.paced)
+        return self.rate * paced / total if total else self.rate
+
+    def _refill(self):
+        now = time.monotonic()
+        rate = self.paced_rate()
+        self._tokens = min(rate * BURST_SECONDS, self._tokens + (now - self._updated) * rate)
+        self._updated = now
+
+    def _enqueue(self, stream: Stream, nbytes: int) -> _Ticket:
+        # Метка окончания: чем больше вес, тем медленнее растёт метка потока
+        tag = max(self._virtual, stream.last_tag) + nbytes / stream.weight
+        stream.last_tag = tag
+        ticket = _Ticket(stream, nbytes, tag)
+        heapq.heappush(self._waiting, (tag, next(self._seq), ticket))
+        return ticket
+
+    def _try_grant(self, ticket: _Ticket) -> float:
+        """0 — билет обслужен, иначе через сколько секунд проверить снова"""
+        if not self.rate:
+            # Лимит сняли, пока поток ждал
+            self._cancel(ticket)
+            return 0.0
+        self._refill()
+        if self._waiting[0][2] is not ticket:
+            return POLL_INTERVAL
+        if self._tokens < 0:
+            # Чанк больше запаса отправляется сразу, следующие ждут, пока долг не погасится
+            return -self._tokens / self.paced_rate()
+        heapq.heappop(self._waiting)
+        self._tokens -= ticket.nbytes
+        self._virtual = ticket.tag
+        self._cond.notify_all()
+        return 0.0
+
+    def _cancel(self, ticket: _Ticket):
+        self._waiting = [entry for entry in self._waiting if entry[2] is not ticket]
+        heapq.heapify(self._waiting)
+        self._cond.notify_all()
+
+    def _consume(self, stream: Stream, nbytes: int):
+        if not self.rate or nbytes <= 0:
+            return
+        with self._cond:
+            ticket = self._enqueue(stream, nbytes)
+            try:
+                while True:
+                    wait = self._try_grant(ticket)
+                    if not wait:
+                        return
+                    self._cond.wait(wait)
+            except BaseException:
+                self._cancel(ticket)
+                raise
+
+    async def _consume_async(self, stream: Stream, nbytes: int):
+        if not self.rate or nbytes <= 0:
+            return
+        with self._cond:
+            ticket = self._enqueue(stream, nbytes)
+        try:
+            while True:
+                with self._cond:
+                    wait = self._try_grant(ticket)
+                if not wait:
+                    return
+                await asyncio.sleep(wait)
+        except BaseException:
+            # Отменённая задача не должна держать очередь
+            with self._cond:
+                self._cancel(ticket)
+            raise
+
+
+bandwidth = BandwidthBudget()
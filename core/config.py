@@ -1,32 +1,270 @@
 import os
+import re
 import json
 import pathlib
 
 APP_DIR = os.path.join(pathlib.Path.home(), ".video_uploader")
 os.makedirs(APP_DIR, exist_ok=True)
 CRED_STORE = os.path.join(APP_DIR, "creds.json")
+SETTINGS_STORE = os.path.join(APP_DIR, "settings.json")
 IG_SESSION = os.path.join(APP_DIR, "session.json")
+IG_SESSIONS_DIR = os.path.join(APP_DIR, "ig_sessions")
+os.makedirs(IG_SESSIONS_DIR, exist_ok=True)
+QUEUE_DB = os.path.join(APP_DIR, "queue.db")
+LEDGER_DB = os.path.join(APP_DIR, "ledger.db")
+PREPARED_DIR = os.path.join(APP_DIR, "prepared")
+os.makedirs(PREPARED_DIR, exist_ok=True)
+RENDITIONS_DIR = os.path.join(APP_DIR, "renditions")
+os.makedirs(RENDITIONS_DIR, exist_ok=True)
+STAGING_DIR = os.path.join(APP_DIR, "staging")
+os.makedirs(STAGING_DIR, exist_ok=True)
+METRICS_DIR = os.path.join(APP_DIR, "metrics")
+os.makedirs(METRICS_DIR, exist_ok=True)
+LOGS_DIR = os.path.join(APP_DIR, "logs")
+os.makedirs(LOGS_DIR, exist_ok=True)
+TOKENS_DIR = os.path.join(APP_DIR, "tokens")
+os.makedirs(TOKENS_DIR, exist_ok=True)
+
+# Профиль аккаунта, в который переносятся учётные данные старого формата
+DEFAULT_ACCOUNT = "default"
+# Особое имя в списке аккаунтов задачи: все аккаунты платформы
+ALL_ACCOUNTS = "*"
+
+
+def account_file(prefix, account, ext=".json"):
+    """Файл токена/сессии аккаунта; у профиля default — прежнее имя в APP_DIR"""
+    if account == DEFAULT_ACCOUNT:
+        return os.path.join(APP_DIR, f"{prefix}{ext}")
+    safe_name = re.sub(r"[^\w.-]", "_", account)
+    return os.path.join(TOKENS_DIR, f"{prefix}.{safe_name}{ext}")
+
+# Настройки по умолчанию; settings.json переопределяет их по ключам
+# Лимиты платформ (0 — без ограничения):
+#   concurrency / rate_per_hour / burst — на платформу целиком,
+#   account_concurrency / account_rate_per_hour / account_burst — на аккаунт
+DEFAULT_SETTINGS = {
+    # mode: threads — поток на задачу; asyncio — задачи в одном цикле событий,
+    # HTTP-загрузки без блокировок, блокирующие SDK и подготовка файлов — в пуле
+    # async_threads потоков, короткие обращения к очереди и диску — в пуле async_io_threads
+    "engine": {
+        "max_workers": 6,
+        "mode": "threads",
+        "async_max_jobs": 200,
+        "async_threads": 16,
+        "async_io_threads": 4,
+    },
+    # Загрузчики в отдельных процессах (по процессу на платформу): platforms — какие
+    # платформы изолировать (пусто — все), max_memory_mb — порог памяти процесса
+    # (вместе с дочерними, например браузером) для перезапуска, stall_timeout —
+    # сколько секунд процесс может не отвечать (даже heartbeat), прежде чем будет убит,
+    # progress_timeout — сколько секунд задача может не присылать лог или прогресс
+    # (heartbeat не в счёт): так ловится вызов SDK, зависший в живом процессе
+    "isolation": {
+        "enabled": False,
+        "platforms": [],
+        "max_memory_mb": 1536,
+        "stall_timeout": 900,
+        "progress_timeout": 1800,
+    },
+    # Прогрев сессий (core.sessions): при запуске, при старте очереди (не чаще
+    # min_interval секунд) и каждые refresh_interval секунд
+    "sessions": {
+        "enabled": True,
+        "refresh_interval": 600,
+        "min_interval": 60,
+    },
+    # Повтор временных ошибок и ошибок лимита: пауза base * 2^(попытка-1) ± 50%
+    "retry": {
+        "max_attempts": 5,
+        "base_delay": 30,
+        "rate_limit_delay": 300,
+        "max_delay": 3600,
+    },
+    # Предпроверка файла; вложенные секции youtube/instagram/tiktok
+    # переопределяют ограничения из core.preflight.PLATFORM_CONSTRAINTS
+    "preflight": {
+        "enabled": True,
+    },
+    # Перенос moov в начало MP4/MOV перед загрузкой (в пуле процессов)
+    "faststart": {
+        "enabled": False,
+        "workers": 2,
+    },
+    # Перекодирование ffmpeg под профиль платформы; workers = 0 — по числу ядер,
+    # lookahead — сколько ожидающих задач кодировать заранее, profiles.<платформа>
+    # переопределяет ключи core.transcode.TRANSCODE_PROFILES
+    "transcode": {
+        "enabled": False,
+        "ffmpeg": "ffmpeg",
+        "workers": 0,
+        "preset": "veryfast",
+        "lookahead": 4,
+        "cache_max_gb": 50,
+    },
+    # Локальные копии видео с сетевого диска; paths — каталоги, из которых
+    # копировать (пусто — все), lookahead — на сколько задач вперёд
+    "staging": {
+        "enabled": False,
+        "paths": [],
+        "max_gb": 20,
+        "lookahead": 2,
+    },
+    # Общий лимит исходящей скорости (core.bandwidth): max_mbps — мегабит/с на все
+    # загрузки (0 — без лимита), weights — вес потока платформы при делении канала
+    "bandwidth": {
+        "max_mbps": 0,
+        "weights": {"youtube": 1, "instagram": 1, "tiktok": 1},
+    },
+    # Общий кэш чтения видеофайлов (core.readcache): хэш, разбор заголовков
+    # и загрузка YouTube берут блоки из памяти, а не с диска
+    "read_cache": {
+        "max_mb": 512,
+    },
+    # Замеры этапов (core.metrics): трасса JSONL, файл Prometheus,
+    # port > 0 — HTTP-эндпоинт /metrics на 127.0.0.1
+    "metrics": {
+        "enabled": True,
+        "trace": True,
+        "prometheus_file": True,
+        "port": 0,
+    },
+    # Группы аккаунтов: {"имя группы": ["профиль1", "профиль2"]}; задача для
+    # группы уходит каждому профилю группы, который есть на платформе
+    "account_groups": {},
+    # Предохранитель платформы: пауза после failure_threshold сбоев подряд
+    "circuit_breaker": {
+        "failure_threshold": 3,
+        "cooldown": 60,
+        "max_cooldown": 1800,
+    },
+    # daily_quota — единиц квоты YouTube Data API в сутки на проект Google
+    # (загрузка стоит 1600; 0 — не считать квоту)
+    "youtube": {
+        "concurrency": 3,
+        "account_concurrency": 2,
+        "daily_quota": 10000,
+    },
+    "instagram": {
+        "concurrency": 2,
+        "account_concurrency": 1,
+        "account_rate_per_hour": 10,
+        "account_burst": 2,
+    },
+    "tiktok": {
+        "concurrency": 2,
+        "account_concurrency": 1,
+        "account_rate_per_hour": 20,
+        "account_burst": 2,
+        "browser": "chrome",
+        "headless": True,
+        "browser_pool_size": 2,
+        "recycle_after": 20,
+        "max_idle_seconds": 300,
+        # Запускать браузер аккаунта при прогреве сессий, не дожидаясь первой задачи
+        "prewarm_browser": False,
+    },
+}
+
 
 class Config:
     def __init__(self):
         self.creds = self.load_creds()
+        self.settings = self.load_settings()
     
     def load_creds(self):
         if os.path.exists(CRED_STORE):
             with open(CRED_STORE, "r", encoding="utf-8") as f:
                 try:
-                    return json.load(f)
+                    return self.migrate_creds(json.load(f))
                 except:
                     return {}
         return {}
     
+    @staticmethod
+    def migrate_creds(creds):
+        """
+        Учётные данные хранятся по профилям: {"youtube": {"accounts": {"default": {...}}}}.
+        Блок старого формата (один на платформу) становится профилем default.
+        """
+        for platform, block in list(creds.items()):
+            if isinstance(block, dict) and "accounts" not in block:
+                creds[platform] = {"accounts": {DEFAULT_ACCOUNT: block} if any(block.values()) else {}}
+        return creds
+    
     def save_creds(self):
         with open(CRED_STORE, "w", encoding="utf-8") as f:
             json.dump(self.creds, f, indent=2, ensure_ascii=False)
     
-    def get_platform_creds(self, platform):
-        return self.creds.get(platform, {})
+    def load_settings(self):
+        settings = {section: dict(values) for section, values in DEFAULT_SETTINGS.items()}
+        if os.path.exists(SETTINGS_STORE):
+            with open(SETTINGS_STORE, "r", encoding="utf-8") as f:
+                try:
+                    stored = json.load(f)
+                except ValueError:
+                    stored = {}
+            for section, values in stored.items():
+                if isinstance(values, dict) and isinstance(settings.get(section), dict):
+                    settings[section].update(values)
+                else:
+                    settings[section] = values
+        return settings
+    
+    def save_settings(self):
+        with open(SETTINGS_STORE, "w", encoding="utf-8") as f:
+            json.dump(self.settings, f, indent=2, ensure_ascii=False)
+    
+    def get_platform_settings(self, platform):
+        return self.settings.get(platform, {})
+    
+    def get_accounts(self, platform):
+        """Имена профилей платформы"""
+        return list(self.creds.get(platform, {}).get("accounts", {}))
+    
+    def get_profiles(self):
+        """Имена профилей всех платформ (профиль может быть настроен не на каждой)"""
+        names = {account for block in self.creds.values() if isinstance(block, dict)
+                 for account in block.get("accounts", {})}
+        return sorted(names, key=lambda name: (name != DEFAULT_ACCOUNT, name))
     
-    def set_platform_creds(self, platform, creds_data):
-        self.creds[platform] = creds_data
+    def get_platform_creds(self, platform, account=DEFAULT_ACCOUNT):
+        creds = dict(self.creds.get(platform, {}).get("accounts", {}).get(account, {}))
+        # Токен OAuth у каждого канала свой
+        if platform == "youtube" and not creds.get("token_file"):
+            creds["token_file"] = account_file("yt_token", account)
+        # Общий файл сессии прежних версий принадлежит аккаунту, перенесённому в профиль default
+        if platform == "instagram" and account == DEFAULT_ACCOUNT:
+            creds["seed_session_file"] = IG_SESSION
+        return creds
+    
+    def set_platform_creds(self, platform, creds_data, account=DEFAULT_ACCOUNT):
+        self.creds.setdefault(platform, {}).setdefault("accounts", {})[account] = creds_data
         self.save_creds()
+    
+    def get_groups(self):
+        return self.settings.get("account_groups", {})
+    
+    def resolve_targets(self, platforms, accounts=None, group=None):
+        """
+        Пары (платформа, аккаунт) для задачи: явный список профилей (ALL_ACCOUNTS —
+        все профили платформы), группа из account_groups или профиль default.
+        Профили, которых на платформе нет, пропускаются.
+        
+        Raises:
+            ValueError: Неизвестная группа или платформа без подходящих профилей
+        """
+        if group:
+            if group not in self.get_groups():
+                raise ValueError(f"Неизвестная группа аккаунтов: {group}")
+            accounts = self.get_groups()[group]
+        if not accounts:
+            return [(platform, DEFAULT_ACCOUNT) for platform in platforms]
+        
+        targets = []
+        for platform in platforms:
+            existing = self.get_accounts(platform)
+            selected = existing if ALL_ACCOUNTS in accounts else [a for a in accounts if a in existing]
+            if not selected:
+                raise ValueError(f"{platform.capitalize()}: нет профилей из списка {', '.join(accounts)}")
+            targets += [(platform, account) for account in selected]
+        return targets
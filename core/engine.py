@@ -0,0 +1,598 @@
+"""
+Движок загрузки без зависимостей от Qt
+
+Разбирает персистентную очередь пулом потоков и сообщает о ходе работы
+через объект событий (EngineEvents). GUI оборачивает события в сигналы Qt,
+CLI — печатает их в консоль.
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict
+
+from core.bandwidth import bandwidth
+from core.config import DEFAULT_ACCOUNT
+from core.errors import classify, backoff_delay, PERMANENT, RATE_LIMITED, RETRYABLE, TRANSIENT
+from core.job_queue import JobQueue, FINISHED_STATES, JOB_PENDING
+from core.faststart import FaststartStage, FaststartError
+from core.isolation import UploaderSupervisor
+from core.ledger import UploadLedger
+from core.metrics import metrics
+from core.preflight import preflight
+from core.probe import describe, probe, ProbeError
+from core.quota import QuotaLedger, is_quota_error
+from core.readcache import shared_cache
+from core.scheduler import Scheduler
+from core.sessions import SessionManager
+from core.staging import StagingCache
+from core.transcode import TranscodeStage, TranscodeError
+from core.utils import account_label
+from uploaders import get_uploader, close_all, SCHEDULE_WINDOWS
+
+
+class EngineEvents:
+    """
+    Набор обработчиков событий движка. По умолчанию все обработчики пустые,
+    подписчик переопределяет только нужные.
+
+    Обработчики вызываются из рабочих потоков движка.
+    """
+
+    def on_log(self, text: str):
+        pass
+
+    def on_progress(self, percent: int):
+        pass
+
+    def on_platform_status(self, platform: str, status: str):
+        pass
+
+    def on_upload_progress(self, job_id: int, platform: str, progress: Dict[str, Any]):
+        """Байтовый прогресс загрузки: bytes_sent, total_bytes, bytes_per_sec, eta, percent"""
+        pass
+
+    def on_job_finished(self, job_id: int, result: Dict[str, Any]):
+        pass
+
+    def on_queue_changed(self, stats: Dict[str, int]):
+        pass
+
+    def on_queue_drained(self, results: Dict[int, Dict[str, Any]]):
+        pass
+
+    def on_session_status(self, platform: str, status: Dict[str, Any]):
+        """Результат прогрева сессии платформы: state (ok/error/checking/missing), message, checked_at"""
+        pass
+
+
+class UploadEngine:
+    IDLE_POLL_SECONDS = 2.0
+
+    def __init__(self, config, queue=None, max_workers=None, events=None):
+        self.config = config
+        self.queue = queue or JobQueue()
+        self.max_workers = max_workers or config.settings["engine"]["max_workers"]
+        self.events = events or EngineEvents()
+        self.quota = QuotaLedger(config)
+        self.scheduler = Scheduler(config, self.quota)
+        self.ledger = UploadLedger()
+        self.faststart = FaststartStage(config.settings["faststart"]["workers"])
+        shared_cache.configure(config.settings["read_cache"]["max_mb"] * 1024 * 1024)
+        metrics.configure(config.settings["metrics"])
+        bandwidth.configure(config.settings["bandwidth"])
+        staging = config.settings["staging"]
+        self.staging = StagingCache(staging) if staging["enabled"] else None
+        transcode = config.settings["transcode"]
+        self.transcoder = TranscodeStage(transcode, self.ledger.file_hash) if transcode["enabled"] else None
+        isolation = config.settings["isolation"]
+        self.isolation = UploaderSupervisor(isolation, config.settings["metrics"]) if isolation["enabled"] else None
+        sessions = config.settings["sessions"]
+        self.sessions = SessionManager(config, self.uploader_for, self.events) if sessions["enabled"] else None
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._abandon = False
+        self._slots = threading.Semaphore(self.max_workers)
+        self._lock = threading.Lock()
+        self._active = 0
+        self._deferred = []  # задачи, которые claim_next отложил (квота API, время публикации)
+        self.results = {}
+
+    def enqueue(self, task):
+        """
+        Постановка видео в очередь: по задаче на каждую платформу и каждый
+        выбранный аккаунт (task["accounts"] — профили, task["group"] — группа).
+
+        Raises:
+            ValueError: Неизвестная группа или нет подходящих профилей
+        """
+        targets = self.config.resolve_targets(task["platforms"], task.get("accounts"), task.get("group"))
+        # Задачи, которым рано начинаться, сразу получают not_before — очередь отсеет их в SQL
+        not_before = {}
+        for platform in task["platforms"]:
+            deferral = self.publish_deferral({"platform": platform, "publish_at": task.get("publish_at")})
+            if deferral is not None:
+                not_before[platform] = deferral[0]
+        ids = self.queue.enqueue_targets(task["video"], task["description"], task["tags"], targets,
+                                         task.get("priority", 0), task.get("publish_at"), not_before)
+        self.events.on_log(f"📥 В очередь добавлено задач: {len(ids)} ({task['video']})")
+        for platform, until in not_before.items():
+            self.events.on_log(f"⏸️ {platform.capitalize()}: загрузка начнётся "
+                               f"{time.strftime('%d.%m %H:%M', time.localtime(until))}")
+        if self.sessions is not None and not self._active:
+            # Очередь начинает работу — сессии к первым задачам должны быть готовы
+            self.sessions.warm_up()
+        self.emit_stats()
+        self.wake()
+        return ids
+
+    def wake(self):
+        self._wake.set()
+
+    def stop(self, wait=True):
+        """
+        Остановка движка. Незавершённые задачи останутся в очереди до следующего запуска.
+
+        Args:
+            wait: Дождаться уже начатых загрузок. Без ожидания цикл завершается сразу,
+                а брошенные задачи JobQueue.recover() вернёт в очередь при следующем запуске
+        """
+        self._abandon = not wait
+        self._stopping.set()
+        self.wake()
+
+    @property
+    def active_jobs(self):
+        """Число выполняющихся задач"""
+        with self._lock:
+            return self._active
+
+    def emit_stats(self):
+        stats = self.queue.counts()
+        self.events.on_queue_changed(stats)
+        total = sum(stats.values())
+        finished = sum(stats[state] for state in FINISHED_STATES)
+        self.events.on_progress(int(finished / total * 100) if total else 100)
+        return stats
+
+    def run_forever(self):
+        """Разбор очереди до вызова stop() (режим GUI и демона)"""
+        self._run(until_drained=False)
+
+    def run_until_drained(self):
+        """Разбор очереди до её опустошения (разовый запуск из CLI)"""
+        self._run(until_drained=True)
+
+    def _run(self, until_drained):
+        self.announce()
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        try:
+            while not self._stopping.is_set():
+                # Ждём свободный слот, чтобы не забирать из очереди больше, чем можем выполнить
+                if not self._slots.acquire(timeout=self.IDLE_POLL_SECONDS):
+                    continue
+                self._wake.clear()
+                # Первая задача, для которой есть свободный лимит платформы и аккаунта
+                job = None if self._stopping.is_set() else self.claim_next()
+                if job is None:
+                    self._slots.release()
+                    if until_drained and self._drained():
+                        break
+                    self._wake.wait(self.scheduler.next_ready_in(self.IDLE_POLL_SECONDS))
+                    continue
+
+                self.start_job(job)
+                executor.submit(self.process_job, job)
+                self.prefetch_upcoming()
+        finally:
+            executor.shutdown(wait=not self._abandon)
+        self.shutdown()
+
+    def claim_next(self):
+        """
+        Следующая задача в порядке Scheduler.order(). Задачи проектов без
+        остатка квоты и задачи, которым рано начинаться из-за времени
+        публикации, откладываются.
+        """
+        job = self.queue.claim_next(self.accept_job, self.scheduler.order)
+        self.defer_rejected()
+        return job
+
+    def accept_job(self, job):
+        deferral = self.publish_deferral(job)
+        if deferral is None:
+            until = self.quota.blocked_until(job)
+            if until:
+                deferral = until, "квота API исчерпана, задачи отложены до сброса", "Квота API на сегодня исчерпана"
+        if deferral is not None:
+            # Откладываем после выборки: claim_next ещё читает очередь
+            self._deferred.append((job, *deferral))
+            return False
+        return self.scheduler.can_start(job)
+
+    @staticmethod
+    def publish_deferral(job):
+        """
+        (до какого времени отложить, сообщение, ошибка задачи) для задачи с временем
+        публикации, которую рано загружать, иначе None. Платформа без отложенной
+        публикации загружает к сроку, с ней — не раньше её максимального горизонта.
+        """
+        publish_at = job["publish_at"]
+        ahead = (publish_at or 0) - time.time()
+        if ahead <= 0:
+            return None
+        window = SCHEDULE_WINDOWS.get(job["platform"])
+        if window is None or ahead < window[0]:
+            return publish_at, "загрузка отложена до времени публикации", None
+        if window[1] and ahead > window[1]:
+            # Запас на округление времени публикации платформой
+            return publish_at - window[1] + 600, "загрузка отложена до окна отложенной публикации", None
+        return None
+
+    @staticmethod
+    def scheduled_publish(job):
+        """Время отложенной публикации для загрузчика или None — публиковать сразу"""
+        publish_at = job["publish_at"]
+        window = SCHEDULE_WINDOWS.get(job["platform"])
+        if not publish_at or window is None or publish_at - time.time() < max(window[0], 1):
+            return None
+        return publish_at
+
+    def defer_rejected(self):
+        deferred, self._deferred = self._deferred, []
+        messages = {}
+        for job, until, message, error in deferred:
+            self.queue.reschedule(job["id"], until - time.time(), error, RATE_LIMITED if error else None)
+            messages[(account_label(job["platform"], job["account"]), message)] = until
+        for (label, message), until in messages.items():
+            self.events.on_log(f"⏸️ {label}: {message} ({time.strftime('%d.%m %H:%M', time.localtime(until))})")
+        if deferred:
+            self.emit_stats()
+
+    def announce(self):
+        """Сообщения и статистика при запуске разбора очереди"""
+        pending = self.queue.counts()["pending"]
+        if pending:
+            self.events.on_log(f"♻️ В очереди ожидают задач: {pending}")
+        if self.transcoder is not None and self.transcoder.ffmpeg is None:
+            self.events.on_log("⚠️ ffmpeg не найден, перекодирование отключено")
+        if self.sessions is not None:
+            self.sessions.start()
+        self.emit_stats()
+
+    def shutdown(self):
+        """Освобождение ресурсов после остановки цикла"""
+        if self.sessions is not None:
+            self.sessions.stop()
+        close_all()
+        if self.isolation is not None:
+            self.isolation.close()
+        self.faststart.shutdown()
+        if self.staging is not None:
+            self.staging.shutdown()
+        if self.transcoder is not None:
+            self.transcoder.shutdown()
+        metrics.flush()
+
+    def _drained(self):
+        """True, если нет ни выполняющихся, ни ожидающих задач"""
+        with self._lock:
+            if self._active:
+                return False
+        return self.queue.counts()["pending"] == 0
+
+    def start_job(self, job):
+        """Учёт задачи, забранной из очереди"""
+        self.scheduler.acquire(job)
+        with self._lock:
+            self._active += 1
+        self.emit_stats()
+
+    def release_slot(self):
+        """Освобождение слота параллельности после задачи"""
+        self._slots.release()
+        self.wake()
+
+    def process_job(self, job):
+        with metrics.span("job", platform=job["platform"], account=job["account"],
+                          job_id=job["id"], attempt=job["attempts"]) as job_span:
+            try:
+                result = self.prepare_job(job)
+                if result is None:
+                    result = self.upload_to_platform(
+                        job["platform"], job["upload_path"], job["description"], job["tags"],
+                        self.config.get_platform_creds(job["platform"], job["account"]),
+                        progress_fn=self.progress_callback(job), account=job["account"],
+                        publish_at=self.scheduled_publish(job)
+                    )
+            except Exception as e:
+                result = self.job_error(job, e)
+            self.close_job_span(job_span, result)
+        self.finish_job(job, result)
+
+    def progress_callback(self, job):
+        def report(info):
+            if info.get("billed"):
+                # Загрузчик отправил платный запрос API: резерв квоты будет списан
+                job["billed"] = True
+            self.events.on_upload_progress(job["id"], job["platform"], info)
+        return report
+
+    def prepare_job(self, job):
+        """
+        Этапы до загрузки: журнал, локальная копия, предпроверка, подготовка файла.
+        Журнал проверяется первым, чтобы уже загруженное видео не копировалось
+        и не перекодировалось. Перекодирование исправляет контейнер, разрешение
+        и битрейт, поэтому с ним предпроверка идёт после подготовки — по файлу,
+        который уйдёт на платформу.
+
+        Returns:
+            Optional[dict]: Готовый результат (видео уже загружено) или None;
+            путь для загрузки кладётся в job["upload_path"]
+        """
+        with metrics.span("hash"):
+            result = self.check_ledger(job)
+        if result is not None:
+            return result
+        with metrics.span("staging"):
+            job["source"] = self.staging.acquire(job["video"]) if self.staging else job["video"]
+        check_prepared = self.transcoder is not None and self.transcoder.ffmpeg is not None
+        if not check_prepared:
+            with metrics.span("preflight"):
+                self.run_preflight(job, job["source"])
+        with metrics.span("prepare"):
+            job["upload_path"] = self.prepare_video(job)
+        if check_prepared:
+            with metrics.span("preflight"):
+                self.run_preflight(job, job["upload_path"])
+        return None
+
+    def job_error(self, job, exc):
+        kind, retry_after = classify(exc)
+        self.events.on_log(f"❌ {account_label(job['platform'], job['account'])}: {job['video']} - {str(exc)}")
+        return {"ok": False, "error": str(exc), "kind": kind, "retry_after": retry_after}
+
+    @staticmethod
+    def close_job_span(job_span, result):
+        if not result["ok"]:
+            job_span.status = "error"
+            job_span.error = result["error"][:200]
+        result["timings"] = {name: round(seconds, 3) for name, seconds in job_span.phases.items()}
+
+    def finish_job(self, job, result):
+        """Запись результата, освобождение лимитов и события о завершении задачи"""
+        final = True
+        try:
+            final = self.record_outcome(job, result)
+        except Exception as e:
+            result = {"ok": False, "error": str(e), "kind": PERMANENT}
+            self.queue.mark_failed(job["id"], str(e), PERMANENT)
+        finally:
+            if self.staging is not None and "source" in job:
+                # Задача, пропущенная по журналу, копию не запрашивала
+                self.staging.release(job["video"])
+            if self.transcoder is not None and "upload_path" in job:
+                self.transcoder.release(job["upload_path"])
+            self.scheduler.release(job)
+            self.release_slot()
+
+        if final:
+            self.events.on_job_finished(job["id"], result)
+            self.release_video(job["video"])
+        metrics.flush()
+        stats = self.emit_stats()
+
+        with self._lock:
+            if final:
+                self.results[job["id"]] = {"platform": job["platform"], "video": job["video"], **result}
+            self._active -= 1
+            drained = self._active == 0 and stats["pending"] == 0
+            results = self.results if drained else None
+            if drained:
+                self.results = {}
+
+        if results is not None:
+            self.wake()  # цикл ждёт по таймауту, пока _active не обнулится
+            self.events.on_log("🎉 Все загрузки в очереди завершены!")
+            self.events.on_queue_drained(results)
+
+    def run_preflight(self, job, path):
+        """Проверка файла path под ограничения платформы до отправки байтов"""
+        settings = self.config.settings["preflight"]
+        if not settings.get("enabled", True):
+            return None
+        try:
+            info = preflight(path, job["platform"], settings)
+        except Exception:
+            self.scheduler.refund(job)
+            raise
+        job["probe"] = info
+        self.events.on_log(f"🔎 {account_label(job['platform'], job['account'])}: {describe(info)}")
+        return info
+
+    def check_ledger(self, job):
+        """
+        Проверка журнала: это содержимое уже загружено в этот аккаунт платформы?
+
+        Returns:
+            Optional[dict]: Результат пропущенной задачи или None, если загружать нужно
+        """
+        # Готовую копию (prefetch) читать быстрее, чем сетевой диск
+        staged = self.staging.ready(job["video"]) if self.staging is not None else None
+        job["content_hash"] = self.ledger.file_hash(staged or job["video"])
+        done = self.ledger.lookup(job["content_hash"], job["platform"], job["account"])
+        if done is None:
+            return None
+
+        self.scheduler.refund(job)
+        self.events.on_platform_status(job["platform"], "completed")
+        self.events.on_log(f"⏭️ {account_label(job['platform'], job['account'])}: {job['video']} уже загружено "
+                           f"({done['url'] or done['remote_id'] or done['video']}), пропускаем")
+        return {"ok": True, "skipped": True, "remote_id": done["remote_id"], "url": done["url"]}
+
+    def prefetch_upcoming(self):
+        """Копирование и перекодирование для ближайших ожидающих задач, пока идут загрузки"""
+        settings = self.config.settings
+        if self.staging is not None:
+            for job in self.queue.list_jobs([JOB_PENDING], limit=settings["staging"].get("lookahead", 0)):
+                if os.path.exists(job["video"]):
+                    self.staging.prefetch(job["video"])
+
+        if self.transcoder is None:
+            return
+        for job in self.queue.list_jobs([JOB_PENDING], limit=settings["transcode"].get("lookahead", 0)):
+            if not os.path.exists(job["video"]):
+                continue
+            source = job["video"]
+            if self.staging is not None and self.staging.wants(source):
+                # Не читаем сетевой диск дважды: кодируем, когда готова локальная копия
+                source = self.staging.ready(source)
+                if source is None:
+                    continue
+            self.transcoder.prefetch(job["video"], job["platform"], source)
+
+    def prepare_video(self, job):
+        """
+        Подготовка файла к загрузке: версия под профиль платформы
+        или faststart-копия исходника.
+
+        Returns:
+            str: Путь к файлу, который нужно загружать
+        """
+        path = job["source"]
+        if self.transcoder is not None:
+            try:
+                rendition = self.transcoder.render(job["video"], job["platform"], path)
+            except TranscodeError as e:
+                self.events.on_log(f"⚠️ Перекодирование не выполнено, загружаем исходник: {e}")
+            else:
+                if rendition != path:
+                    self.events.on_log(f"🎞️ {account_label(job['platform'], job['account'])}: загружаем версию "
+                                       f"{os.path.basename(rendition)} вместо {os.path.basename(path)}")
+                    return rendition
+        info = job.get("probe")
+        if info is None and self.config.settings["faststart"]["enabled"]:
+            # Предпроверка ещё не разбирала файл (она идёт после перекодирования или выключена)
+            try:
+                info = probe(path)
+            except ProbeError:
+                info = None
+        if self.config.settings["faststart"]["enabled"] and (info or {}).get("faststart") is False:
+            self.events.on_log(f"📦 {os.path.basename(path)}: moov в конце файла, переносим в начало")
+            try:
+                path = self.faststart.prepare(path)
+            except FaststartError as e:
+                self.events.on_log(f"⚠️ faststart не выполнен, загружаем исходник: {e}")
+        return path
+
+    def release_video(self, video):
+        """Удаление подготовленных копий и кэша чтения, когда видео больше не ждёт ни одна задача"""
+        if not self.queue.has_unfinished(video):
+            self.faststart.release(video)
+            shared_cache.discard(video)
+            staged = self.staging.ready(video) if self.staging is not None else None
+            if staged:
+                self.faststart.release(staged)
+                shared_cache.discard(staged)
+            if self.staging is not None:
+                self.staging.discard(video)
+
+    def record_outcome(self, job, result):
+        """
+        Запись результата задачи: успех, повтор с паузой или окончательная ошибка.
+
+        Returns:
+            bool: True, если задача завершена; False, если отложена для повтора
+        """
+        platform = job["platform"]
+        platform_name = account_label(platform, job["account"])
+        if result["ok"]:
+            if not result.get("skipped"):
+                self.scheduler.record_success(platform)
+                self.scheduler.record_throughput(platform, job["size"], result.get("timings", {}).get("upload", 0))
+                self.ledger.record(job["content_hash"], platform, job["account"],
+                                   result.get("remote_id"), result.get("url"), job["video"])
+            self.queue.mark_done(job["id"], result.get("resp") or result.get("url"))
+            return True
+
+        kind = result.get("kind", PERMANENT)
+        if kind == RATE_LIMITED and is_quota_error(result["error"]):
+            # Квоту проекта тратят и другие клиенты: локальный счёт отстал, ждём сброса.
+            # Отклонённый запрос квоту не расходует
+            self.quota.refund(job)
+            result["retry_after"] = self.quota.exhaust(job)
+            self.events.on_log(f"⏸️ {platform_name}: API сообщило об исчерпании квоты проекта")
+        # Ошибки файла (permanent) и аккаунта (auth, лимит аккаунта) не говорят о проблемах
+        # платформы: иначе один канал с истёкшим токеном останавливал бы все остальные
+        if kind == TRANSIENT:
+            pause = self.scheduler.record_failure(platform)
+            if pause:
+                self.events.on_log(f"⛔ {platform_name}: слишком много ошибок подряд, пауза {int(pause)} с")
+
+        retry = self.config.settings["retry"]
+        if kind in RETRYABLE and job["attempts"] < retry["max_attempts"]:
+            base = retry["rate_limit_delay"] if kind == RATE_LIMITED else retry["base_delay"]
+            delay = max(result.get("retry_after") or 0,
+                        backoff_delay(job["attempts"], base, retry["max_delay"]))
+            self.queue.reschedule(job["id"], delay, result["error"], kind)
+            self.events.on_platform_status(platform, "retrying")
+            self.events.on_log(f"🔁 {platform_name}: повтор #{job['attempts']} через {int(delay)} с ({kind})")
+            return False
+
+        self.queue.mark_failed(job["id"], result["error"], kind)
+        self.events.on_platform_status(platform, "error")
+        return True
+
+    def upload_to_platform(self, platform, video_path, description, tags, credentials, progress_fn=None,
+                           account=DEFAULT_ACCOUNT, publish_at=None):
+        """Метод для загрузки на конкретную платформу (выполняется в отдельном потоке)"""
+        label = account_label(platform, account)
+        self.upload_started(platform, label, video_path, publish_at)
+        with metrics.span("upload") as span:
+            try:
+                # SDK платформы импортируется при первой задаче для неё
+                with metrics.span("init"):
+                    uploader = self.uploader_for(platform)
+
+                result = uploader.upload(video_path, description, tags, credentials,
+                                         log_fn=self.events.on_log, progress_fn=progress_fn, publish_at=publish_at)
+                return self.upload_succeeded(platform, label, uploader, result)
+            except Exception as e:
+                return self.upload_failed(label, span, e)
+
+    def uploader_for(self, platform):
+        if self.isolation is not None and self.isolation.isolates(platform):
+            uploader = self.isolation.uploader(platform)
+        else:
+            uploader = get_uploader(platform)
+        uploader.configure(self.config.get_platform_settings(platform))
+        return uploader
+
+    def upload_started(self, platform, label, video_path, publish_at=None):
+        self.events.on_platform_status(platform, "started")
+        scheduled = f" (публикация {time.strftime('%d.%m %H:%M', time.localtime(publish_at))})" if publish_at else ""
+        self.events.on_log(f"⏳ {label}: начинается загрузка {video_path}{scheduled}...")
+
+    def upload_succeeded(self, platform, label, uploader, result):
+        remote_id, url = uploader.remote_ref(result)
+        self.events.on_platform_status(platform, "completed")
+        self.events.on_log(f"✅ {label}: успешно загружено!" + (f" {url}" if url else ""))
+        return {"ok": True, "resp": result, "remote_id": remote_id, "url": url}
+
+    def upload_failed(self, label, span, exc):
+        # Ошибка возвращается результатом, поэтому span помечаем вручную
+        span.status = "error"
+        span.error = str(exc)[:200]
+        kind, retry_after = classify(exc)
+        self.events.on_log(f"❌ {label}: ошибка ({kind}) - {str(exc)}")
+        return {"ok": False, "error": str(exc), "kind": kind, "retry_after": retry_after}
+
+
+def create_engine(config, queue=None, max_workers=None, events=None):
+    """Движок по настройке engine.mode: threads (по умолчанию) или asyncio"""
+    if config.settings["engine"].get("mode") == "asyncio":
+        # asyncio-движок и aiohttp нужны только в этом режиме
+        from core.async_engine import AsyncUploadEngine
+        return AsyncUploadEngine(config, queue, max_workers, events)
+    return UploadEngine(config, queue, max_workers, events)
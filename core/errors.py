@@ -0,0 +1,118 @@
+"""
+Классификация ошибок загрузчиков
+
+Ошибки SDK распознаются по имени класса и HTTP-статусу, без импорта самих
+SDK: так классификатор работает и тогда, когда платформа ещё не загружена.
+"""
+
+import random
+from typing import Optional, Tuple
+
+TRANSIENT = "transient"        # сеть, 5xx, таймауты — можно повторить
+RATE_LIMITED = "rate_limited"  # платформа просит подождать
+AUTH = "auth"                  # сессия/токен/пароль — нужен человек
+PERMANENT = "permanent"        # повтор не поможет
+
+RETRYABLE = (TRANSIENT, RATE_LIMITED)
+
+
+class UploadError(Exception):
+    """Ошибка загрузки с уже известным классом"""
+
+    def __init__(self, message, kind=PERMANENT, retry_after=None):
+        super().__init__(message)
+        self.kind = kind
+        self.retry_after = retry_after
+
+
+_NAME_KINDS = {
+    # instagrapi
+    "LoginRequired": AUTH,
+    "BadPassword": AUTH,
+    "BadCredentials": AUTH,
+    "ChallengeRequired": AUTH,
+    "TwoFactorRequired": AUTH,
+    "PleaseWaitFewMinutes": RATE_LIMITED,
+    "RateLimitError": RATE_LIMITED,
+    "FeedbackRequired": RATE_LIMITED,
+    "ClientThrottledError": RATE_LIMITED,
+    "ClientConnectionError": TRANSIENT,
+    "ClientRequestTimeout": TRANSIENT,
+    "ClientIncompleteReadError": TRANSIENT,
+    # selenium / tiktok-uploader
+    "TimeoutException": TRANSIENT,
+    "WebDriverException": TRANSIENT,
+    # google-auth
+    "RefreshError": AUTH,
+    # httplib2 / requests
+    "HttpLib2Error": TRANSIENT,
+    "ConnectionError": TRANSIENT,
+    "Timeout": TRANSIENT,
+}
+
+_RATE_LIMIT_REASONS = ("rateLimitExceeded", "userRateLimitExceeded", "quotaExceeded",
+                       "uploadLimitExceeded")
+
+
+def _http_status(exc) -> Optional[int]:
+    resp = getattr(exc, "resp", None)
+    status = getattr(resp, "status", None)
+    if status is None:
+        status = getattr(getattr(exc, "response", None), "status_code", None)
+    try:
+        return int(status) if status is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _retry_after(exc) -> Optional[float]:
+    for headers in (getattr(exc, "resp", None), getattr(getattr(exc, "response", None), "headers", None)):
+        try:
+            value = headers.get("retry-after") or headers.get("Retry-After")
+            return float(value) if value else None
+        except (AttributeError, TypeError, ValueError):
+            continue
+    return None
+
+
+def classify_status(status: int, message: str = "", retry_after: Optional[float] = None) -> Tuple[str, Optional[float]]:
+    """Класс ошибки по HTTP-статусу ответа (и тексту — для 403 с причиной лимита)"""
+    if status == 429 or (status == 403 and any(r in message for r in _RATE_LIMIT_REASONS)):
+        return RATE_LIMITED, retry_after
+    if status == 401:
+        return AUTH, None
+    if status >= 500 or status == 408:
+        return TRANSIENT, retry_after
+    return PERMANENT, None
+
+
+def classify(exc: BaseException) -> Tuple[str, Optional[float]]:
+    """
+    Определение класса ошибки.
+
+    Returns:
+        Tuple[str, Optional[float]]: (класс, пауза в секундах, если платформа её указала)
+    """
+    if isinstance(exc, UploadError):
+        return exc.kind, exc.retry_after
+
+    status = _http_status(exc)
+    if status is not None:
+        return classify_status(status, str(exc), _retry_after(exc))
+
+    for cls in type(exc).__mro__:
+        kind = _NAME_KINDS.get(cls.__name__)
+        if kind:
+            return kind, None
+
+    if isinstance(exc, (FileNotFoundError, PermissionError, IsADirectoryError)):
+        return PERMANENT, None
+    if isinstance(exc, (ConnectionError, TimeoutError, OSError)):
+        return TRANSIENT, None
+    return PERMANENT, None
+
+
+def backoff_delay(attempt: int, base: float, max_delay: float) -> float:
+    """Экспоненциальная пауза с джиттером: base * 2^(attempt-1) ± 50%"""
+    delay = min(max_delay, base * 2 ** max(0, attempt - 1))
+    return delay * random.uniform(0.5, 1.5)
@@ -0,0 +1,247 @@
+"""
+Перенос moov в начало MP4/MOV ("faststart")
+
+Файл переписывается в порядке ftyp → moov → остальные боксы. Смещения
+чанков в stco/co64 пересчитываются на величину сдвига данных; если
+32-битные смещения stco переполняются, таблица превращается в co64.
+Перекодирования нет — только копирование байтов.
+
+Переписывание выполняется в пуле процессов (FaststartStage), результат
+кладётся в каталог подготовленных файлов и переиспользуется всеми
+платформами, на которые идёт это видео.
+"""
+
+import hashlib
+import multiprocessing
+import os
+import struct
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Tuple
+
+from core.config import PREPARED_DIR
+
+COPY_BLOCK_SIZE = 8 * 1024 * 1024
+_CONTAINERS = {b"moov", b"trak", b"mdia", b"minf", b"stbl", b"edts", b"dinf"}
+
+
+class FaststartError(Exception):
+    pass
+
+
+def _read_top_level(f, file_size) -> List[Tuple[bytes, int, int, int]]:
+    """Боксы верхнего уровня: (тип, начало, размер, длина заголовка)"""
+    boxes = []
+    pos = 0
+    while pos + 8 <= file_size:
+        f.seek(pos)
+        header = f.read(16)
+        size, box_type = struct.unpack_from(">I4s", header)
+        header_size = 8
+        if size == 1:
+            size = struct.unpack_from(">Q", header, 8)[0]
+            header_size = 16
+        elif size == 0:
+            size = file_size - pos
+        if size < header_size or pos + size > file_size:
+            raise FaststartError(f"Повреждённый бокс {box_type!r} по смещению {pos}")
+        boxes.append((box_type, pos, size, header_size))
+        pos += size
+    return boxes
+
+
+def _box(box_type: bytes, body: bytes) -> bytes:
+    size = len(body) + 8
+    if size > 0xFFFFFFFF:
+        return struct.pack(">I4sQ", 1, box_type, size + 8) + body
+    return struct.pack(">I4s", size, box_type) + body
+
+
+def _rewrite(data: bytes, shift_of, use_co64: bool) -> bytes:
+    """Пересборка дерева moov с исправленными смещениями чанков"""
+    out = []
+    pos = 0
+    while pos + 8 <= len(data):
+        size, box_type = struct.unpack_from(">I4s", data, pos)
+        header = 8
+        if size == 1:
+            size = struct.unpack_from(">Q", data, pos + 8)[0]
+            header = 16
+        elif size == 0:
+            size = len(data) - pos
+        body = data[pos + header:pos + size]
+
+        if box_type == b"cmov":
+            raise FaststartError("Сжатый moov (cmov) не поддерживается")
+        if box_type in _CONTAINERS:
+            out.append(_box(box_type, _rewrite(body, shift_of, use_co64)))
+        elif box_type in (b"stco", b"co64"):
+            fmt = ">I" if box_type == b"stco" else ">Q"
+            count = struct.unpack_from(">I", body, 4)[0]
+            offsets = struct.unpack_from(f">{count}{fmt[1]}", body, 8)
+            offsets = [o + shift_of(o) for o in offsets]
+            if box_type == b"co64" or use_co64:
+                table = struct.pack(f">{count}Q", *offsets)
+                out.append(_box(b"co64", body[:8] + table))
+            else:
+                table = struct.pack(f">{count}I", *offsets)
+                out.append(_box(b"stco", body[:8] + table))
+        else:
+            out.append(data[pos:pos + size])
+        pos += size
+    return b"".join(out)
+
+
+def _stco_overflows(moov_body: bytes, shift_of) -> bool:
+    """Есть ли в stco смещения, которые после сдвига не влезут в 32 бита"""
+    overflow = False
+
+    def walk(data):
+        nonlocal overflow
+        pos = 0
+        while pos + 8 <= len(data) and not overflow:
+            size, box_type = struct.unpack_from(">I4s", data, pos)
+            header = 8
+            if size == 1:
+                size = struct.unpack_from(">Q", data, pos + 8)[0]
+                header = 16
+            elif size == 0:
+                size = len(data) - pos
+            body = data[pos + header:pos + size]
+            if box_type in _CONTAINERS:
+                walk(body)
+            elif box_type == b"stco":
+                count = struct.unpack_from(">I", body, 4)[0]
+                offsets = struct.unpack_from(f">{count}I", body, 8)
+                if any(o + shift_of(o) > 0xFFFFFFFF for o in offsets):
+                    overflow = True
+            pos += size
+
+    walk(moov_body)
+    return overflow
+
+
+def faststart(src: str, dst: str) -> str:
+    """
+    Запись копии src с moov в начале файла.
+
+    Returns:
+        str: dst
+
+    Raises:
+        FaststartError: Если файл не MP4/MOV, moov отсутствует или сжат
+    """
+    file_size = os.path.getsize(src)
+    with open(src, "rb") as f:
+        boxes = _read_top_level(f, file_size)
+        moov = next((b for b in boxes if b[0] == b"moov"), None)
+        if moov is None:
+            raise FaststartError("В файле нет moov")
+        first_mdat = next((b for b in boxes if b[0] == b"mdat"), None)
+        if first_mdat is None or moov[1] < first_mdat[1]:
+            raise FaststartError("moov уже в начале файла")
+
+        f.seek(moov[1] + moov[3])
+        moov_body = f.read(moov[2] - moov[3])
+
+        # Новый порядок: всё до первого mdat (кроме moov), moov, затем остальное
+        head = [b for b in boxes if b[1] < first_mdat[1] and b[0] != b"moov"]
+        tail = [b for b in boxes if b[1] >= first_mdat[1] and b[0] != b"moov"]
+
+        use_co64 = False
+        for _ in range(3):
+            new_moov_size = len(_box(b"moov", _rewrite(moov_body, lambda o: 0, use_co64)))
+            shifts = []  # (старое начало, старый конец, сдвиг)
+            new_pos = sum(b[2] for b in head) + new_moov_size
+            for box_type, start, size, _ in tail:
+                shifts.append((start, start + size, new_pos - start))
+                new_pos += size
+
+            def shift_of(offset, shifts=shifts):
+                for start, end, shift in shifts:
+                    if start <= offset < end:
+                        return shift
+                return 0
+
+            if use_co64 or not _stco_overflows(moov_body, shift_of):
+                break
+            use_co64 = True
+
+        new_moov = _box(b"moov", _rewrite(moov_body, shift_of, use_co64))
+        if len(new_moov) != new_moov_size:
+            raise FaststartError("Размер moov изменился при пересборке")
+
+        tmp_path = dst + ".part"
+        with open(tmp_path, "wb") as out:
+            for box in head:
+                _copy_range(f, out, box[1], box[2])
+            out.write(new_moov)
+            for box in tail:
+                _copy_range(f, out, box[1], box[2])
+        os.replace(tmp_path, dst)
+    return dst
+
+
+def _copy_range(src, dst, start, length):
+    src.seek(start)
+    while length > 0:
+        block = src.read(min(COPY_BLOCK_SIZE, length))
+        if not block:
+            raise FaststartError("Неожиданный конец файла")
+        dst.write(block)
+        length -= len(block)
+
+
+def prepared_path(video_path: str, suffix: str = "faststart") -> str:
+    """Путь подготовленной копии; имя зависит от (путь, размер, mtime) исходника"""
+    st = os.stat(video_path)
+    key = f"{os.path.abspath(video_path)}|{st.st_size}|{st.st_mtime_ns}"
+    digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:12]
+    stem, ext = os.path.splitext(os.path.basename(video_path))
+    return os.path.join(PREPARED_DIR, f"{stem}.{digest}.{suffix}{ext or '.mp4'}")
+
+
+class FaststartStage:
+    """
+    Пул процессов для faststart. Одно видео переписывается один раз, даже
+    если его одновременно ждут задачи нескольких платформ.
+    """
+
+    def __init__(self, max_workers: int = 2):
+        self.max_workers = max_workers
+        self._executor = None
+        self._lock = threading.Lock()
+        self._futures: Dict[str, object] = {}
+
+    def prepare(self, video_path: str) -> str:
+        """Путь к faststart-копии; блокирует поток до окончания переписывания"""
+        dst = prepared_path(video_path)
+        if os.path.exists(dst):
+            return dst
+        with self._lock:
+            if self._executor is None:
+                # fork из многопоточного процесса унаследует захваченные блокировки
+                # (logging, SQLite, кэш чтения), поэтому процессы запускаются через spawn
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                     mp_context=multiprocessing.get_context("spawn"))
+            future = self._futures.get(dst)
+            if future is None:
+                future = self._futures[dst] = self._executor.submit(faststart, video_path, dst)
+        try:
+            return future.result()
+        finally:
+            with self._lock:
+                self._futures.pop(dst, None)
+
+    def release(self, video_path: str) -> None:
+        """Удаление подготовленной копии, когда видео больше не нужно ни одной задаче"""
+        try:
+            os.remove(prepared_path(video_path))
+        except OSError:
+            pass
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
@@ -0,0 +1,409 @@
+"""
+Загрузчики в отдельных процессах
+
+Selenium, instagrapi и клиент Google работают в процессе приложения, и
+зависание, утечка памяти или долгая работа под GIL в одном SDK тормозят
+всё остальное, включая GUI. В режиме изоляции у каждой платформы свой
+дочерний процесс: задачи, лог и прогресс передаются через Pipe, а движок
+получает от RemoteUploader тот же интерфейс, что и от обычного загрузчика.
+Общий лимит скорости (core.bandwidth) остаётся в основном процессе:
+дочерний запрашивает у него долю канала перед каждым чанком.
+
+Надзор за процессом:
+  - процесс упал — задачи в нём завершаются временной ошибкой (их повторит
+    очередь), следующая задача запускает новый процесс;
+  - память процесса (вместе с дочерними, например браузером) превысила
+    max_memory_mb — новые задачи идут в новый процесс, старый завершается,
+    когда доработают его задачи;
+  - процесс не отвечает дольше stall_timeout — он убивается. Пока задача
+    выполняется, дочерний процесс раз в HEARTBEAT_INTERVAL секунд шлёт
+    heartbeat, так что этот таймаут ловит только замерший процесс целиком;
+  - задача дольше progress_timeout не сообщает о ходе работы (лог,
+    прогресс, запрос доли канала) — процесс тоже убивается. Heartbeat этот
+    срок не продлевает: он идёт из отдельного потока и не говорит о том,
+    что вызов SDK не завис. Поэтому progress_timeout должен покрывать
+    самый долгий шаг без прогресса (загрузка в Instagram, TikTok).
+"""
+
+import asyncio
+import itertools
+import multiprocessing
+import os
+import pickle
+import queue
+import threading
+import time
+from typing import Any, Dict, Optional
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+from core.bandwidth import bandwidth
+from core.errors import classify, UploadError, TRANSIENT
+from core.metrics import metrics
+from uploaders import get_uploader, close_all
+
+STOP_TIMEOUT = 10
+# Как часто дочерний процесс подтверждает, что задача ещё выполняется
+HEARTBEAT_INTERVAL = 15
+
+
+def process_memory(pid: int) -> Optional[int]:
+    """RSS процесса в байтах (с psutil — вместе с дочерними); None, если узнать нельзя"""
+    if psutil is not None:
+        try:
+            proc = psutil.Process(pid)
+            return proc.memory_info().rss + sum(child.memory_info().rss
+                                                for child in proc.children(recursive=True))
+        except psutil.Error:
+            return None
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+# ---- дочерний процесс ----
+
+# Задача, которую выполняет текущий поток дочернего процесса
+_request = threading.local()
+
+
+class _RelayStream:
+    """Поток core.bandwidth в дочернем процессе: долю канала выдаёт основной процесс"""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, send, streams, platform: str, paced: bool):
+        self.id = next(self._ids)
+        self.request_id = _request.id
+        self.granted = threading.Event()
+        self._send = send
+        self._streams = streams
+        streams[self.id] = self
+        send("bandwidth", self.request_id, "open", self.id, platform, paced)
+
+    def consume(self, nbytes: int) -> None:
+        self.granted.clear()
+        self._send("bandwidth", self.request_id, "consume", self.id, nbytes)
+        self.granted.wait()
+
+    async def consume_async(self, nbytes: int) -> None:
+        await asyncio.get_running_loop().run_in_executor(None, self.consume, nbytes)
+
+    def close(self) -> None:
+        self._streams.pop(self.id, None)
+        self._send("bandwidth", self.request_id, "close", self.id)
+
+
+def _child_main(platform: str, conn, metrics_settings: Dict[str, Any]):
+    """Цикл дочернего процесса: каждая задача выполняется в своём потоке"""
+    # Файл Prometheus и HTTP /metrics ведёт только основной процесс
+    metrics.configure({**metrics_settings, "prometheus_file": False, "port": 0})
+    send_lock = threading.Lock()
+
+    def send(*message):
+        with send_lock:
+            try:
+                conn.send(message)
+            except (OSError, ValueError):
+                pass  # основной процесс закрыл канал
+
+    streams = {}  # id -> _RelayStream
+    bandwidth.relay = lambda stream_platform, paced: _RelayStream(send, streams, stream_platform, paced)
+
+    while True:
+        try:
+            message = conn.recv()
+        except (EOFError, OSError):
+            break
+        if message[0] == "stop":
+            break
+        if message[0] == "granted":
+            stream = streams.get(message[1])
+            if stream is not None:
+                stream.granted.set()
+            continue
+        threading.Thread(target=_child_call, args=(platform, send) + message,
+                         name=f"{platform}-{message[0]}", daemon=True).start()
+    close_all()
+
+
+def _child_call(platform, send, method, request_id, settings, args, kwargs, labels):
+    """upload() или warm_up() загрузчика; лог и прогресс отправляются сообщениями"""
+    _request.id = request_id
+    finished = threading.Event()
+    threading.Thread(target=_heartbeat, args=(send, request_id, finished),
+                     name=f"{platform}-heartbeat", daemon=True).start()
+    try:
+        with metrics.span("worker", **labels):
+            uploader = get_uploader(platform)
+            uploader.configure(settings)
+            if method == "upload":
+                kwargs["progress_fn"] = lambda info: send("progress", request_id, info)
+            result = getattr(uploader, method)(*args, log_fn=lambda text: send("log", request_id, text),
+                                               **kwargs)
+            ref = uploader.remote_ref(result) if method == "upload" else None
+        try:
+            pickle.dumps(result)
+        except Exception:
+            result = repr(result)  # объекты SDK в другой процесс не передаются
+        send("done", request_id, result, ref)
+    except Exception as e:
+        # Исключения SDK могут не сериализоваться, поэтому передаём уже классифицированную ошибку
+        kind, retry_after = classify(e)
+        send("error", request_id, str(e), kind, retry_after)
+    finally:
+        finished.set()
+
+
+def _heartbeat(send, request_id, finished):
+    while not finished.wait(HEARTBEAT_INTERVAL):
+        send("heartbeat", request_id)
+
+
+# ---- основной процесс ----
+
+class UploaderProcess:
+    """Один дочерний процесс платформы и задачи, которые в нём выполняются"""
+
+    def __init__(self, platform: str, metrics_settings: Dict[str, Any]):
+        self.platform = platform
+        self.retired = False  # новые задачи не принимает
+        self._lock = threading.Lock()
+        self._pending = {}  # request_id -> очередь сообщений задачи
+        context = multiprocessing.get_context("spawn")  # fork из многопоточного процесса небезопасен
+        self._conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_child_main, args=(platform, child_conn, metrics_settings),
+                                       name=f"uploader-{platform}", daemon=True)
+        self.process.start()
+        child_conn.close()
+        self._send_lock = threading.Lock()
+        threading.Thread(target=self._read, name=f"uploader-{platform}-ipc", daemon=True).start()
+
+    @property
+    def alive(self) -> bool:
+        return self.process.is_alive()
+
+    def memory(self) -> Optional[int]:
+        return process_memory(self.process.pid)
+
+    def submit(self, method: str, request_id: int, settings, args, kwargs, labels) -> "queue.Queue":
+        replies = queue.Queue()
+        with self._lock:
+            self._pending[request_id] = replies
+        try:
+            with self._send_lock:
+                self._conn.send((method, request_id, settings, args, kwargs, labels))
+        except (OSError, ValueError):
+            replies.put(("exit", request_id))
+        return replies
+
+    def send(self, *message):
+        try:
+            with self._send_lock:
+                self._conn.send(message)
+        except (OSError, ValueError):
+            pass  # процесс завершился, задача получит "exit"
+
+    def finish(self, request_id: int):
+        with self._lock:
+            self._pending.pop(request_id, None)
+            idle = not self._pending
+        if idle and self.retired:
+            self._stop_later()
+
+    def retire(self):
+        """Больше не принимать задачи; процесс завершится после текущих"""
+        with self._lock:
+            self.retired = True
+            idle = not self._pending
+        if idle:
+            self._stop_later()
+
+    def _read(self):
+        while True:
+            try:
+                message = self._conn.recv()
+            except (EOFError, OSError):
+                break
+            with self._lock:
+                replies = self._pending.get(message[1])
+            if replies is not None:
+                replies.put(message)
+        # Канал закрыт: процесс завершился или был убит
+        self.retired = True
+        with self._lock:
+            pending = list(self._pending.items())
+        for request_id, replies in pending:
+            replies.put(("exit", request_id))
+
+    def _stop_later(self):
+        # Ожидание выхода процесса не должно задерживать завершение задачи
+        threading.Thread(target=self.stop, name=f"uploader-{self.platform}-stop", daemon=True).start()
+
+    def stop(self):
+        try:
+            with self._send_lock:
+                self._conn.send(("stop",))
+        except (OSError, ValueError):
+            pass
+        self.process.join(STOP_TIMEOUT)
+        if self.process.is_alive():
+            self.kill()
+        self._conn.close()
+
+    def kill(self):
+        self.retired = True
+        self.process.kill()
+        self.process.join(STOP_TIMEOUT)
+
+
+class UploaderSupervisor:
+    """Процессы загрузчиков по платформам с перезапуском при сбоях"""
+
+    def __init__(self, settings: Dict[str, Any], metrics_settings: Dict[str, Any]):
+        self.settings = settings
+        self.metrics_settings = metrics_settings
+        self.max_memory = settings.get("max_memory_mb", 0) * 1024 * 1024
+        self.stall_timeout = settings.get("stall_timeout", 0) or None
+        self.progress_timeout = settings.get("progress_timeout", 0) or None
+        self._lock = threading.Lock()
+        self._processes: Dict[str, UploaderProcess] = {}
+        self._ids = itertools.count(1)
+
+    def isolates(self, platform: str) -> bool:
+        platforms = self.settings.get("platforms") or []
+        return not platforms or platform in platforms
+
+    def uploader(self, platform: str) -> "RemoteUploader":
+        return RemoteUploader(self, platform)
+
+    def _process(self, platform: str, log_fn) -> UploaderProcess:
+        with self._lock:
+            process = self._processes.get(platform)
+            if process is not None and not process.retired and process.alive:
+                return process
+            if process is not None and not process.alive:
+                log_fn(f"♻️ {platform.capitalize()}: процесс загрузчика завершился "
+                       f"(код {process.process.exitcode}), запускается новый")
+            process = self._processes[platform] = UploaderProcess(platform, self.metrics_settings)
+            return process
+
+    def run(self, platform: str, method: str, settings, args, log_fn, progress_fn=None, **kwargs):
+        """
+        Вызов upload() или warm_up() в процессе платформы; возвращает
+        (результат, (remote_id, url)), для warm_up() ссылка — None.
+        """
+        process = self._process(platform, log_fn)
+        request_id = next(self._ids)
+        replies = process.submit(method, request_id, settings, args, kwargs, metrics.current_labels())
+        streams = {}  # потоки core.bandwidth, открытые задачей в дочернем процессе
+        deadline = time.monotonic() + self.progress_timeout if self.progress_timeout else None
+        try:
+            while True:
+                timeout = self.stall_timeout
+                if deadline is not None:
+                    left = max(0.0, deadline - time.monotonic())
+                    timeout = left if timeout is None else min(timeout, left)
+                try:
+                    message = replies.get(timeout=timeout)
+                except queue.Empty:
+                    # Зависший SDK: убиваем процесс, остальные его задачи получат "exit"
+                    process.kill()
+                    if deadline is not None and time.monotonic() >= deadline:
+                        raise UploadError(f"Задача {platform} не сообщала о ходе работы "
+                                          f"{self.progress_timeout:.0f} с, процесс перезапущен", TRANSIENT)
+                    raise UploadError(f"Процесс загрузчика {platform} не отвечал {self.stall_timeout:.0f} с, "
+                                      f"процесс перезапущен", TRANSIENT)
+                kind = message[0]
+                if deadline is not None and kind in ("log", "progress", "bandwidth"):
+                    deadline = time.monotonic() + self.progress_timeout
+                if kind == "heartbeat":
+                    pass  # процесс жив: stall_timeout отсчитывается заново, progress_timeout — нет
+                elif kind == "log":
+                    log_fn(message[2])
+                elif kind == "progress":
+                    if progress_fn:
+                        progress_fn(message[2])
+                elif kind == "bandwidth":
+                    self._relay_bandwidth(process, streams, *message[2:])
+                elif kind == "done":
+                    return message[2], message[3]
+                elif kind == "error":
+                    raise UploadError(message[2], message[3], message[4])
+                else:
+                    raise UploadError(f"Процесс загрузчика {platform} завершился "
+                                      f"(код {process.process.exitcode})", TRANSIENT)
+        finally:
+            for stream in streams.values():
+                stream.close()
+            process.finish(request_id)
+            self._check_memory(process, log_fn)
+
+    @staticmethod
+    def _relay_bandwidth(process: UploaderProcess, streams, operation: str, stream_id: int, *args):
+        if operation == "open":
+            streams[stream_id] = bandwidth.open(*args)
+        elif operation == "consume":
+            streams[stream_id].consume(*args)
+            process.send("granted", stream_id)
+        elif stream_id in streams:
+            streams.pop(stream_id).close()
+
+    def _check_memory(self, process: UploaderProcess, log_fn):
+        if not self.max_memory or process.retired:
+            return
+        used = process.memory()
+        if used is not None and used > self.max_memory:
+            log_fn(f"♻️ {process.platform.capitalize()}: процесс загрузчика занял "
+                   f"{used // (1024 * 1024)} МБ, будет перезапущен")
+            process.retire()
+
+    def close(self):
+        with self._lock:
+            processes = list(self._processes.values())
+            self._processes.clear()
+        for process in processes:
+            if process.alive:
+                process.stop()
+
+
+class RemoteUploader:
+    """
+    Загрузчик платформы, выполняющий upload() в процессе UploaderSupervisor.
+    Создаётся на каждую задачу, поэтому remote_ref() берёт ссылку прошлой upload().
+    """
+
+    def __init__(self, supervisor: UploaderSupervisor, platform: str):
+        self.supervisor = supervisor
+        self.platform = platform
+        self.settings = {}
+        self._ref = (None, None)
+
+    def configure(self, settings):
+        self.settings = settings
+
+    def supports_async(self):
+        return False
+
+    def upload(self, video_path, description, tags, credentials, log_fn=print, progress_fn=None, publish_at=None):
+        result, self._ref = self.supervisor.run(self.platform, "upload", self.settings,
+                                                (video_path, description, tags, credentials),
+                                                log_fn, progress_fn, publish_at=publish_at)
+        return result
+
+    def warm_up(self, credentials, log_fn=print, horizon=0, interactive=False):
+        # Сессии прогреваются в том процессе, где потом пойдут загрузки
+        result, _ = self.supervisor.run(self.platform, "warm_up", self.settings, (credentials,), log_fn,
+                                        horizon=horizon, interactive=interactive)
+        return tuple(result)
+
+    def remote_ref(self, result):
+        return self._ref
+
+    def close(self):
+        pass
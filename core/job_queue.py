@@ -0,0 +1,273 @@
+"""
+Персистентная очередь задач загрузки
+
+Каждая задача — это пара (видео, платформа, аккаунт) со своим состоянием.
+Очередь хранится в SQLite внутри APP_DIR, поэтому переживает падение
+и перезапуск приложения: задачи, которые были в работе, при открытии
+очереди возвращаются в состояние ожидания.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from core.config import QUEUE_DB, DEFAULT_ACCOUNT
+
+JOB_PENDING = "pending"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+FINISHED_STATES = (JOB_DONE, JOB_FAILED)
+
+# Колонки таблицы jobs: (имя, определение). Новые колонки добавляются
+# в конец списка — _migrate() допишет их в уже существующую базу.
+_COLUMNS = [
+    ("id", "INTEGER PRIMARY KEY AUTOINCREMENT"),
+    ("video", "TEXT NOT NULL"),
+    ("description", "TEXT NOT NULL DEFAULT ''"),
+    ("tags", "TEXT NOT NULL DEFAULT ''"),
+    ("platform", "TEXT NOT NULL"),
+    ("account", f"TEXT NOT NULL DEFAULT '{DEFAULT_ACCOUNT}'"),
+    ("state", f"TEXT NOT NULL DEFAULT '{JOB_PENDING}'"),
+    ("attempts", "INTEGER NOT NULL DEFAULT 0"),
+    ("result", "TEXT"),
+    ("error", "TEXT"),
+    ("created_at", "REAL NOT NULL DEFAULT 0"),
+    ("updated_at", "REAL NOT NULL DEFAULT 0"),
+    ("not_before", "REAL NOT NULL DEFAULT 0"),
+    ("error_kind", "TEXT"),
+    ("priority", "INTEGER NOT NULL DEFAULT 0"),
+    ("publish_at", "REAL"),
+    ("size", "INTEGER NOT NULL DEFAULT 0"),
+]
+
+# Порядок выбора задач в SQL: приоритет, срок публикации (без срока — последними),
+# размер, порядок постановки. Индекс idx_jobs_claim повторяет его.
+_CLAIM_ORDER = "priority DESC, publish_at IS NULL, publish_at, size, id"
+# Сколько ожидающих задач claim_next() разбирает за раз
+CLAIM_BATCH = 64
+
+
+class JobQueue:
+    """
+    Потокобезопасная очередь задач поверх SQLite.
+
+    Все обращения к базе идут через одно соединение под замком, так что
+    очередь можно делить между GUI-потоком и потоками загрузчиков.
+    """
+
+    def __init__(self, db_path: str = QUEUE_DB):
+        self.db_path = db_path
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._migrate()
+        self.recover()
+
+    def _migrate(self):
+        with self._lock:
+            columns = ", ".join(f"{name} {definition}" for name, definition in _COLUMNS)
+            self._conn.execute(f"CREATE TABLE IF NOT EXISTS jobs ({columns})")
+            existing = {row["name"] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+            for name, definition in _COLUMNS:
+                if name not in existing:
+                    self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {name} {definition}")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_state ON jobs(state, id)")
+            self._conn.execute(f"CREATE INDEX IF NOT EXISTS idx_jobs_claim ON jobs(state, {_CLAIM_ORDER})")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def recover(self) -> int:
+        """
+        Возвращает в очередь задачи, прерванные падением или перезапуском.
+
+        Returns:
+            int: Количество восстановленных задач
+        """
+        with self._lock:
+            cur = self._conn.execute(
+                "UPDATE jobs SET state = ?, updated_at = ? WHERE state = ?",
+                (JOB_PENDING, time.time(), JOB_RUNNING),
+            )
+            return cur.rowcount
+
+    def enqueue(self, video: str, description: str, tags: str, platforms: List[str],
+                account: str = DEFAULT_ACCOUNT) -> List[int]:
+        """
+        Добавление видео в очередь: по одной задаче на каждую платформу.
+
+        Returns:
+            List[int]: Идентификаторы созданных задач
+        """
+        return self.enqueue_targets(video, description, tags, [(platform, account) for platform in platforms])
+
+    def enqueue_targets(self, video: str, description: str, tags: str, targets: List[Tuple[str, str]],
+                        priority: int = 0, publish_at: Optional[float] = None,
+                        not_before: Optional[Dict[str, float]] = None) -> List[int]:
+        """
+        Добавление видео в очередь: по задаче на каждую пару (платформа, аккаунт).
+
+        Args:
+            priority (int): Чем больше, тем раньше задача берётся в работу
+            publish_at (float, optional): Время публикации (unix time)
+            not_before (Dict[str, float], optional): Платформа -> раньше какого
+                времени задачу не брать (загрузка к сроку публикации)
+
+        Returns:
+            List[int]: Идентификаторы созданных задач
+        """
+        now = time.time()
+        not_before = not_before or {}
+        # Размер нужен для оценки времени передачи при выборе следующей задачи
+        size = os.path.getsize(video) if os.path.exists(video) else 0
+        ids = []
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for platform, account in targets:
+                    cur = self._conn.execute(
+                        "INSERT INTO jobs (video, description, tags, platform, account, state, priority, publish_at, "
+                        "size, not_before, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (video, description, tags, platform, account, JOB_PENDING, priority, publish_at,
+                         size, not_before.get(platform, 0), now, now),
+                    )
+                    ids.append(cur.lastrowid)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return ids
+
+    def claim_next(self, accept: Optional[Callable[[Dict[str, Any]], bool]] = None,
+                   order: Optional[Callable[[Dict[str, Any]], Any]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Атомарно забирает ожидающую задачу и переводит её в работу: по
+        умолчанию самую старую, с order — первую по этому ключу сортировки.
+
+        Задачи читаются из базы пачками по CLAIM_BATCH: с order — в порядке
+        _CLAIM_ORDER (по индексу), и ключ order уточняет порядок только внутри
+        пачки. Следующая пачка читается, лишь если accept отклонил всю текущую.
+
+        Args:
+            accept (Callable, optional): Фильтр задач; задачи, которые он
+                отклоняет, пропускаются и остаются в очереди
+            order (Callable, optional): Ключ сортировки ожидающих задач; должен
+                начинаться с приоритета и срока публикации, как _CLAIM_ORDER
+
+        Returns:
+            Optional[Dict[str, Any]]: Задача или None, если подходящих задач нет
+        """
+        sql_order = _CLAIM_ORDER if order is not None else "id"
+        with self._lock:
+            now = time.time()
+            offset = 0
+            while True:
+                rows = [dict(row) for row in self._conn.execute(
+                    f"SELECT * FROM jobs WHERE state = ? AND not_before <= ? ORDER BY {sql_order} LIMIT ? OFFSET ?",
+                    (JOB_PENDING, now, CLAIM_BATCH, offset),
+                )]
+                if order is not None:
+                    rows.sort(key=order)
+                job = next((row for row in rows if accept is None or accept(row)), None)
+                if job is not None or len(rows) < CLAIM_BATCH:
+                    break
+                offset += CLAIM_BATCH
+            if job is None:
+                return None
+            self._conn.execute(
+                "UPDATE jobs SET state = ?, attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                (JOB_RUNNING, time.time(), job["id"]),
+            )
+            job["state"] = JOB_RUNNING
+            job["attempts"] += 1
+            return job
+
+    def mark_done(self, job_id: int, result: Any = None):
+        self._finish(job_id, JOB_DONE, result=json.dumps(result, ensure_ascii=False, default=str))
+
+    def mark_failed(self, job_id: int, error: str, kind: Optional[str] = None):
+        self._finish(job_id, JOB_FAILED, error=error, kind=kind)
+
+    def _finish(self, job_id, state, result=None, error=None, kind=None):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET state = ?, result = ?, error = ?, error_kind = ?, updated_at = ? WHERE id = ?",
+                (state, result, error, kind, time.time(), job_id),
+            )
+
+    def reschedule(self, job_id: int, delay: float, error: Optional[str], kind: Optional[str] = None):
+        """Возврат задачи в очередь с запуском не раньше чем через delay секунд"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET state = ?, error = ?, error_kind = ?, not_before = ?, updated_at = ? WHERE id = ?",
+                (JOB_PENDING, error, kind, now + delay, now, job_id),
+            )
+
+    def next_due_in(self) -> Optional[float]:
+        """Через сколько секунд наступит срок ближайшей отложенной задачи"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MIN(not_before) AS due FROM jobs WHERE state = ?", (JOB_PENDING,)
+            ).fetchone()
+        if row["due"] is None:
+            return None
+        return max(0.0, row["due"] - time.time())
+
+    def has_unfinished(self, video: str) -> bool:
+        """Есть ли ещё ожидающие или выполняющиеся задачи для этого видео"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM jobs WHERE video = ? AND state IN (?, ?) LIMIT 1",
+                (video, JOB_PENDING, JOB_RUNNING),
+            ).fetchone()
+            return row is not None
+
+    def get(self, job_id: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            return dict(row) if row else None
+
+    def list_jobs(self, states: Optional[List[str]] = None, limit: int = 500) -> List[Dict[str, Any]]:
+        with self._lock:
+            if states:
+                marks = ", ".join("?" for _ in states)
+                rows = self._conn.execute(
+                    f"SELECT * FROM jobs WHERE state IN ({marks}) ORDER BY id LIMIT ?", (*states, limit)
+                )
+            else:
+                rows = self._conn.execute("SELECT * FROM jobs ORDER BY id LIMIT ?", (limit,))
+            return [dict(row) for row in rows]
+
+    def counts(self) -> Dict[str, int]:
+        """Количество задач в каждом состоянии"""
+        stats = {JOB_PENDING: 0, JOB_RUNNING: 0, JOB_DONE: 0, JOB_FAILED: 0}
+        with self._lock:
+            for row in self._conn.execute("SELECT state, COUNT(*) AS n FROM jobs GROUP BY state"):
+                stats[row["state"]] = row["n"]
+        return stats
+
+    def retry_failed(self) -> int:
+        """Возвращает все упавшие задачи в очередь"""
+        with self._lock:
+            cur = self._conn.execute(
+                "UPDATE jobs SET state = ?, error = NULL, error_kind = NULL, attempts = 0, not_before = 0, "
+                "updated_at = ? WHERE state = ?",
+                (JOB_PENDING, time.time(), JOB_FAILED),
+            )
+            return cur.rowcount
+
+    def clear_finished(self) -> int:
+        """Удаляет из очереди завершённые задачи"""
+        with self._lock:
+            marks = ", ".join("?" for _ in FINISHED_STATES)
+            cur = self._conn.execute(f"DELETE FROM jobs WHERE state IN ({marks})", FINISHED_STATES)
+            return cur.rowcount
@@ -0,0 +1,98 @@
+"""
+Журнал загрузок по хэшу содержимого
+
+Хранит, какое содержимое (SHA-256 файла) уже загружено на какую платформу
+и в какой аккаунт, вместе с идентификатором и ссылкой на стороне платформы.
+Хэши кэшируются по (путь, размер, mtime), поэтому неизменённый файл
+повторно не читается.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from core.config import LEDGER_DB
+from core.readcache import open_shared
+
+HASH_CHUNK_SIZE = 4 * 1024 * 1024
+
+
+def hash_file(path: str) -> str:
+    """SHA-256 файла; чтение через общий кэш, блоки потом достаются загрузке"""
+    digest = hashlib.sha256()
+    buffer = bytearray(HASH_CHUNK_SIZE)
+    view = memoryview(buffer)
+    with open_shared(path) as f:
+        while True:
+            n = f.readinto(buffer)
+            if not n:
+                break
+            digest.update(view[:n])
+    return digest.hexdigest()
+
+
+class UploadLedger:
+    def __init__(self, db_path: str = LEDGER_DB):
+        self._lock = threading.RLock()
+        self._hashing = {}  # path -> Lock, чтобы один файл не хэшировали параллельно
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS file_hashes ("
+            "path TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, hash TEXT NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS uploads ("
+            "hash TEXT NOT NULL, platform TEXT NOT NULL, account TEXT NOT NULL, "
+            "remote_id TEXT, url TEXT, video TEXT, uploaded_at REAL NOT NULL, "
+            "PRIMARY KEY (hash, platform, account))"
+        )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def file_hash(self, path: str) -> str:
+        """Хэш содержимого файла; пересчитывается только при смене размера или mtime"""
+        path = os.path.abspath(path)
+        with self._lock:
+            path_lock = self._hashing.setdefault(path, threading.Lock())
+
+        with path_lock:
+            st = os.stat(path)
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT hash FROM file_hashes WHERE path = ? AND size = ? AND mtime_ns = ?",
+                    (path, st.st_size, st.st_mtime_ns),
+                ).fetchone()
+            if row:
+                return row["hash"]
+
+            content_hash = hash_file(path)
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO file_hashes (path, size, mtime_ns, hash) VALUES (?, ?, ?, ?)",
+                    (path, st.st_size, st.st_mtime_ns, content_hash),
+                )
+            return content_hash
+
+    def lookup(self, content_hash: str, platform: str, account: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM uploads WHERE hash = ? AND platform = ? AND account = ?",
+                (content_hash, platform, account),
+            ).fetchone()
+            return dict(row) if row else None
+
+    def record(self, content_hash: str, platform: str, account: str,
+               remote_id: Optional[str] = None, url: Optional[str] = None, video: Optional[str] = None):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO uploads (hash, platform, account, remote_id, url, video, uploaded_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (content_hash, platform, account, remote_id, url, video, time.time()),
+            )
@@ -0,0 +1,281 @@
+"""
+Замеры времени этапов загрузки
+
+Каждый этап оформляется как span (with metrics.span("transfer", platform=...)).
+Вложенные span'ы в одном потоке (или задаче asyncio) собираются под корневым, так что
+по задаче видно, сколько ушло на авторизацию, запуск браузера, передачу
+байтов и т.д.
+
+Результаты:
+  - агрегаты по (span, платформа): p50/p95/p99 длительности и скорость передачи;
+  - трасса JSONL (METRICS_DIR/trace-ГГГГ-ММ-ДД.jsonl), строка на span;
+  - файл в текстовом формате Prometheus (METRICS_DIR/uploader.prom) для
+    textfile-коллектора node_exporter и, при заданном порте, HTTP /metrics.
+"""
+
+import contextvars
+import json
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+
+from core.config import METRICS_DIR
+
+# Сколько последних замеров хранить на ряд для перцентилей
+RESERVOIR_SIZE = 2048
+QUANTILES = (0.5, 0.95, 0.99)
+PROM_PREFIX = "video_uploader"
+# Метки задачи, которые дочерние span'ы наследуют от родителя
+INHERITED_LABELS = ("platform", "account", "job_id")
+
+# Стек открытых span'ов. ContextVar, а не threading.local: у каждой задачи
+# asyncio свой стек, даже если все они выполняются в одном потоке
+_stack = contextvars.ContextVar("metrics_span_stack", default=())
+
+
+def percentile(values, q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(q * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+class Span:
+    def __init__(self, name: str, trace_id: str, parent: Optional["Span"], labels: Dict[str, Any]):
+        self.name = name
+        self.trace_id = trace_id
+        self.parent = parent
+        self.labels = labels
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self.duration = 0.0
+        self.bytes = 0
+        self.status = "ok"
+        self.error = None
+        self.phases: Dict[str, float] = {}  # длительности дочерних span'ов (для корня)
+
+    def set(self, **labels):
+        self.labels.update(labels)
+
+    def add_bytes(self, n: int):
+        self.bytes += n
+
+    def to_record(self) -> Dict[str, Any]:
+        record = {
+            "trace_id": self.trace_id,
+            "span": self.name,
+            "parent": self.parent.name if self.parent else None,
+            "start": round(self.started_at, 3),
+            "duration": round(self.duration, 4),
+            "status": self.status,
+            **self.labels,
+        }
+        if self.bytes:
+            record["bytes"] = self.bytes
+            record["bytes_per_sec"] = round(self.bytes / self.duration) if self.duration > 0 else None
+        if self.error:
+            record["error"] = self.error
+        if self.phases:
+            record["phases"] = {k: round(v, 4) for k, v in self.phases.items()}
+        return record
+
+
+class Metrics:
+    def __init__(self):
+        self.enabled = True
+        self.trace_enabled = True
+        self.prometheus_file = True
+        self._lock = threading.Lock()
+        self._durations = defaultdict(lambda: deque(maxlen=RESERVOIR_SIZE))  # (span, platform)
+        self._throughput = defaultdict(lambda: deque(maxlen=RESERVOIR_SIZE))  # platform
+        self._counts = defaultdict(int)  # (span, platform, status)
+        self._sums = defaultdict(float)  # (span, platform)
+        self._bytes = defaultdict(int)  # platform
+        self._trace_file = None
+        self._trace_date = None
+        self._flush_lock = threading.Lock()
+        self._server = None
+
+    def configure(self, settings: Dict[str, Any]):
+        self.enabled = settings.get("enabled", True)
+        self.trace_enabled = settings.get("trace", True)
+        self.prometheus_file = settings.get("prometheus_file", True)
+        port = settings.get("port", 0)
+        if self.enabled and port and self._server is None:
+            self.serve(port)
+
+    @contextmanager
+    def span(self, name: str, **labels):
+        """Замер этапа; исключение помечает span ошибкой и пробрасывается дальше"""
+        if not self.enabled:
+            yield Span(name, "", None, labels)
+            return
+        stack = _stack.get()
+        parent = stack[-1] if stack else None
+        if parent is not None:
+            # Метки корня (платформа, задача) наследуются, если не заданы явно
+            labels = {**{k: v for k, v in parent.labels.items() if k in INHERITED_LABELS},
+                      **labels}
+        span = Span(name, parent.trace_id if parent else uuid.uuid4().hex[:16], parent, labels)
+        token = _stack.set(stack + (span,))
+        try:
+            yield span
+        except BaseException as e:
+            span.status = "error"
+            span.error = str(e)[:200]
+            raise
+        finally:
+            span.duration = time.perf_counter() - span._start
+            _stack.reset(token)
+            if parent is not None:
+                root = stack[0]
+                root.phases[name] = root.phases.get(name, 0.0) + span.duration
+            self._record(span)
+
+    def current_labels(self) -> Dict[str, Any]:
+        """Метки задачи (платформа, аккаунт, job_id) открытого span'а — для передачи в другой процесс"""
+        stack = _stack.get()
+        if not stack:
+            return {}
+        return {k: v for k, v in stack[-1].labels.items() if k in INHERITED_LABELS}
+
+    def _record(self, span: Span):
+        platform = span.labels.get("platform", "")
+        with self._lock:
+            self._durations[(span.name, platform)].append(span.duration)
+            self._sums[(span.name, platform)] += span.duration
+            self._counts[(span.name, platform, span.status)] += 1
+            if span.bytes and span.status == "ok":
+                self._bytes[platform] += span.bytes
+                if span.duration > 0:
+                    self._throughput[platform].append(span.bytes / span.duration)
+        if self.trace_enabled:
+            self._write_trace(span.to_record())
+
+    def _write_trace(self, record: Dict[str, Any]):
+        line = json.dumps(record, ensure_ascii=False, default=str) + "\n"
+        with self._lock:
+            try:
+                date = time.strftime("%Y-%m-%d")
+                if self._trace_date != date:
+                    if self._trace_file is not None:
+                        self._trace_file.close()
+                    self._trace_file = open(os.path.join(METRICS_DIR, f"trace-{date}.jsonl"), "a", encoding="utf-8")
+                    self._trace_date = date
+                self._trace_file.write(line)
+                self._trace_file.flush()
+            except OSError:
+                # Трасса вспомогательная: без неё загрузка должна продолжаться
+                self._trace_file = None
+                self._trace_date = None
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """Агрегаты: {"span/платформа": {"count", "p50", "p95", "p99"}, "throughput/платформа": {...}}"""
+        with self._lock:
+            durations = {k: list(v) for k, v in self._durations.items()}
+            throughput = {k: list(v) for k, v in self._throughput.items()}
+        result = {}
+        for (name, platform), values in sorted(durations.items()):
+            key = f"{name}/{platform}" if platform else name
+            result[key] = {"count": len(values), **{f"p{int(q * 100)}": percentile(values, q) for q in QUANTILES}}
+        for platform, values in sorted(throughput.items()):
+            result[f"throughput/{platform}"] = {
+                "count": len(values), **{f"p{int(q * 100)}": percentile(values, q) for q in QUANTILES}}
+        return result
+
+    def render_prometheus(self) -> str:
+        with self._lock:
+            durations = {k: list(v) for k, v in self._durations.items()}
+            throughput = {k: list(v) for k, v in self._throughput.items()}
+            sums = dict(self._sums)
+            counts = dict(self._counts)
+            total_bytes = dict(self._bytes)
+
+        lines = [
+            f"# HELP {PROM_PREFIX}_span_seconds Длительность этапов загрузки",
+            f"# TYPE {PROM_PREFIX}_span_seconds summary",
+        ]
+        for (name, platform), values in sorted(durations.items()):
+            labels = f'span="{name}",platform="{platform}"'
+            for q in QUANTILES:
+                lines.append(f'{PROM_PREFIX}_span_seconds{{{labels},quantile="{q}"}} {percentile(values, q):.6f}')
+            total = sum(n for (s, p, _), n in counts.items() if s == name and p == platform)
+            lines.append(f"{PROM_PREFIX}_span_seconds_sum{{{labels}}} {sums[(name, platform)]:.6f}")
+            lines.append(f"{PROM_PREFIX}_span_seconds_count{{{labels}}} {total}")
+
+        lines += [f"# HELP {PROM_PREFIX}_spans_total Число этапов по статусу",
+                  f"# TYPE {PROM_PREFIX}_spans_total counter"]
+        for (name, platform, status), n in sorted(counts.items()):
+            lines.append(f'{PROM_PREFIX}_spans_total{{span="{name}",platform="{platform}",status="{status}"}} {n}')
+
+        lines += [f"# HELP {PROM_PREFIX}_upload_bytes_total Отправлено байтов",
+                  f"# TYPE {PROM_PREFIX}_upload_bytes_total counter"]
+        for platform, n in sorted(total_bytes.items()):
+            lines.append(f'{PROM_PREFIX}_upload_bytes_total{{platform="{platform}"}} {n}')
+
+        lines += [f"# HELP {PROM_PREFIX}_throughput_bytes_per_second Скорость передачи",
+                  f"# TYPE {PROM_PREFIX}_throughput_bytes_per_second summary"]
+        for platform, values in sorted(throughput.items()):
+            for q in QUANTILES:
+                lines.append(f'{PROM_PREFIX}_throughput_bytes_per_second{{platform="{platform}",quantile="{q}"}} '
+                             f'{percentile(values, q):.0f}')
+        return "\n".join(lines) + "\n"
+
+    def flush(self):
+        """
+        Запись файла Prometheus (атомарно, чтобы коллектор не прочитал половину).
+        Ошибки записи не должны мешать загрузкам, поэтому не пробрасываются.
+        """
+        if not (self.enabled and self.prometheus_file):
+            return
+        path = os.path.join(METRICS_DIR, "uploader.prom")
+        tmp_path = path + ".tmp"
+        with self._flush_lock:
+            try:
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    f.write(self.render_prometheus())
+                os.replace(tmp_path, path)
+            except OSError:
+                pass
+
+    def serve(self, port: int, host: str = "127.0.0.1"):
+        """HTTP-эндпоинт /metrics в фоновом потоке"""
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.render_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self._server.serve_forever, name="metrics-http", daemon=True).start()
+
+    def close(self):
+        with self._lock:
+            if self._trace_file is not None:
+                self._trace_file.close()
+                self._trace_file = None
+                self._trace_date = None
+        if self._server is not None:
+            self._server.shutdown()
+            self._server = None
+
+
+# Общий реестр процесса; настройки — секция metrics в settings.json
+metrics = Metrics()
@@ -0,0 +1,101 @@
+"""
+Предварительная проверка видео под требования платформ
+
+Параметры файла берутся из core.probe, поэтому неподходящее видео
+отклоняется за миллисекунды, до отправки первого байта.
+"""
+
+from typing import Any, Dict, List
+
+from core.errors import UploadError, PERMANENT
+from core.probe import probe, ProbeError
+
+# Ограничения платформ; секция preflight.<платформа> в settings.json переопределяет ключи.
+# aspect — ширина/высота после учёта поворота (9:16 = 0.5625).
+PLATFORM_CONSTRAINTS = {
+    "youtube": {
+        "containers": ["mp4", "mov", "webm", "matroska"],
+        "max_duration": 180,
+        "max_aspect": 1.0,
+        "max_size_mb": 256 * 1024,
+    },
+    "instagram": {
+        "containers": ["mp4", "mov"],
+        "video_codecs": ["h264", "hevc"],
+        "min_duration": 3,
+        "max_duration": 900,
+        "min_aspect": 0.5,
+        "max_aspect": 1.0,
+        "max_size_mb": 1024,
+    },
+    "tiktok": {
+        "containers": ["mp4", "mov", "webm"],
+        "min_duration": 3,
+        "max_duration": 600,
+        "max_size_mb": 10 * 1024,
+    },
+}
+
+
+def constraints_for(platform: str, overrides: Dict[str, Any] = None) -> Dict[str, Any]:
+    constraints = dict(PLATFORM_CONSTRAINTS.get(platform, {}))
+    constraints.update((overrides or {}).get(platform, {}))
+    return constraints
+
+
+def check(info: Dict[str, Any], constraints: Dict[str, Any]) -> List[str]:
+    """
+    Сверка параметров файла с ограничениями платформы.
+
+    Returns:
+        List[str]: Нарушения; пустой список — файл подходит
+    """
+    problems = []
+    containers = constraints.get("containers")
+    if containers and info.get("container") not in containers:
+        problems.append(f"контейнер {info.get('container')} не поддерживается")
+
+    codecs = constraints.get("video_codecs")
+    if codecs and info.get("video_codec") not in codecs:
+        problems.append(f"видеокодек {info.get('video_codec')} не поддерживается")
+
+    duration = info.get("duration")
+    if duration is not None:
+        if duration < constraints.get("min_duration", 0):
+            problems.append(f"длительность {duration:.1f} с меньше {constraints['min_duration']} с")
+        if "max_duration" in constraints and duration > constraints["max_duration"]:
+            problems.append(f"длительность {duration:.1f} с больше {constraints['max_duration']} с")
+
+    width, height = info.get("width"), info.get("height")
+    if width and height:
+        aspect = width / height
+        if aspect < constraints.get("min_aspect", 0):
+            problems.append(f"соотношение сторон {width}x{height} слишком вытянуто по вертикали")
+        if "max_aspect" in constraints and aspect > constraints["max_aspect"]:
+            problems.append(f"соотношение сторон {width}x{height} не вертикальное")
+
+    max_size = constraints.get("max_size_mb")
+    if max_size and info.get("size", 0) > max_size * 1024 * 1024:
+        problems.append(f"размер больше {max_size} МБ")
+    return problems
+
+
+def preflight(video_path: str, platform: str, overrides: Dict[str, Any] = None) -> Dict[str, Any]:
+    """
+    Проверка файла перед загрузкой.
+
+    Returns:
+        Dict[str, Any]: Результат probe() для файла
+
+    Raises:
+        UploadError: (PERMANENT) если файл не подходит платформе или не разбирается
+    """
+    try:
+        info = probe(video_path)
+    except ProbeError as e:
+        raise UploadError(f"Предпроверка: {e}", PERMANENT)
+
+    problems = check(info, constraints_for(platform, overrides))
+    if problems:
+        raise UploadError(f"Предпроверка {platform}: " + "; ".join(problems), PERMANENT)
+    return info
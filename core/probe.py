@@ -0,0 +1,349 @@
+"""
+Быстрый разбор контейнеров MP4/MOV и WebM/Matroska
+
+Читаются только заголовки боксов верхнего уровня и содержимое moov
+(для WebM — элементы Info и Tracks), сами кадры не декодируются и не
+читаются. Результат кэшируется по (путь, размер, mtime). Чтение идёт через
+общий кэш core.readcache, поэтому прочитанные блоки затем отдаются загрузке.
+"""
+
+import os
+import struct
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from core.readcache import open_shared
+
+# moov больше этого размера считаем битым файлом, а не поводом читать гигабайты
+MAX_MOOV_SIZE = 256 * 1024 * 1024
+CACHE_SIZE = 256
+
+_CODEC_NAMES = {
+    "avc1": "h264", "avc3": "h264",
+    "hvc1": "hevc", "hev1": "hevc",
+    "av01": "av1", "vp09": "vp9", "vp08": "vp8",
+    "mp4v": "mpeg4", "mp4a": "aac", "ac-3": "ac3", "ec-3": "eac3", "Opus": "opus",
+    "V_MPEG4/ISO/AVC": "h264", "V_MPEGH/ISO/HEVC": "hevc", "V_VP8": "vp8", "V_VP9": "vp9",
+    "V_AV1": "av1", "A_OPUS": "opus", "A_VORBIS": "vorbis", "A_AAC": "aac",
+}
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+class ProbeError(Exception):
+    """Файл не удалось разобрать как поддерживаемый контейнер"""
+
+
+def probe(path: str) -> Dict[str, Any]:
+    """
+    Параметры видеофайла по заголовкам контейнера.
+
+    Returns:
+        Dict[str, Any]: container, duration (с), width, height (с учётом поворота),
+            rotation, video_codec, audio_codec, fps, bitrate (бит/с), size,
+            moov_offset, mdat_offset, faststart (moov перед mdat; None для WebM)
+
+    Raises:
+        ProbeError: Если формат не распознан или заголовки повреждены
+    """
+    st = os.stat(path)
+    key = (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return dict(_cache[key])
+
+    with open_shared(path) as f:
+        head = f.read(12)
+        f.seek(0)
+        try:
+            if head[:4] == b"\x1a\x45\xdf\xa3":
+                info = _probe_matroska(f, st.st_size)
+            elif head[4:8] in (b"ftyp", b"moov", b"mdat", b"free", b"wide", b"skip"):
+                info = _probe_mp4(f, st.st_size)
+            else:
+                raise ProbeError(f"Неизвестный формат контейнера: {path}")
+        except (struct.error, IndexError, ValueError) as e:
+            # Обрезанный файл: поле или таблица выходит за конец прочитанных данных
+            raise ProbeError(f"Повреждённые заголовки контейнера: {e}") from e
+
+    info["size"] = st.st_size
+    if info.get("duration"):
+        info["bitrate"] = int(st.st_size * 8 / info["duration"])
+    if info.get("rotation") in (90, 270):
+        info["width"], info["height"] = info["height"], info["width"]
+
+    with _cache_lock:
+        _cache[key] = info
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return dict(info)
+
+
+# --- MP4 / MOV -------------------------------------------------------------
+
+def _iter_boxes(data, start=0, end=None):
+    """Боксы внутри буфера: (тип, начало содержимого, конец бокса)"""
+    end = len(data) if end is None else end
+    pos = start
+    while pos + 8 <= end:
+        size, box_type = struct.unpack_from(">I4s", data, pos)
+        header = 8
+        if size == 1:
+            if pos + 16 > end:
+                raise ProbeError("Повреждённый бокс внутри moov")
+            size = struct.unpack_from(">Q", data, pos + 8)[0]
+            header = 16
+        elif size == 0:
+            size = end - pos
+        if size < header or pos + size > end:
+            raise ProbeError("Повреждённый бокс внутри moov")
+        yield box_type.decode("latin-1"), pos + header, pos + size
+        pos += size
+
+
+def _find(data, start, end, box_type):
+    for kind, body, box_end in _iter_boxes(data, start, end):
+        if kind == box_type:
+            return body, box_end
+    return None
+
+
+def _probe_mp4(f, file_size):
+    info = {"container": "mp4", "moov_offset": None, "mdat_offset": None}
+    moov = None
+    pos = 0
+    # Обход верхнего уровня: читаем только 16-байтовые заголовки и сам moov
+    while pos + 8 <= file_size:
+        f.seek(pos)
+        header = f.read(16)
+        if len(header) < 8:
+            break
+        size, box_type = struct.unpack_from(">I4s", header)
+        header_size = 8
+        if size == 1:
+            if len(header) < 16:
+                raise ProbeError("Обрезанный заголовок бокса")
+            size = struct.unpack_from(">Q", header, 8)[0]
+            header_size = 16
+        elif size == 0:
+            size = file_size - pos
+        if size < header_size:
+            raise ProbeError("Повреждённый заголовок бокса")
+
+        if box_type == b"ftyp":
+            brand = header[8:12]
+            if brand == b"qt  ":
+                info["container"] = "mov"
+        elif box_type == b"moov":
+            info["moov_offset"] = pos
+            if size > MAX_MOOV_SIZE:
+                raise ProbeError("Слишком большой moov")
+            f.seek(pos + header_size)
+            moov = f.read(size - header_size)
+        elif box_type == b"mdat" and info["mdat_offset"] is None:
+            info["mdat_offset"] = pos
+        pos += size
+
+    if moov is None:
+        raise ProbeError("В файле нет moov")
+    info["faststart"] = info["mdat_offset"] is None or info["moov_offset"] < info["mdat_offset"]
+
+    mvhd = _find(moov, 0, len(moov), "mvhd")
+    if mvhd:
+        body = mvhd[0]
+        if moov[body] == 1:
+            timescale, duration = struct.unpack_from(">IQ", moov, body + 20)
+        else:
+            timescale, duration = struct.unpack_from(">II", moov, body + 12)
+        if timescale:
+            info["duration"] = duration / timescale
+
+    for kind, body, end in _iter_boxes(moov):
+        if kind == "trak":
+            _parse_trak(moov, body, end, info)
+    return info
+
+
+def _parse_trak(data, start, end, info):
+    tkhd = _find(data, start, end, "tkhd")
+    mdia = _find(data, start, end, "mdia")
+    if not mdia:
+        return
+    hdlr = _find(data, mdia[0], mdia[1], "hdlr")
+    handler = data[hdlr[0] + 8:hdlr[0] + 12] if hdlr else b""
+    minf = _find(data, mdia[0], mdia[1], "minf")
+    stbl = _find(data, minf[0], minf[1], "stbl") if minf else None
+    stsd = _find(data, stbl[0], stbl[1], "stsd") if stbl else None
+    codec = None
+    if stsd and stsd[1] - stsd[0] >= 16:
+        codec = data[stsd[0] + 12:stsd[0] + 16].decode("latin-1")
+        codec = _CODEC_NAMES.get(codec, codec)
+
+    if handler == b"vide" and "video_codec" not in info:
+        info["video_codec"] = codec
+        if tkhd and tkhd[1] - tkhd[0] >= 84:
+            # Матрица и размеры стоят в конце tkhd: 36 байт матрицы, затем ширина и высота 16.16
+            matrix = struct.unpack_from(">9i", data, tkhd[1] - 44)
+            width, height = struct.unpack_from(">II", data, tkhd[1] - 8)
+            info["width"], info["height"] = width >> 16, height >> 16
+            info["rotation"] = _rotation(matrix[0], matrix[1])
+        mdhd = _find(data, mdia[0], mdia[1], "mdhd")
+        stts = _find(data, stbl[0], stbl[1], "stts") if stbl else None
+        if mdhd and stts:
+            body = mdhd[0]
+            if data[body] == 1:
+                timescale, duration = struct.unpack_from(">IQ", data, body + 20)
+            else:
+                timescale, duration = struct.unpack_from(">II", data, body + 12)
+            count = struct.unpack_from(">I", data, stts[0] + 4)[0]
+            if stts[0] + 8 + count * 8 > stts[1]:
+                raise ProbeError("Таблица stts выходит за границу бокса")
+            samples = sum(struct.unpack_from(">I", data, stts[0] + 8 + i * 8)[0] for i in range(count))
+            if timescale and duration:
+                info["fps"] = round(samples / (duration / timescale), 3)
+    elif handler == b"soun" and "audio_codec" not in info:
+        info["audio_codec"] = codec
+
+
+def _rotation(a, b):
+    one = 1 << 16
+    if a == 0 and b == one:
+        return 90
+    if a == 0 and b == -one:
+        return 270
+    if a == -one and b == 0:
+        return 180
+    return 0
+
+
+# --- WebM / Matroska -------------------------------------------------------
+
+_EBML_DOCTYPE = 0x4282
+_SEGMENT = 0x18538067
+_INFO = 0x1549A966
+_TRACKS = 0x1654AE6B
+_CLUSTER = 0x1F43B675
+_TIMECODE_SCALE = 0x2AD7B1
+_DURATION = 0x4489
+_TRACK_ENTRY = 0xAE
+_TRACK_TYPE = 0x83
+_CODEC_ID = 0x86
+_VIDEO = 0xE0
+_PIXEL_WIDTH = 0xB0
+_PIXEL_HEIGHT = 0xBA
+
+
+def _read_vint(f, keep_marker):
+    first = f.read(1)
+    if not first:
+        raise ProbeError("Неожиданный конец файла")
+    byte = first[0]
+    length = 1
+    mask = 0x80
+    while length <= 8 and not byte & mask:
+        mask >>= 1
+        length += 1
+    if length > 8:
+        raise ProbeError("Неверное EBML-число")
+    value = byte if keep_marker else byte & (mask - 1)
+    rest = f.read(length - 1)
+    all_ones = value == mask - 1 and rest == b"\xff" * (length - 1)
+    for b in rest:
+        value = (value << 8) | b
+    return value, length, (all_ones and not keep_marker)
+
+
+def _read_element(f):
+    element_id, id_len, _ = _read_vint(f, keep_marker=True)
+    size, size_len, unknown = _read_vint(f, keep_marker=False)
+    return element_id, None if unknown else size, id_len + size_len
+
+
+def _children(f, end):
+    while f.tell() < end:
+        element_id, size, _ = _read_element(f)
+        body = f.tell()
+        yield element_id, body, size
+        if size is None:
+            return
+        f.seek(body + size)
+
+
+def _uint(f, size):
+    return int.from_bytes(f.read(size), "big")
+
+
+def _probe_matroska(f, file_size):
+    info = {"container": "matroska", "moov_offset": None, "mdat_offset": None, "faststart": None}
+    for element_id, body, size in _children(f, file_size):
+        end = file_size if size is None else body + size
+        if element_id == 0x1A45DFA3:
+            for child, child_body, child_size in _children(f, end):
+                if child == _EBML_DOCTYPE:
+                    info["container"] = f.read(child_size).decode("ascii", "replace")
+        elif element_id == _SEGMENT:
+            _parse_segment(f, end, info)
+            break
+    if "duration" not in info and "width" not in info:
+        raise ProbeError("В Matroska нет Info/Tracks")
+    return info
+
+
+def _parse_segment(f, end, info):
+    timecode_scale = 1000000
+    raw_duration = None
+    for element_id, body, size in _children(f, end):
+        if element_id == _CLUSTER:
+            # Дальше идут кадры; Info и Tracks по стандарту стоят раньше
+            break
+        if size is None:
+            break
+        if element_id == _INFO:
+            for child, child_body, child_size in _children(f, body + size):
+                if child == _TIMECODE_SCALE:
+                    timecode_scale = _uint(f, child_size)
+                elif child == _DURATION:
+                    fmt = ">f" if child_size == 4 else ">d"
+                    raw_duration = struct.unpack(fmt, f.read(child_size))[0]
+        elif element_id == _TRACKS:
+            for child, child_body, child_size in _children(f, body + size):
+                if child == _TRACK_ENTRY and child_size is not None:
+                    _parse_track_entry(f, child_body + child_size, info)
+    if raw_duration is not None:
+        info["duration"] = raw_duration * timecode_scale / 1e9
+    info["rotation"] = 0
+
+
+def _parse_track_entry(f, end, info):
+    track = {}
+    for element_id, body, size in _children(f, end):
+        if element_id == _TRACK_TYPE:
+            track["type"] = _uint(f, size)
+        elif element_id == _CODEC_ID:
+            codec = f.read(size).rstrip(b"\x00").decode("ascii", "replace")
+            track["codec"] = _CODEC_NAMES.get(codec, codec)
+        elif element_id == _VIDEO:
+            for child, child_body, child_size in _children(f, body + size):
+                if child == _PIXEL_WIDTH:
+                    track["width"] = _uint(f, child_size)
+                elif child == _PIXEL_HEIGHT:
+                    track["height"] = _uint(f, child_size)
+    if track.get("type") == 1 and "video_codec" not in info:
+        info["video_codec"] = track.get("codec")
+        info["width"] = track.get("width")
+        info["height"] = track.get("height")
+    elif track.get("type") == 2 and "audio_codec" not in info:
+        info["audio_codec"] = track.get("codec")
+
+
+def describe(info: Optional[Dict[str, Any]]) -> str:
+    """Короткое описание результата для лога"""
+    if not info:
+        return "—"
+    duration = info.get("duration")
+    return (f"{info.get('container')} {info.get('width')}x{info.get('height')} "
+            f"{info.get('video_codec')}/{info.get('audio_codec')} "
+            f"{duration:.1f} с" if duration else f"{info.get('container')}")
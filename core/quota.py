@@ -0,0 +1,204 @@
+"""
+Учёт квоты YouTube Data API
+
+Каждый videos.insert стоит 1600 единиц из дневной квоты проекта Google
+(по умолчанию 10 000), а сутки квоты сбрасываются в полночь по
+тихоокеанскому времени. Раньше о превышении мы узнавали по ошибкам
+посреди серии. QuotaLedger ведёт локальный счёт единиц по проектам (каналы
+с одним client_secrets делят квоту проекта): планировщик не запускает
+задачу, на которую не хватит квоты с учётом уже идущих загрузок, а задачи
+проекта, исчерпавшего квоту, откладываются до сброса.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+try:
+    from zoneinfo import ZoneInfo
+    PACIFIC = ZoneInfo("America/Los_Angeles")
+except (ImportError, KeyError):  # Python 3.8 или нет базы часовых поясов (Windows без tzdata)
+    PACIFIC = None
+
+from core.config import LEDGER_DB
+
+# Стоимость одной загрузки в единицах квоты API
+UPLOAD_COSTS = {
+    "youtube": 1600,
+}
+
+# Причины 403, означающие, что дневная квота проекта кончилась
+QUOTA_REASONS = ("quotaExceeded", "dailyLimitExceeded")
+
+
+def _pacific_offset(utc: datetime) -> timedelta:
+    """Смещение от UTC по правилам летнего времени США (действуют с 2007 года)"""
+    # Летнее время: со второго воскресенья марта 2:00 PST до первого воскресенья ноября 2:00 PDT
+    march = datetime(utc.year, 3, 8, 10, tzinfo=timezone.utc)
+    start = march + timedelta(days=(6 - march.weekday()) % 7)
+    november = datetime(utc.year, 11, 1, 9, tzinfo=timezone.utc)
+    end = november + timedelta(days=(6 - november.weekday()) % 7)
+    return timedelta(hours=-7 if start <= utc < end else -8)
+
+
+def pacific_time(now: Optional[float] = None) -> datetime:
+    """Тихоокеанское время момента now (по умолчанию — сейчас)"""
+    utc = datetime.fromtimestamp(time.time() if now is None else now, timezone.utc)
+    if PACIFIC is not None:
+        return utc.astimezone(PACIFIC)
+    return (utc + _pacific_offset(utc)).replace(tzinfo=None)
+
+
+def quota_day(now: Optional[float] = None) -> str:
+    """Сутки квоты, к которым относится момент now"""
+    return pacific_time(now).date().isoformat()
+
+
+def next_reset(now: Optional[float] = None) -> float:
+    """Момент (unix time) ближайшего сброса квоты — полночь по тихоокеанскому времени"""
+    midnight = datetime.combine(pacific_time(now).date() + timedelta(days=1), datetime.min.time())
+    if PACIFIC is not None:
+        return midnight.replace(tzinfo=PACIFIC).timestamp()
+    local = midnight.replace(tzinfo=timezone.utc)
+    # Переход на летнее время бывает в 2:00, поэтому в полночь действует смещение по PST-оценке
+    return (local - _pacific_offset(local + timedelta(hours=8))).timestamp()
+
+
+def is_quota_error(message: str) -> bool:
+    return any(reason in message for reason in QUOTA_REASONS)
+
+
+@lru_cache(maxsize=64)
+def _client_project(client_secrets: str) -> Optional[str]:
+    try:
+        with open(client_secrets, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    client = data.get("installed") or data.get("web") or {}
+    return client.get("project_id") or client.get("client_id")
+
+
+class QuotaLedger:
+    """
+    Расход квоты по проектам за текущие сутки.
+
+    Запущенная задача резервирует стоимость загрузки (reserve), после
+    завершения резерв списывается в журнал (commit), если загрузчик отправил
+    платный запрос (ProgressTracker.mark_billed), иначе возвращается (refund). Настройки — в секции
+    платформы: daily_quota — единиц в сутки на проект (0 — без учёта).
+    """
+
+    def __init__(self, config, db_path: str = LEDGER_DB):
+        self.config = config
+        self._lock = threading.RLock()
+        self._reserved: Dict[int, tuple] = {}  # job id -> (проект, единицы)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS quota_usage ("
+            "project TEXT NOT NULL, day TEXT NOT NULL, units INTEGER NOT NULL DEFAULT 0, "
+            "PRIMARY KEY (project, day))"
+        )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def limit(self, platform: str) -> int:
+        if platform not in UPLOAD_COSTS:
+            return 0
+        return self.config.get_platform_settings(platform).get("daily_quota", 0)
+
+    def project(self, platform: str, account: str) -> str:
+        """Проект Google аккаунта (из client_secrets); без него квота считается на профиль"""
+        client_secrets = self.config.get_platform_creds(platform, account).get("client_secrets_file")
+        project = _client_project(client_secrets) if client_secrets else None
+        return f"{platform}:{project or account}"
+
+    def used(self, project: str, day: Optional[str] = None) -> int:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT units FROM quota_usage WHERE project = ? AND day = ?", (project, day or quota_day())
+            ).fetchone()
+        return row["units"] if row else 0
+
+    def _reserved_units(self, project: str) -> int:
+        return sum(units for reserved_project, units in self._reserved.values() if reserved_project == project)
+
+    def blocked_until(self, job: Dict[str, Any]) -> float:
+        """
+        Момент сброса квоты, если на задачу не хватит остатка суток даже без
+        идущих загрузок; 0 — квоты хватает (или платформа её не считает).
+        """
+        limit = self.limit(job["platform"])
+        if not limit:
+            return 0.0
+        if self.used(self.project(job["platform"], job["account"])) + UPLOAD_COSTS[job["platform"]] > limit:
+            return next_reset()
+        return 0.0
+
+    def can_reserve(self, job: Dict[str, Any]) -> bool:
+        """Хватит ли квоты с учётом резерва уже идущих загрузок проекта"""
+        limit = self.limit(job["platform"])
+        if not limit:
+            return True
+        project = self.project(job["platform"], job["account"])
+        with self._lock:
+            return self.used(project) + self._reserved_units(project) + UPLOAD_COSTS[job["platform"]] <= limit
+
+    def reserve(self, job: Dict[str, Any]) -> None:
+        if self.limit(job["platform"]):
+            with self._lock:
+                self._reserved[job["id"]] = (self.project(job["platform"], job["account"]),
+                                             UPLOAD_COSTS[job["platform"]])
+
+    def refund(self, job: Dict[str, Any]) -> None:
+        """Снятие резерва задачи, которая не дошла до API"""
+        with self._lock:
+            self._reserved.pop(job["id"], None)
+
+    def commit(self, job: Dict[str, Any]) -> None:
+        """Списание резерва завершённой задачи в журнал текущих суток"""
+        with self._lock:
+            reserved = self._reserved.pop(job["id"], None)
+            if reserved is None:
+                return
+            project, units = reserved
+            self._add(project, units, "units + ?")
+
+    def exhaust(self, job: Dict[str, Any]) -> float:
+        """
+        API ответило, что квота кончилась (её тратят и другие клиенты проекта):
+        до сброса проект считается исчерпанным.
+
+        Returns:
+            float: Секунд до сброса квоты
+        """
+        limit = self.limit(job["platform"])
+        if limit:
+            self._add(self.project(job["platform"], job["account"]), limit, "MAX(units, ?)")
+        return max(0.0, next_reset() - time.time())
+
+    def _add(self, project: str, units: int, expression: str):
+        # UPSERT появился только в SQLite 3.24, поэтому строка суток создаётся отдельно
+        day = quota_day()
+        with self._lock:
+            self._conn.execute("INSERT OR IGNORE INTO quota_usage (project, day) VALUES (?, ?)", (project, day))
+            self._conn.execute(f"UPDATE quota_usage SET units = {expression} WHERE project = ? AND day = ?",
+                               (units, project, day))
+
+    def usage(self) -> List[Dict[str, Any]]:
+        """Расход за текущие сутки по проектам"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT project, units FROM quota_usage WHERE day = ? ORDER BY project", (quota_day(),)
+            ).fetchall()
+        return [{"project": row["project"], "used": row["units"],
+                 "limit": self.limit(row["project"].split(":", 1)[0]), "reset": next_reset()}
+                for row in rows]
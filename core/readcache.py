@@ -0,0 +1,184 @@
+"""
+Общий кэш чтения видеофайлов
+
+Одно видео уходит на несколько платформ, и каждый этап (хэш, разбор
+заголовков, загрузка) читал файл с диска заново. Здесь файл читается
+блоками по BLOCK_SIZE, блоки лежат в общем LRU-кэше с ограничением по
+памяти, и все читатели одного файла получают их оттуда. Для коротких
+видео (Shorts/Reels/TikTok) файл целиком помещается в кэш, и диск читается
+примерно один раз на группу задач.
+
+Ключ кэша — (путь, размер, mtime_ns): изменённый файл читается заново.
+"""
+
+import io
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Tuple
+
+BLOCK_SIZE = 4 * 1024 * 1024
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+class _CachedFile:
+    """Открытый файл с числом читателей; дескриптор закрывается, когда читателей не осталось"""
+
+    def __init__(self, path: str, size: int):
+        self.path = path
+        self.size = size
+        self.refs = 0
+        self.handle = None
+        self.lock = threading.Lock()  # чтение с диска по одному блоку за раз
+
+
+class SharedReadCache:
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._files: Dict[Tuple[str, int, int], _CachedFile] = {}
+        self._blocks: "OrderedDict[Tuple[Tuple[str, int, int], int], bytes]" = OrderedDict()
+        self._cached_bytes = 0
+        self.disk_reads = 0
+
+    def configure(self, max_bytes: int):
+        with self._lock:
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def open(self, path: str) -> "SharedReader":
+        """Читатель файла через общий кэш; закрывать обязательно (лучше через with)"""
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        key = (path, st.st_size, st.st_mtime_ns)
+        with self._lock:
+            entry = self._files.get(key)
+            if entry is None:
+                entry = self._files[key] = _CachedFile(path, st.st_size)
+            entry.refs += 1
+        return SharedReader(self, key, entry)
+
+    def _release(self, key):
+        with self._lock:
+            entry = self._files.get(key)
+            if entry is None:
+                return
+            entry.refs -= 1
+            if entry.refs > 0:
+                return
+            handle, entry.handle = entry.handle, None
+        if handle is not None:
+            with entry.lock:
+                handle.close()
+
+    def block(self, key, entry: _CachedFile, index: int) -> bytes:
+        """Блок файла из кэша; при промахе читается с диска один раз для всех ожидающих"""
+        with self._lock:
+            data = self._blocks.get((key, index))
+            if data is not None:
+                self._blocks.move_to_end((key, index))
+                return data
+
+        with entry.lock:
+            # Пока ждали, блок мог прочитать соседний поток
+            with self._lock:
+                data = self._blocks.get((key, index))
+                if data is not None:
+                    self._blocks.move_to_end((key, index))
+                    return data
+            if entry.handle is None:
+                entry.handle = open(entry.path, "rb", buffering=0)
+            entry.handle.seek(index * BLOCK_SIZE)
+            data = entry.handle.read(BLOCK_SIZE)
+            self.disk_reads += 1
+
+        with self._lock:
+            if (key, index) not in self._blocks:
+                self._blocks[(key, index)] = data
+                self._cached_bytes += len(data)
+                self._evict()
+        return data
+
+    def _evict(self):
+        while self._cached_bytes > self.max_bytes and self._blocks:
+            _, data = self._blocks.popitem(last=False)
+            self._cached_bytes -= len(data)
+
+    def discard(self, path: str):
+        """Освобождение блоков файла, когда он больше не нужен ни одной задаче"""
+        path = os.path.abspath(path)
+        with self._lock:
+            for block_key in [k for k in self._blocks if k[0][0] == path]:
+                self._cached_bytes -= len(self._blocks.pop(block_key))
+            for key in [k for k, v in self._files.items() if k[0] == path and v.refs <= 0]:
+                del self._files[key]
+
+
+class SharedReader(io.RawIOBase):
+    """Файлоподобный объект только для чтения поверх SharedReadCache"""
+
+    def __init__(self, cache: SharedReadCache, key, entry: _CachedFile):
+        super().__init__()
+        self._cache = cache
+        self._key = key
+        self._entry = entry
+        self._pos = 0
+        self.name = entry.path
+
+    @property
+    def size(self) -> int:
+        return self._entry.size
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            offset += self._entry.size
+        if offset < 0:
+            raise ValueError("Отрицательная позиция")
+        self._pos = offset
+        return self._pos
+
+    def readinto(self, buffer):
+        view = memoryview(buffer).cast("B")
+        written = 0
+        while written < len(view) and self._pos < self._entry.size:
+            index, start = divmod(self._pos, BLOCK_SIZE)
+            data = self._cache.block(self._key, self._entry, index)
+            n = min(len(view) - written, len(data) - start)
+            if n <= 0:
+                break
+            view[written:written + n] = data[start:start + n]
+            written += n
+            self._pos += n
+        return written
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = max(0, self._entry.size - self._pos)
+        buffer = bytearray(size)
+        n = self.readinto(buffer)
+        del buffer[n:]
+        return bytes(buffer)
+
+    def close(self):
+        if not self.closed:
+            self._cache._release(self._key)
+        super().close()
+
+
+# Общий кэш процесса; размер задаётся секцией read_cache в settings.json
+shared_cache = SharedReadCache()
+
+
+def open_shared(path: str) -> SharedReader:
+    return shared_cache.open(path)
@@ -0,0 +1,284 @@
+"""
+Планировщик задач с лимитами по платформам и аккаунтам
+
+Для каждой платформы и каждого аккаунта задаются предел одновременных
+загрузок и token bucket на частоту запусков. Движок забирает из очереди
+первую задачу, которую планировщик разрешает запустить прямо сейчас, так что
+задача, упёршаяся в лимит одной платформы, не держит задачи других. Для
+платформ с квотой API (YouTube) учитывается и остаток квоты проекта.
+
+Порядок, в котором рассматриваются задачи, задаёт Scheduler.order():
+приоритет, срок публикации, оценка времени загрузки по измеренной скорости
+платформы.
+"""
+
+import threading
+import time
+from typing import Any, Dict, Tuple
+
+# Скорость платформы, пока не завершилась ни одна загрузка (байт/с)
+DEFAULT_THROUGHPUT = 2 * 1024 * 1024
+# Вес новой загрузки в сглаженной скорости платформы
+THROUGHPUT_SMOOTHING = 0.3
+
+
+class TokenBucket:
+    """
+    Token bucket: rate_per_hour токенов в час, не больше burst в запасе.
+    Нулевой rate_per_hour — без ограничения.
+    """
+
+    def __init__(self, rate_per_hour: float, burst: int = 1):
+        self.rate = rate_per_hour / 3600.0
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def available(self) -> bool:
+        if not self.rate:
+            return True
+        self._refill()
+        return self.tokens >= 1
+
+    def consume(self) -> None:
+        if self.rate:
+            self._refill()
+            self.tokens -= 1
+
+    def refund(self) -> None:
+        """Возврат токена задачи, которая так и не обратилась к платформе"""
+        if self.rate:
+            self.tokens = min(self.capacity, self.tokens + 1)
+
+    def wait_time(self) -> float:
+        """Через сколько секунд появится токен"""
+        if not self.rate:
+            return 0.0
+        self._refill()
+        return max(0.0, (1 - self.tokens) / self.rate)
+
+
+class _Limit:
+    def __init__(self, concurrency: int, rate_per_hour: float, burst: int):
+        self.concurrency = concurrency
+        self.bucket = TokenBucket(rate_per_hour, burst)
+        self.running = 0
+
+    def can_start(self) -> bool:
+        return (not self.concurrency or self.running < self.concurrency) and self.bucket.available()
+
+
+class CircuitBreaker:
+    """
+    Предохранитель платформы.
+
+    После failure_threshold сбоев подряд платформа «размыкается» на cooldown
+    секунд, и её задачи не запускаются. Затем пропускается одна пробная
+    задача: успех замыкает цепь, сбой размыкает её снова на удвоенный срок
+    (не больше max_cooldown). Проба, завершившаяся без вердикта о платформе
+    (ошибка аккаунта, пропуск, отказ предпроверки), уступает место следующей.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold=3, cooldown=60, max_cooldown=1800):
+        self.failure_threshold = failure_threshold
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.cooldown = cooldown
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probing = False
+
+    def allows(self) -> bool:
+        if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.cooldown:
+            self.state = self.HALF_OPEN
+            self.probing = False
+        if self.state == self.HALF_OPEN:
+            return not self.probing
+        return self.state == self.CLOSED
+
+    def on_start(self) -> bool:
+        """Учёт запуска задачи; True, если она — пробная"""
+        if self.state == self.HALF_OPEN:
+            self.probing = True
+            return True
+        return False
+
+    def end_probe(self):
+        """Пробная задача завершилась, не вызвав record_success/record_failure"""
+        if self.state == self.HALF_OPEN:
+            self.probing = False
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.failures = 0
+        self.cooldown = self.base_cooldown
+        self.probing = False
+
+    def record_failure(self) -> bool:
+        """Учёт сбоя; True, если предохранитель только что разомкнулся"""
+        self.failures += 1
+        if self.state == self.HALF_OPEN:
+            self.cooldown = min(self.max_cooldown, self.cooldown * 2)
+        elif self.failures < self.failure_threshold:
+            return False
+        self.state = self.OPEN
+        self.opened_at = time.monotonic()
+        self.probing = False
+        return True
+
+    def wait_time(self) -> float:
+        if self.state != self.OPEN:
+            return 0.0
+        return max(0.0, self.cooldown - (time.monotonic() - self.opened_at))
+
+
+class Scheduler:
+    """
+    Учёт лимитов платформ и аккаунтов.
+
+    Настройки берутся из секции платформы в settings.json:
+    concurrency, rate_per_hour, burst — на платформу целиком,
+    account_concurrency, account_rate_per_hour, account_burst — на каждый аккаунт.
+    Нулевое значение означает отсутствие ограничения.
+    """
+
+    def __init__(self, config, quota=None):
+        self.config = config
+        self.quota = quota  # QuotaLedger: резерв квоты API на время загрузки
+        self._lock = threading.Lock()
+        self._platforms: Dict[str, _Limit] = {}
+        self._accounts: Dict[Tuple[str, str], _Limit] = {}
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._throughput: Dict[str, float] = {}  # платформа -> байт/с
+
+    def breaker(self, platform) -> CircuitBreaker:
+        if platform not in self._breakers:
+            settings = self.config.settings.get("circuit_breaker", {})
+            self._breakers[platform] = CircuitBreaker(
+                settings.get("failure_threshold", 3),
+                settings.get("cooldown", 60),
+                settings.get("max_cooldown", 1800),
+            )
+        return self._breakers[platform]
+
+    def _platform(self, platform) -> _Limit:
+        if platform not in self._platforms:
+            settings = self.config.get_platform_settings(platform)
+            self._platforms[platform] = _Limit(
+                settings.get("concurrency", 0),
+                settings.get("rate_per_hour", 0),
+                settings.get("burst", 1),
+            )
+        return self._platforms[platform]
+
+    def _account(self, platform, account) -> _Limit:
+        key = (platform, account)
+        if key not in self._accounts:
+            settings = self.config.get_platform_settings(platform)
+            self._accounts[key] = _Limit(
+                settings.get("account_concurrency", 0),
+                settings.get("account_rate_per_hour", 0),
+                settings.get("account_burst", 1),
+            )
+        return self._accounts[key]
+
+    def can_start(self, job: Dict[str, Any]) -> bool:
+        with self._lock:
+            return (self.breaker(job["platform"]).allows()
+                    and self._platform(job["platform"]).can_start()
+                    and self._account(job["platform"], job["account"]).can_start()
+                    and (self.quota is None or self.quota.can_reserve(job)))
+
+    def acquire(self, job: Dict[str, Any]) -> None:
+        with self._lock:
+            job["breaker_probe"] = self.breaker(job["platform"]).on_start()
+            for limit in (self._platform(job["platform"]), self._account(job["platform"], job["account"])):
+                limit.running += 1
+                limit.bucket.consume()
+            if self.quota is not None:
+                self.quota.reserve(job)
+
+    def release(self, job: Dict[str, Any]) -> None:
+        with self._lock:
+            for limit in (self._platform(job["platform"]), self._account(job["platform"], job["account"])):
+                limit.running -= 1
+            if job.get("breaker_probe"):
+                self.breaker(job["platform"]).end_probe()
+            if self.quota is not None:
+                # Квоту расходует только отправленный запрос: задача, упавшая раньше
+                # (SDK, OAuth, подготовка файла), резерв возвращает
+                if job.get("billed"):
+                    self.quota.commit(job)
+                else:
+                    self.quota.refund(job)
+
+    def refund(self, job: Dict[str, Any]) -> None:
+        with self._lock:
+            for limit in (self._platform(job["platform"]), self._account(job["platform"], job["account"])):
+                limit.bucket.refund()
+            if self.quota is not None:
+                self.quota.refund(job)
+
+    def record_success(self, platform: str) -> None:
+        with self._lock:
+            self.breaker(platform).record_success()
+
+    def record_failure(self, platform: str) -> float:
+        """
+        Учёт сбоя платформы.
+
+        Returns:
+            float: Пауза в секундах, если предохранитель разомкнулся, иначе 0
+        """
+        with self._lock:
+            breaker = self.breaker(platform)
+            return breaker.cooldown if breaker.record_failure() else 0.0
+
+    def record_throughput(self, platform: str, nbytes: int, seconds: float) -> None:
+        """Учёт завершённой загрузки: nbytes за seconds (вместе с авторизацией и обработкой)"""
+        if nbytes <= 0 or seconds <= 0:
+            return
+        rate = nbytes / seconds
+        with self._lock:
+            previous = self._throughput.get(platform)
+            self._throughput[platform] = rate if previous is None else (
+                THROUGHPUT_SMOOTHING * rate + (1 - THROUGHPUT_SMOOTHING) * previous)
+
+    def estimate(self, platform: str, nbytes: int) -> float:
+        """Оценка времени загрузки nbytes на платформу, в секундах"""
+        return nbytes / self._throughput.get(platform, DEFAULT_THROUGHPUT)
+
+    def order(self, job: Dict[str, Any]) -> tuple:
+        """
+        Ключ выбора следующей задачи: больший приоритет, затем более ранний
+        срок публикации, затем более короткая загрузка, затем порядок постановки.
+        Приоритет и срок очередь сортирует сама (core.job_queue._CLAIM_ORDER),
+        ключ уточняет порядок внутри прочитанной пачки задач.
+        """
+        deadline = job["publish_at"] or float("inf")
+        return -job["priority"], deadline, self.estimate(job["platform"], job["size"]), job["id"]
+
+    def next_ready_in(self, default: float) -> float:
+        """
+        Через сколько секунд стоит снова заглянуть в очередь: ближайшее
+        пополнение token bucket у лимита, упёршегося только в частоту,
+        или замыкание предохранителя.
+        """
+        with self._lock:
+            waits = [limit.bucket.wait_time()
+                     for limit in (*self._platforms.values(), *self._accounts.values())
+                     if not limit.bucket.available()
+                     and (not limit.concurrency or limit.running < limit.concurrency)]
+            waits += [breaker.wait_time() for breaker in self._breakers.values()]
+        waits = [w for w in waits if w > 0]
+        return min([default, *waits])
@@ -0,0 +1,123 @@
+"""
+Прогрев сессий платформ
+
+Авторизация шла внутри загрузки: обновление токена YouTube, вход в
+Instagram, проверка cookies TikTok занимали рабочий поток в начале каждой
+задачи. SessionManager делает это заранее и параллельно для всех
+настроенных аккаунтов всех платформ — при запуске, при старте очереди и затем каждые
+refresh_interval секунд, так что задача сразу начинает передавать байты,
+а проблемы с доступом видны до загрузки.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+from core.config import DEFAULT_ACCOUNT
+from core.errors import classify
+from core.metrics import metrics
+from core.utils import account_label
+from uploaders import PLATFORMS
+
+SESSION_OK = "ok"
+SESSION_ERROR = "error"
+SESSION_CHECKING = "checking"
+SESSION_MISSING = "missing"
+
+# Без этих полей платформа считается не настроенной и не прогревается
+REQUIRED_CREDENTIALS = {
+    "youtube": "client_secrets_file",
+    "tiktok": "cookies_file",
+    "instagram": "username",
+}
+
+
+class SessionManager:
+    def __init__(self, config, uploader_for, events):
+        self.config = config
+        self.settings = config.settings["sessions"]
+        self.uploader_for = uploader_for
+        self.events = events
+        self._executor = ThreadPoolExecutor(max_workers=len(PLATFORMS), thread_name_prefix="warm-up")
+        self._lock = threading.Lock()
+        self._running = {}  # (платформа, аккаунт) -> future текущего прогрева
+        self._last_round = 0.0
+        self._status: Dict[tuple, Dict[str, Any]] = {}
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Прогрев сейчас и затем каждые refresh_interval секунд"""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._loop, name="session-refresh", daemon=True)
+        self._thread.start()
+
+    def _loop(self):
+        interval = self.settings.get("refresh_interval", 600)
+        while not self._stopping.is_set():
+            self.warm_up(force=True)
+            if not interval or self._stopping.wait(interval):
+                break
+
+    def warm_up(self, platforms=None, force=False, interactive=False):
+        """
+        Прогрев платформ в фоне (без ожидания). Без force повторный прогрев
+        чаще min_interval секунд пропускается. interactive разрешает вход
+        через браузер (OAuth YouTube) — только по действию пользователя.
+        """
+        with self._lock:
+            if not force and time.time() - self._last_round < self.settings.get("min_interval", 60):
+                return
+            self._last_round = time.time()
+        for platform in platforms or PLATFORMS:
+            for account in self.config.get_accounts(platform) or [DEFAULT_ACCOUNT]:
+                credentials = self.config.get_platform_creds(platform, account)
+                if not credentials.get(REQUIRED_CREDENTIALS[platform]):
+                    self._set_status(platform, account, SESSION_MISSING, "учётные данные не заданы")
+                    continue
+                with self._lock:
+                    running = self._running.get((platform, account))
+                    if running is not None and not running.done():
+                        continue
+                    if self._stopping.is_set():
+                        return
+                    self._running[(platform, account)] = self._executor.submit(
+                        self._warm_up, platform, account, credentials, interactive)
+
+    def _warm_up(self, platform, account, credentials, interactive):
+        self._set_status(platform, account, SESSION_CHECKING, "проверка...")
+        # Токены, которые истекут до следующего прогрева, обновляются сейчас
+        horizon = self.settings.get("refresh_interval", 600)
+        try:
+            with metrics.span("warm_up", platform=platform, account=account):
+                uploader = self.uploader_for(platform)
+                ok, message = uploader.warm_up(credentials, log_fn=self.events.on_log, horizon=horizon,
+                                               interactive=interactive)
+        except Exception as e:
+            kind, _ = classify(e)
+            ok, message = False, f"{e} ({kind})"
+        self._set_status(platform, account, SESSION_OK if ok else SESSION_ERROR, message)
+        if not ok:
+            self.events.on_log(f"🔑 {account_label(platform, account)}: {message}")
+
+    def _set_status(self, platform, account, state, message):
+        status = {"account": account, "state": state, "message": message, "checked_at": time.time()}
+        with self._lock:
+            self._status[(platform, account)] = status
+        self.events.on_session_status(platform, dict(status))
+
+    def status(self, platform: str, account: str = DEFAULT_ACCOUNT) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            status = self._status.get((platform, account))
+        return dict(status) if status else None
+
+    def stop(self):
+        self._stopping.set()
+        with self._lock:
+            futures = list(self._running.values())
+        # cancel_futures у shutdown() появился только в Python 3.9
+        for future in futures:
+            future.cancel()
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,176 @@
+"""
+Локальная копия видео с сетевого диска
+
+Если видео лежат на NFS/SMB, каждая платформа читает их по сети. Кэш
+заранее копирует видео ближайших задач очереди в STAGING_DIR, и дальше
+все этапы (хэш, проверка, загрузка) работают с локальной копией.
+
+Размер кэша ограничен max_gb; при нехватке места удаляются давно
+использованные копии, которые сейчас не нужны ни одной выполняющейся
+задаче. Копия удаляется, когда видео завершено на всех платформах.
+"""
+
+import hashlib
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+from core.config import STAGING_DIR
+
+
+class StagingCache:
+    def __init__(self, settings: Dict[str, Any]):
+        self.settings = settings
+        self.max_bytes = int(settings.get("max_gb", 20) * 1024 ** 3)
+        self.prefixes = [os.path.abspath(p) for p in settings.get("paths", [])]
+        # Один поток копирования: параллельное чтение с сетевого диска только мешает
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="staging")
+        self._lock = threading.Lock()
+        self._entries = {}  # путь исходника -> {"path", "refs", "future"}
+
+    def wants(self, video_path: str) -> bool:
+        """Нужно ли копировать видео: при заданных paths — только файлы из этих каталогов"""
+        if not self.prefixes:
+            return True
+        path = os.path.abspath(video_path)
+        return any(path == p or path.startswith(p + os.sep) for p in self.prefixes)
+
+    @staticmethod
+    def staged_path(video_path: str) -> str:
+        st = os.stat(video_path)
+        key = f"{os.path.abspath(video_path)}|{st.st_size}|{st.st_mtime_ns}"
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:12]
+        stem, ext = os.path.splitext(os.path.basename(video_path))
+        return os.path.join(STAGING_DIR, f"{stem}.{digest}{ext}")
+
+    def prefetch(self, video_path: str):
+        """Постановка копирования в очередь без ожидания"""
+        return self._submit(video_path, pin=False)
+
+    def _submit(self, video_path: str, pin: bool):
+        if not self.wants(video_path):
+            return None
+        video_path = os.path.abspath(video_path)
+        try:
+            dst = self.staged_path(video_path)
+        except OSError:
+            return None
+        with self._lock:
+            entry = self._entries.get(video_path)
+            future = entry["future"] if entry is not None and entry["path"] == dst else None
+            if future is None or (future.done() and future.exception() is not None):
+                future = self._executor.submit(self._copy, video_path, dst)
+                entry = self._entries[video_path] = {"path": dst, "refs": entry["refs"] if entry else 0,
+                                                     "future": future}
+            if pin:
+                entry["refs"] += 1
+            return future
+
+    def acquire(self, video_path: str) -> str:
+        """
+        Путь, с которого задаче читать видео. Ждёт окончания копирования;
+        если копия невозможна (нет места, ошибка), возвращает исходный путь.
+        Каждый acquire() должен завершаться release().
+        """
+        future = self._submit(video_path, pin=True)
+        if future is None:
+            return video_path
+        try:
+            staged = future.result()
+        except OSError:
+            return video_path
+        if staged is None:
+            return video_path
+        # Отметка использования для LRU; mtime не трогаем — по нему кэшируется хэш
+        st = os.stat(staged)
+        os.utime(staged, ns=(time.time_ns(), st.st_mtime_ns))
+        return staged
+
+    def ready(self, video_path: str) -> Optional[str]:
+        """Путь готовой копии или None, если копирование ещё не закончено"""
+        with self._lock:
+            entry = self._entries.get(os.path.abspath(video_path))
+        if entry is None or not entry["future"].done() or entry["future"].exception() is not None:
+            return None
+        return entry["future"].result()
+
+    def release(self, video_path: str):
+        with self._lock:
+            entry = self._entries.get(os.path.abspath(video_path))
+            if entry is not None and entry["refs"] > 0:
+                entry["refs"] -= 1
+
+    def discard(self, video_path: str):
+        """Удаление копии, когда видео больше не ждёт ни одна задача"""
+        with self._lock:
+            entry = self._entries.get(os.path.abspath(video_path))
+            if entry is None or entry["refs"] > 0:
+                return
+            del self._entries[os.path.abspath(video_path)]
+        entry["future"].add_done_callback(lambda _: self._remove(entry["path"]))
+
+    def _copy(self, video_path: str, dst: str) -> Optional[str]:
+        st = os.stat(video_path)
+        size = st.st_size
+        if os.path.exists(dst) and os.path.getsize(dst) == size:
+            return dst
+        if not self._make_room(size):
+            return None
+        tmp_path = dst + ".part"
+        try:
+            shutil.copyfile(video_path, tmp_path)
+            # mtime исходника: хэш копии берётся из кэша журнала по (путь, размер, mtime);
+            # время доступа — текущее, по нему вытесняются старые копии
+            os.utime(tmp_path, ns=(time.time_ns(), st.st_mtime_ns))
+            os.replace(tmp_path, dst)
+        except OSError:
+            self._remove(tmp_path)
+            raise
+        return dst
+
+    def _make_room(self, size: int) -> bool:
+        """
+        Вытеснение давно использованных копий (по времени доступа), включая
+        оставшиеся от прошлых запусков. False, если места всё равно не хватает.
+        """
+        with self._lock:
+            busy = {e["path"] for e in self._entries.values() if e["refs"] > 0 or not e["future"].done()}
+        files = []
+        for name in os.listdir(STAGING_DIR):
+            path = os.path.join(STAGING_DIR, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            files.append((st.st_atime, st.st_size, path))
+
+        used = sum(file_size for _, file_size, _ in files)
+        for _, file_size, path in sorted(files):
+            if used + size <= self.max_bytes:
+                break
+            if path in busy:
+                continue
+            self._remove(path)
+            used -= file_size
+            with self._lock:
+                for src in [src for src, e in self._entries.items() if e["path"] == path]:
+                    del self._entries[src]
+        return used + size <= self.max_bytes
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def shutdown(self):
+        with self._lock:
+            futures = [entry["future"] for entry in self._entries.values()]
+        # cancel_futures у shutdown() появился только в Python 3.9
+        for future in futures:
+            future.cancel()
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,241 @@
+"""
+Перекодирование под платформу через ffmpeg
+
+Мастер-файлы в 4K и с высоким битрейтом платформы всё равно пережимают,
+поэтому перед загрузкой можно сделать версию под профиль платформы
+(разрешение, битрейт) и отправить её — это в разы меньше байт.
+
+Версии кэшируются по хэшу содержимого исходника и параметрам профиля:
+одинаковый профиль разных аккаунтов и платформ даёт один файл. Одновременно
+работает не больше workers процессов ffmpeg. Версии, которые ждут или
+загружают задачи, из кэша не вытесняются.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+from core.config import RENDITIONS_DIR
+from core.probe import probe, ProbeError
+
+# Целевые профили: вписать в width x height, ограничить битрейт и частоту кадров
+TRANSCODE_PROFILES = {
+    "youtube": {"width": 1080, "height": 1920, "video_bitrate": 12000, "audio_bitrate": 192, "max_fps": 60},
+    "instagram": {"width": 1080, "height": 1920, "video_bitrate": 6000, "audio_bitrate": 128, "max_fps": 30},
+    "tiktok": {"width": 1080, "height": 1920, "video_bitrate": 6000, "audio_bitrate": 128, "max_fps": 30},
+}
+
+# Допуск: исходник с битрейтом до cap * (1 + TOLERANCE) не перекодируем
+BITRATE_TOLERANCE = 0.15
+
+
+class TranscodeError(Exception):
+    pass
+
+
+def profile_key(profile: Dict[str, Any]) -> str:
+    return hashlib.sha1(json.dumps(profile, sort_keys=True).encode("utf-8")).hexdigest()[:10]
+
+
+def needs_transcode(info: Dict[str, Any], profile: Dict[str, Any]) -> bool:
+    """Превышает ли исходник профиль по разрешению, битрейту или fps"""
+    width, height = info.get("width") or 0, info.get("height") or 0
+    # Профиль задан для вертикального кадра; горизонтальный сравниваем с повёрнутой рамкой
+    box_w, box_h = profile["width"], profile["height"]
+    if width > height:
+        box_w, box_h = box_h, box_w
+    if width > box_w or height > box_h:
+        return True
+    cap = (profile["video_bitrate"] + profile["audio_bitrate"]) * 1000
+    if (info.get("bitrate") or 0) > cap * (1 + BITRATE_TOLERANCE):
+        return True
+    if (info.get("fps") or 0) > profile["max_fps"] + 0.5:
+        return True
+    return info.get("video_codec") not in ("h264", "hevc")
+
+
+def build_command(ffmpeg: str, src: str, dst: str, profile: Dict[str, Any],
+                  preset: str = "veryfast", threads: int = 0):
+    w, h = profile["width"], profile["height"]
+    vb, ab = profile["video_bitrate"], profile["audio_bitrate"]
+    # Вписываем в рамку (для горизонтального кадра — в повёрнутую), не увеличивая
+    scale = (f"scale='if(gt(iw,ih),min({h},iw),min({w},iw))':'if(gt(iw,ih),min({w},ih),min({h},ih))'"
+             f":force_original_aspect_ratio=decrease:force_divisible_by=2")
+    return [
+        ffmpeg, "-hide_banner", "-loglevel", "error", "-nostdin", "-y", "-i", src,
+        "-vf", scale,
+        "-fpsmax", str(profile["max_fps"]),
+        "-c:v", "libx264", "-preset", preset, "-pix_fmt", "yuv420p",
+        "-b:v", f"{vb}k", "-maxrate", f"{vb}k", "-bufsize", f"{vb * 2}k",
+        "-c:a", "aac", "-b:a", f"{ab}k",
+        "-threads", str(threads),
+        "-movflags", "+faststart",
+        dst,
+    ]
+
+
+class TranscodeStage:
+    """
+    Очередь перекодирования с ограниченным числом одновременных ffmpeg.
+
+    prefetch() ставит версию в работу заранее, render() ждёт готовую —
+    так загрузка готовых версий идёт параллельно с кодированием следующих.
+    Версия закреплена, пока её держит заготовка prefetch() или задача:
+    каждый render() должен завершаться release().
+    """
+
+    def __init__(self, settings: Dict[str, Any], file_hash):
+        self.settings = settings
+        self.file_hash = file_hash
+        cpus = os.cpu_count() or 2
+        self.workers = settings.get("workers") or max(1, cpus // 4)
+        self.threads = max(1, cpus // self.workers)
+        self.ffmpeg = shutil.which(settings.get("ffmpeg", "ffmpeg"))
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="ffmpeg")
+        self._lock = threading.Lock()
+        self._futures = {}
+        self._processes = set()
+        self._refs = {}  # путь версии -> число заготовок и задач, которые её держат
+
+    def profile_for(self, platform: str) -> Optional[Dict[str, Any]]:
+        profile = dict(TRANSCODE_PROFILES.get(platform, {}))
+        profile.update(self.settings.get("profiles", {}).get(platform, {}))
+        return profile or None
+
+    def prefetch(self, video_path: str, platform: str, source: Optional[str] = None):
+        """
+        Постановка перекодирования в очередь без ожидания. source — откуда
+        читать (например, локальная копия видео), по умолчанию сам video_path.
+        """
+        profile = self.profile_for(platform)
+        if profile is None or self.ffmpeg is None:
+            return None
+        key = (os.path.abspath(video_path), profile_key(profile))
+        with self._lock:
+            future = self._futures.get(key)
+            if future is None or (future.done() and future.exception() is not None):
+                future = self._futures[key] = self._executor.submit(self._render, source or video_path, profile)
+            return future
+
+    def render(self, video_path: str, platform: str, source: Optional[str] = None) -> str:
+        """
+        Путь к версии под платформу (или к source, если перекодировать не нужно).
+
+        Raises:
+            TranscodeError: Если ffmpeg не найден или завершился с ошибкой
+        """
+        if self.ffmpeg is None:
+            raise TranscodeError("ffmpeg не найден в PATH")
+        future = self.prefetch(video_path, platform, source)
+        if future is None:
+            return source or video_path
+        try:
+            path = future.result()
+            if os.path.dirname(path) == RENDITIONS_DIR:
+                self._pin(path)
+            return path
+        finally:
+            # Готовый файл дальше находится через кэш на диске
+            with self._lock:
+                keys = [key for key, value in self._futures.items() if value is future]
+                for key in keys:
+                    del self._futures[key]
+            if keys and not future.cancelled() and future.exception() is None:
+                # Дальше версию держат только задачи, дождавшиеся её
+                self.release(future.result())
+
+    def _pin(self, path: str):
+        with self._lock:
+            self._refs[path] = self._refs.get(path, 0) + 1
+
+    def release(self, path: str):
+        """Версия больше не нужна задаче; пути, которые не являются версиями, игнорируются"""
+        with self._lock:
+            refs = self._refs.get(path)
+            if refs is None:
+                return
+            if refs > 1:
+                self._refs[path] = refs - 1
+            else:
+                del self._refs[path]
+
+    def _render(self, video_path: str, profile: Dict[str, Any]) -> str:
+        try:
+            info = probe(video_path)
+        except ProbeError:
+            info = {}
+        if info and not needs_transcode(info, profile):
+            return video_path
+
+        content_hash = self.file_hash(video_path)
+        dst = os.path.join(RENDITIONS_DIR, f"{content_hash[:16]}-{profile_key(profile)}.mp4")
+        if os.path.exists(dst):
+            os.utime(dst)  # отметка использования для LRU
+            self._pin(dst)
+            return dst
+
+        tmp_path = dst + ".part.mp4"
+        cmd = build_command(self.ffmpeg, video_path, tmp_path, profile,
+                            self.settings.get("preset", "veryfast"), self.threads)
+        proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        with self._lock:
+            self._processes.add(proc)
+        try:
+            _, stderr = proc.communicate()
+        finally:
+            with self._lock:
+                self._processes.discard(proc)
+        if proc.returncode != 0:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            message = stderr.decode("utf-8", "replace").strip().splitlines()
+            raise TranscodeError(message[-1] if message else f"ffmpeg завершился с кодом {proc.returncode}")
+        os.replace(tmp_path, dst)
+        self._pin(dst)
+        self._evict()
+        return dst
+
+    def _evict(self):
+        """Удаление самых давно использованных версий сверх cache_max_gb, кроме закреплённых"""
+        limit = self.settings.get("cache_max_gb", 50) * 1024 ** 3
+        with self._lock:
+            pinned = set(self._refs)
+        entries = []
+        for name in os.listdir(RENDITIONS_DIR):
+            if name.endswith(".part.mp4"):
+                continue
+            path = os.path.join(RENDITIONS_DIR, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= limit:
+                break
+            if path in pinned:
+                continue
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+    def shutdown(self):
+        with self._lock:
+            processes = list(self._processes)
+            futures = list(self._futures.values())
+        # cancel_futures у shutdown() появился только в Python 3.9
+        for future in futures:
+            future.cancel()
+        for proc in processes:
+            proc.terminate()
+        self._executor.shutdown(wait=True)
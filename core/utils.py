@@ -1,5 +1,26 @@
 import mimetypes
 
+from core.config import DEFAULT_ACCOUNT
+
 def guess_mime_type(file_path):
     mime_type, _ = mimetypes.guess_type(file_path)
     return mime_type or "video/*"
+
+def format_bytes(num):
+    for unit in ("Б", "КБ", "МБ", "ГБ"):
+        if abs(num) < 1024 or unit == "ГБ":
+            return f"{num:.1f} {unit}" if unit != "Б" else f"{int(num)} {unit}"
+        num /= 1024
+
+def format_eta(seconds):
+    if seconds is None:
+        return "—"
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}ч {seconds % 3600 // 60:02d}м"
+    return f"{seconds // 60}:{seconds % 60:02d}"
+
+def account_label(platform, account=DEFAULT_ACCOUNT):
+    """Платформа и (если это не профиль default) аккаунт — для сообщений лога"""
+    name = platform.capitalize()
+    return name if account == DEFAULT_ACCOUNT else f"{name} [{account}]"
@@ -1,103 +1,79 @@
-from PyQt6.QtCore import QThread, pyqtSignal, QMutex, QWaitCondition
-from PyQt6.QtWidgets import QApplication
-import threading
-from concurrent.futures import ThreadPoolExecutor, as_completed
-import time
+from PyQt6.QtCore import QThread, pyqtSignal
 
-from uploaders.youtube_uploader import YouTubeUploader
-from uploaders.tiktok_uploader import TikTokUploader
-from uploaders.instagram_uploader import InstagramUploader
+from core.engine import create_engine, EngineEvents
 
 
-class ParallelUploadWorker(QThread):
+class _SignalEvents(EngineEvents):
+    """Пробрасывает события движка в сигналы Qt-воркера"""
+
+    def __init__(self, worker):
+        self.worker = worker
+
+    def on_log(self, text):
+        self.worker.log.emit(text)
+
+    def on_progress(self, percent):
+        self.worker.progress.emit(percent)
+
+    def on_platform_status(self, platform, status):
+        self.worker.platform_progress.emit(platform, status)
+
+    def on_upload_progress(self, job_id, platform, progress):
+        self.worker.upload_progress.emit(job_id, platform, progress)
+
+    def on_job_finished(self, job_id, result):
+        self.worker.job_finished.emit(job_id, result)
+
+    def on_queue_changed(self, stats):
+        self.worker.queue_changed.emit(stats)
+
+    def on_queue_drained(self, results):
+        self.worker.queue_drained.emit(results)
+
+    def on_session_status(self, platform, status):
+        self.worker.session_status.emit(platform, status)
+
+
+class UploadQueueWorker(QThread):
+    """Qt-обёртка над движком загрузки (потоки или asyncio): движок крутится в отдельном QThread"""
+
     progress = pyqtSignal(int)
     log = pyqtSignal(str)
-    finished_signal = pyqtSignal(dict)
     platform_progress = pyqtSignal(str, str)  # platform, status
-    
-    def __init__(self, task):
+    upload_progress = pyqtSignal(int, str, dict)  # job_id, platform, байтовый прогресс
+    job_finished = pyqtSignal(int, dict)  # job_id, result
+    queue_changed = pyqtSignal(dict)  # счётчики состояний очереди
+    queue_drained = pyqtSignal(dict)  # job_id -> result за прошедшую серию
+    session_status = pyqtSignal(str, dict)  # platform, результат прогрева сессии
+
+    def __init__(self, config, queue=None, max_workers=None):
         super().__init__()
-        self.task = task
-        self.uploaders = {
-            'youtube': YouTubeUploader(),
-            'tiktok': TikTokUploader(),
-            'instagram': InstagramUploader()
-        }
-        self.mutex = QMutex()
-        self.completed_count = 0
-        self.results = {}
-        
+        self.engine = create_engine(config, queue, max_workers, events=_SignalEvents(self))
+
+    @property
+    def results(self):
+        return self.engine.results
+
+    def enqueue(self, task):
+        return self.engine.enqueue(task)
+
+    def wake(self):
+        self.engine.wake()
+
+    def check_sessions(self, interactive=False):
+        """
+        Внеочередной прогрев сессий. Браузер для входа открывается только при
+        interactive — по кнопке «Проверить сейчас», когда пользователь его ждёт.
+        """
+        if self.engine.sessions is not None:
+            self.engine.sessions.warm_up(force=True, interactive=interactive)
+
+    def stop(self, wait=True):
+        self.engine.stop(wait)
+
+    @property
+    def active_jobs(self):
+        return self.engine.active_jobs
+
     def run(self):
-        result = {}
-        self.log.emit("🚀 Старт параллельной загрузки...")
-        
-        video = self.task["video"]
-        desc = self.task["description"]
-        tags = self.task["tags"]
-        platforms = self.task["platforms"]
-        creds = self.task["creds"]
-        
-        total = len(platforms)
-        
-        if total == 0:
-            self.progress.emit(100)
-            self.finished_signal.emit({})
-            return
-
-        # Используем ThreadPoolExecutor для параллельного выполнения
-        with ThreadPoolExecutor(max_workers=3) as executor:
-            # Запускаем все загрузки одновременно
-            future_to_platform = {}
-            
-            for platform in platforms:
-                if platform in self.uploaders:
-                    future = executor.submit(
-                        self.upload_to_platform, 
-                        platform, video, desc, tags, creds.get(platform, {})
-                    )
-                    future_to_platform[future] = platform
-            
-            # Обрабатываем завершённые задачи по мере их выполнения
-            for future in as_completed(future_to_platform):
-                platform = future_to_platform[future]
-                try:
-                    platform_result = future.result()
-                    self.results[platform] = platform_result
-                except Exception as e:
-                    self.results[platform] = {"ok": False, "error": str(e)}
-                
-                self.mutex.lock()
-                self.completed_count += 1
-                progress = int(self.completed_count / total * 100)
-                self.mutex.unlock()
-                
-                self.progress.emit(progress)
-                self.log.emit(f"✅ {platform.capitalize()}: завершено")
-
-        self.log.emit("🎉 Все загрузки завершены!")
-        self.finished_signal.emit(self.results)
-    
-    def upload_to_platform(self, platform, video_path, description, tags, credentials):
-        """Метод для загрузки на конкретную платформу (выполняется в отдельном потоке)"""
-        
-        platform_name = platform.capitalize()
-        self.platform_progress.emit(platform, "started")
-        self.log.emit(f"⏳ {platform_name}: начинается загрузка...")
-        
-        try:
-            uploader = self.uploaders[platform]
-            
-            # Для TikTok передаём функцию логирования
-            if platform == 'tiktok':
-                result = uploader.upload(video_path, description, tags, credentials, log_fn=self.log.emit)
-            else:
-                result = uploader.upload(video_path, description, tags, credentials)
-            
-            self.platform_progress.emit(platform, "completed")
-            self.log.emit(f"✅ {platform_name}: успешно загружено!")
-            return {"ok": True, "resp": result}
-            
-        except Exception as e:
-            self.platform_progress.emit(platform, "error")
-            self.log.emit(f"❌ {platform_name}: ошибка - {str(e)}")
-            return {"ok": False, "error": str(e)}
\ No newline at end of file
+        self.engine.run_forever()
@@ -8,9 +8,12 @@ from PyQt6.QtWidgets import (
 from PyQt6.QtCore import pyqtSignal
 
 from core.config import Config
-from core.worker import ParallelUploadWorker  # Импортируем параллельный воркер
+from core.worker import UploadQueueWorker
 from .widgets import MainTab, CredentialsTab, LogsTab
 
+# Сколько ждать освобождения ресурсов движка (сессии, браузеры) при закрытии окна
+STOP_TIMEOUT_MS = 5000
+
 
 class MainWindow(QWidget):
     def __init__(self):
@@ -19,6 +22,7 @@ class MainWindow(QWidget):
         self.resize(980, 680)
         self.config = Config()
         self.setup_ui()
+        self.setup_worker()
         
     def setup_ui(self):
         layout = QVBoxLayout()
@@ -33,6 +37,7 @@ class MainWindow(QWidget):
         self.main_tab.upload_requested.connect(self.handle_upload)
         self.main_tab.log_signal.connect(self.logs_tab.append_log)
         self.creds_tab.credentials_saved.connect(self.on_credentials_saved)
+        self.main_tab.set_accounts(self.config.get_profiles(), self.config.get_groups())
         
         tabs.addTab(self.main_tab, "Загрузка")
         tabs.addTab(self.creds_tab, "Учётные данные")
@@ -41,26 +46,34 @@ class MainWindow(QWidget):
         layout.addWidget(tabs)
         self.setLayout(layout)
     
-    def handle_upload(self, task_data):
-        """Обработка начала параллельной загрузки"""
-        task_data["creds"] = self.config.creds
-        
-        # Сброс статусов перед началом загрузки
-        self.main_tab.reset_platform_status()
-        
-        self.worker = ParallelUploadWorker(task_data)
+    def setup_worker(self):
+        """Запуск долгоживущего воркера очереди загрузок"""
+        self.worker = UploadQueueWorker(self.config)
         self.worker.progress.connect(self.main_tab.progress.setValue)
         self.worker.log.connect(self.logs_tab.append_log)
         self.worker.platform_progress.connect(self.main_tab.update_platform_status)
-        self.worker.finished_signal.connect(self.on_upload_finished)
-        self.main_tab.btn_upload.setEnabled(False)
+        self.worker.upload_progress.connect(self.main_tab.update_upload_progress)
+        self.worker.queue_changed.connect(self.main_tab.update_queue_status)
+        self.worker.queue_drained.connect(self.on_queue_drained)
+        self.worker.session_status.connect(self.creds_tab.update_session_status)
+        self.creds_tab.check_requested.connect(lambda: self.worker.check_sessions(interactive=True))
         self.worker.start()
-    
-    def on_upload_finished(self, result):
-        """Обработка завершения загрузки"""
-        self.main_tab.btn_upload.setEnabled(True)
+
+    def handle_upload(self, task_data):
+        """Постановка видео в очередь загрузки"""
+        # Сброс статусов перед новой серией загрузок
+        if not self.worker.results:
+            self.main_tab.reset_platform_status()
+        try:
+            self.worker.enqueue(task_data)
+        except ValueError as e:
+            # Профиль или группа не настроены на выбранной платформе
+            QMessageBox.warning(self, "Аккаунты", str(e))
+
+    def on_queue_drained(self, result):
+        """Обработка завершения всех задач в очереди"""
         self.logs_tab.append_log("📊 Результаты загрузки:")
-        self.logs_tab.append_log(json.dumps(result, ensure_ascii=False, indent=2))
+        self.logs_tab.append_log(json.dumps(result, ensure_ascii=False, indent=2, default=str))
         QApplication.beep()
         
         # Показываем сводку
@@ -75,11 +88,23 @@ class MainWindow(QWidget):
                               f"❌ {total_count - success_count} завершились с ошибками.")
         else:
             QMessageBox.critical(self, "Ошибка", "❌ Все загрузки завершились с ошибками!")
+
+    def closeEvent(self, event):
+        """
+        Остановка воркера без ожидания идущих загрузок: окно закрывается сразу,
+        брошенные задачи JobQueue.recover() вернёт в очередь при следующем запуске
+        """
+        self.worker.stop(wait=False)
+        self.worker.wait(STOP_TIMEOUT_MS)
+        self.logs_tab.close_log()
+        super().closeEvent(event)
     
     def on_credentials_saved(self, new_creds):
         """Обновление конфигурации при сохранении учетных данных"""
         self.config.creds = new_creds
         self.config.save_creds()
+        self.main_tab.set_accounts(self.config.get_profiles(), self.config.get_groups())
+        self.worker.check_sessions()
         self.show_message("Успех", "Учетные данные сохранены")
     
     def show_message(self, title, message, message_type=QMessageBox.Icon.Information):
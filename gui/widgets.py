@@ -2,13 +2,17 @@
 
 import os
 import pathlib
+import logging
+from collections import deque
+from logging.handlers import RotatingFileHandler, MemoryHandler
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, 
-    QPushButton, QTextEdit, QCheckBox, QProgressBar, 
-    QGroupBox, QFormLayout, QFileDialog, QMessageBox
+    QPushButton, QTextEdit, QPlainTextEdit, QCheckBox, QProgressBar, 
+    QGroupBox, QFormLayout, QFileDialog, QMessageBox, QComboBox, QInputDialog, QSpinBox, QDateTimeEdit
 )
-from PyQt6.QtCore import pyqtSignal, pyqtSlot
-from core.config import APP_DIR
+from PyQt6.QtCore import pyqtSignal, pyqtSlot, QTimer, QDateTime
+from core.config import LOGS_DIR, DEFAULT_ACCOUNT, ALL_ACCOUNTS, account_file
+from core.utils import format_bytes, format_eta
 
 
 class MainTab(QWidget):
@@ -47,6 +51,27 @@ class MainTab(QWidget):
         tag_layout.addWidget(self.tags_edit)
         layout.addLayout(tag_layout)
 
+        # Очерёдность и отложенная публикация
+        schedule_layout = QHBoxLayout()
+        self.priority_spin = QSpinBox()
+        self.priority_spin.setRange(0, 10)
+        self.priority_spin.setToolTip("Задачи с большим приоритетом загружаются раньше")
+        self.chk_publish_at = QCheckBox("Опубликовать в:")
+        self.publish_at_edit = QDateTimeEdit(QDateTime.currentDateTime().addSecs(3600))
+        self.publish_at_edit.setCalendarPopup(True)
+        self.publish_at_edit.setDisplayFormat("dd.MM.yyyy HH:mm")
+        self.publish_at_edit.setEnabled(False)
+        self.publish_at_edit.setToolTip("YouTube и TikTok загружаются заранее с отложенной публикацией, "
+                                        "Instagram — к этому времени")
+        self.chk_publish_at.toggled.connect(self.publish_at_edit.setEnabled)
+        schedule_layout.addWidget(QLabel("Приоритет:"))
+        schedule_layout.addWidget(self.priority_spin)
+        schedule_layout.addSpacing(20)
+        schedule_layout.addWidget(self.chk_publish_at)
+        schedule_layout.addWidget(self.publish_at_edit)
+        schedule_layout.addStretch()
+        layout.addLayout(schedule_layout)
+
         # Платформы
         plat_group = QGroupBox("Платформы")
         plat_layout = QVBoxLayout()
@@ -67,24 +92,50 @@ class MainTab(QWidget):
         self.tiktok_status = QLabel("⏳ Ожидание")
         
         status_layout.addWidget(QLabel("Статусы:"))
-        status_layout.addWidget(self.youtube_status)
-        status_layout.addWidget(self.instagram_status)
-        status_layout.addWidget(self.tiktok_status)
+        
+        # Побайтовый прогресс, скорость и ETA по каждой платформе
+        self.platform_bars = {}
+        self.platform_speed = {}
+        for platform, status_label in (('youtube', self.youtube_status),
+                                       ('instagram', self.instagram_status),
+                                       ('tiktok', self.tiktok_status)):
+            row = QHBoxLayout()
+            bar = QProgressBar()
+            speed = QLabel("")
+            speed.setMinimumWidth(220)
+            row.addWidget(status_label)
+            row.addWidget(bar)
+            row.addWidget(speed)
+            status_layout.addLayout(row)
+            self.platform_bars[platform] = bar
+            self.platform_speed[platform] = speed
+        
+        # Аккаунты: один профиль, все профили платформы или группа из настроек
+        accounts_layout = QHBoxLayout()
+        self.accounts_combo = QComboBox()
+        accounts_layout.addWidget(QLabel("Аккаунты:"))
+        accounts_layout.addWidget(self.accounts_combo, 1)
+        self.set_accounts([DEFAULT_ACCOUNT], {})
         
         plat_layout.addLayout(check_layout)
+        plat_layout.addLayout(accounts_layout)
         plat_layout.addLayout(status_layout)
         plat_group.setLayout(plat_layout)
         layout.addWidget(plat_group)
 
         # Кнопка загрузки и прогресс
         h = QHBoxLayout()
-        self.btn_upload = QPushButton("🔄 Загрузить на все платформы")
+        self.btn_upload = QPushButton("📥 Добавить в очередь")
         self.btn_upload.clicked.connect(self.start_upload)
         self.progress = QProgressBar()
         h.addWidget(self.btn_upload)
         h.addWidget(self.progress)
         layout.addLayout(h)
 
+        # Состояние очереди
+        self.queue_label = QLabel("Очередь пуста")
+        layout.addWidget(self.queue_label)
+
         layout.addStretch()
         self.setLayout(layout)
         
@@ -99,6 +150,9 @@ class MainTab(QWidget):
         self.youtube_status.setStyleSheet("color: gray;")
         self.instagram_status.setStyleSheet("color: gray;")
         self.tiktok_status.setStyleSheet("color: gray;")
+        for platform, bar in self.platform_bars.items():
+            bar.setValue(0)
+            self.platform_speed[platform].setText("")
 
     def update_platform_status(self, platform, status):
         """Обновление статуса конкретной платформы"""
@@ -111,6 +165,7 @@ class MainTab(QWidget):
         status_config = {
             'waiting': ("⏳ Ожидание", "gray"),
             'started': ("🚀 Загружается...", "blue"),
+            'retrying': ("🔁 Повтор...", "orange"),
             'completed': ("✅ Завершено", "green"),
             'error': ("❌ Ошибка", "red")
         }
@@ -120,6 +175,36 @@ class MainTab(QWidget):
             status_widgets[platform].setText(text)
             status_widgets[platform].setStyleSheet(f"color: {color}; font-weight: bold;")
 
+    def update_upload_progress(self, job_id, platform, info):
+        """Обновление байтового прогресса платформы"""
+        if platform not in self.platform_bars:
+            return
+        self.platform_bars[platform].setValue(info["percent"])
+        self.platform_speed[platform].setText(
+            f"{format_bytes(info['bytes_sent'])} / {format_bytes(info['total_bytes'])}, "
+            f"{format_bytes(info['bytes_per_sec'])}/с, осталось {format_eta(info['eta'])}"
+        )
+
+    def update_queue_status(self, stats):
+        """Обновление счётчиков очереди"""
+        self.queue_label.setText(
+            f"Очередь: ожидает {stats.get('pending', 0)}, в работе {stats.get('running', 0)}, "
+            f"готово {stats.get('done', 0)}, ошибок {stats.get('failed', 0)}"
+        )
+
+    def set_accounts(self, profiles, groups):
+        """Заполнение списка аккаунтов профилями и группами из конфигурации"""
+        current = self.accounts_combo.currentText()
+        self.accounts_combo.clear()
+        for name in profiles or [DEFAULT_ACCOUNT]:
+            self.accounts_combo.addItem(name, {"accounts": [name]})
+        if len(profiles) > 1:
+            self.accounts_combo.addItem("Все аккаунты", {"accounts": [ALL_ACCOUNTS]})
+        for group in sorted(groups):
+            self.accounts_combo.addItem(f"Группа: {group}", {"group": group})
+        if current:
+            self.accounts_combo.setCurrentText(current)
+
     def browse_video(self):
         path, _ = QFileDialog.getOpenFileName(
             self, 
@@ -148,6 +233,13 @@ class MainTab(QWidget):
             QMessageBox.warning(self, "Платформа не выбрана", "Выберите хотя бы одну платформу.")
             return
 
+        publish_at = None
+        if self.chk_publish_at.isChecked():
+            publish_at = float(self.publish_at_edit.dateTime().toSecsSinceEpoch())
+            if publish_at <= QDateTime.currentDateTime().toSecsSinceEpoch():
+                QMessageBox.warning(self, "Время публикации", "Время публикации уже прошло.")
+                return
+
         description = self.desc_edit.toPlainText().strip()
         tags = self.tags_edit.text().strip()
 
@@ -155,28 +247,55 @@ class MainTab(QWidget):
             "video": video, 
             "description": description, 
             "tags": tags, 
-            "platforms": platforms
+            "platforms": platforms,
+            "priority": self.priority_spin.value(),
+            "publish_at": publish_at
         }
+        task_data.update(self.accounts_combo.currentData() or {})
         
         self.upload_requested.emit(task_data)
 
 
 class CredentialsTab(QWidget):
     credentials_saved = pyqtSignal(dict)
+    check_requested = pyqtSignal()
+    
+    SESSION_ICONS = {"ok": "✅", "error": "❌", "checking": "🔄", "missing": "➖"}
+    PLATFORMS = ("youtube", "tiktok", "instagram")
     
     def __init__(self, initial_creds=None):
         super().__init__()
-        self.creds = initial_creds or {}
+        # Копия по профилям: {"youtube": {"accounts": {"default": {...}}}}
+        self.creds = {platform: {"accounts": {name: dict(values) for name, values in
+                                              (initial_creds or {}).get(platform, {}).get("accounts", {}).items()}}
+                      for platform in self.PLATFORMS}
+        self.session_texts = {platform: {} for platform in self.PLATFORMS}  # platform -> {аккаунт: текст}
+        self.profile = None
         self.setup_ui()
         self.load_initial_creds()
     
     def setup_ui(self):
         layout = QVBoxLayout()
+
+        # Профиль аккаунтов: у каждого свой канал YouTube, cookies TikTok и логин Instagram
+        profile_layout = QHBoxLayout()
+        self.profile_combo = QComboBox()
+        self.profile_combo.currentTextChanged.connect(self.switch_profile)
+        btn_add_profile = QPushButton("Новый")
+        btn_add_profile.clicked.connect(self.add_profile)
+        btn_remove_profile = QPushButton("Удалить")
+        btn_remove_profile.clicked.connect(self.remove_profile)
+        profile_layout.addWidget(QLabel("Профиль:"))
+        profile_layout.addWidget(self.profile_combo, 1)
+        profile_layout.addWidget(btn_add_profile)
+        profile_layout.addWidget(btn_remove_profile)
+        layout.addLayout(profile_layout)
+
         form = QFormLayout()
 
         # YouTube
         self.yt_client_secrets = QLineEdit()
-        self.yt_token_file = QLineEdit(os.path.join(APP_DIR, "yt_token.json"))
+        self.yt_token_file = QLineEdit(account_file("yt_token", DEFAULT_ACCOUNT))
         
         btn_browse_client_secrets = QPushButton("Выбрать")
         btn_browse_client_secrets.clicked.connect(self.browse_client_secrets)
@@ -210,27 +329,118 @@ class CredentialsTab(QWidget):
         btn_save = QPushButton("Сохранить учетные данные")
         btn_save.clicked.connect(self.save_credentials)
 
+        # Состояние сессий по результатам прогрева
+        sessions_group = QGroupBox("Сессии")
+        sessions_form = QFormLayout()
+        self.session_labels = {}
+        for platform, title in (("youtube", "YouTube"), ("tiktok", "TikTok"), ("instagram", "Instagram")):
+            label = QLabel("⏳ не проверялась")
+            label.setWordWrap(True)
+            self.session_labels[platform] = label
+            sessions_form.addRow(f"{title}:", label)
+        btn_check = QPushButton("Проверить сейчас")
+        btn_check.clicked.connect(self.check_requested.emit)
+        sessions_form.addRow(btn_check)
+        sessions_group.setLayout(sessions_form)
+
         layout.addLayout(form)
         layout.addWidget(btn_save)
+        layout.addWidget(sessions_group)
         layout.addStretch()
         self.setLayout(layout)
 
     def load_initial_creds(self):
         """Загрузка начальных учетных данных"""
+        profiles = {name for block in self.creds.values() for name in block["accounts"]}
+        profiles.add(DEFAULT_ACCOUNT)
+        for name in sorted(profiles, key=lambda name: (name != DEFAULT_ACCOUNT, name)):
+            self.profile_combo.addItem(name)
+
+    def switch_profile(self, name):
+        """Сохранение полей текущего профиля и показ выбранного"""
+        if not name:
+            return
+        if self.profile is not None:
+            self.store_profile()
+        self.profile = name
+        
         # YouTube
-        yt_creds = self.creds.get("youtube", {})
+        yt_creds = self.creds["youtube"]["accounts"].get(name, {})
         self.yt_client_secrets.setText(yt_creds.get("client_secrets_file", ""))
-        self.yt_token_file.setText(yt_creds.get("token_file", os.path.join(APP_DIR, "yt_token.json")))
+        self.yt_token_file.setText(yt_creds.get("token_file") or account_file("yt_token", name))
         
         # TikTok
-        tt_creds = self.creds.get("tiktok", {})
+        tt_creds = self.creds["tiktok"]["accounts"].get(name, {})
         self.tt_cookies_file.setText(tt_creds.get("cookies_file", ""))
         
         # Instagram
-        ig_creds = self.creds.get("instagram", {})
+        ig_creds = self.creds["instagram"]["accounts"].get(name, {})
         self.ig_username.setText(ig_creds.get("username", ""))
         self.ig_password.setText(ig_creds.get("password", ""))
 
+    def store_profile(self):
+        """Поля формы -> профиль; платформа без данных из профиля убирается"""
+        blocks = {
+            "youtube": {
+                "client_secrets_file": self.yt_client_secrets.text().strip(),
+                "token_file": self.yt_token_file.text().strip()
+            },
+            "tiktok": {
+                "cookies_file": self.tt_cookies_file.text().strip()
+            },
+            "instagram": {
+                "username": self.ig_username.text().strip(),
+                "password": self.ig_password.text().strip()
+            }
+        }
+        # Токен YouTube без client_secrets ничего не настраивает
+        configured = {"youtube": bool(blocks["youtube"]["client_secrets_file"]),
+                      "tiktok": bool(blocks["tiktok"]["cookies_file"]),
+                      "instagram": any(blocks["instagram"].values())}
+        for platform, block in blocks.items():
+            accounts = self.creds[platform]["accounts"]
+            if configured[platform]:
+                accounts[self.profile] = block
+            else:
+                accounts.pop(self.profile, None)
+
+    def add_profile(self):
+        name, ok = QInputDialog.getText(self, "Новый профиль", "Имя профиля (например, имя канала):")
+        name = name.strip()
+        if not ok or not name:
+            return
+        if name == ALL_ACCOUNTS or self.profile_combo.findText(name) >= 0:
+            QMessageBox.warning(self, "Профиль", f"Профиль «{name}» уже есть или имя недопустимо.")
+            return
+        self.profile_combo.addItem(name)
+        self.profile_combo.setCurrentText(name)
+
+    def remove_profile(self):
+        name = self.profile
+        if name is None or name == DEFAULT_ACCOUNT:
+            QMessageBox.warning(self, "Профиль", "Профиль default удалить нельзя.")
+            return
+        for block in self.creds.values():
+            block["accounts"].pop(name, None)
+        # Профиль уже удалён — при переключении его поля не сохраняются
+        self.profile = None
+        self.profile_combo.removeItem(self.profile_combo.findText(name))
+
+    @pyqtSlot(str, dict)
+    def update_session_status(self, platform, status):
+        """Отображение результата прогрева сессии платформы (по строке на аккаунт)"""
+        label = self.session_labels.get(platform)
+        if label is None:
+            return
+        icon = self.SESSION_ICONS.get(status.get("state"), "")
+        account = status.get("account", DEFAULT_ACCOUNT)
+        texts = self.session_texts[platform]
+        texts[account] = f"{icon} {status.get('message', '')}"
+        if list(texts) == [DEFAULT_ACCOUNT]:
+            label.setText(texts[DEFAULT_ACCOUNT])
+        else:
+            label.setText("\n".join(f"{name}: {text}" for name, text in sorted(texts.items())))
+
     def browse_client_secrets(self):
         path, _ = QFileDialog.getOpenFileName(
             self, 
@@ -252,20 +462,10 @@ class CredentialsTab(QWidget):
             self.tt_cookies_file.setText(path)
 
     def save_credentials(self):
-        """Сохранение учетных данных"""
-        new_creds = {
-            "youtube": {
-                "client_secrets_file": self.yt_client_secrets.text().strip(),
-                "token_file": self.yt_token_file.text().strip()
-            },
-            "tiktok": {
-                "cookies_file": self.tt_cookies_file.text().strip()
-            },
-            "instagram": {
-                "username": self.ig_username.text().strip(),
-                "password": self.ig_password.text().strip()
-            }
-        }
+        """Сохранение учетных данных всех профилей"""
+        self.store_profile()
+        new_creds = {platform: {"accounts": {name: dict(values) for name, values in block["accounts"].items()}}
+                     for platform, block in self.creds.items()}
         
         # Валидация
         errors = self.validate_credentials(new_creds)
@@ -280,29 +480,76 @@ class CredentialsTab(QWidget):
         errors = []
         
         # YouTube
-        yt_secrets = creds["youtube"]["client_secrets_file"]
-        if yt_secrets and not os.path.exists(yt_secrets):
-            errors.append("Файл client_secrets.json для YouTube не найден")
+        for name, values in creds["youtube"]["accounts"].items():
+            yt_secrets = values["client_secrets_file"]
+            if yt_secrets and not os.path.exists(yt_secrets):
+                errors.append(f"[{name}] Файл client_secrets.json для YouTube не найден")
         
         # TikTok
-        tt_cookies = creds["tiktok"]["cookies_file"]
-        if tt_cookies and not os.path.exists(tt_cookies):
-            errors.append("Файл cookies для TikTok не найден")
+        for name, values in creds["tiktok"]["accounts"].items():
+            tt_cookies = values["cookies_file"]
+            if tt_cookies and not os.path.exists(tt_cookies):
+                errors.append(f"[{name}] Файл cookies для TikTok не найден")
         
         # Instagram
-        ig_username = creds["instagram"]["username"]
-        ig_password = creds["instagram"]["password"]
-        if (ig_username and not ig_password) or (ig_password and not ig_username):
-            errors.append("Для Instagram необходимо указать и логин, и пароль")
+        for name, values in creds["instagram"]["accounts"].items():
+            ig_username = values["username"]
+            ig_password = values["password"]
+            if (ig_username and not ig_password) or (ig_password and not ig_username):
+                errors.append(f"[{name}] Для Instagram необходимо указать и логин, и пароль")
         
         return errors
 
 
 class LogsTab(QWidget):
+    # Сколько строк держит виджет; полная история — в файле LOGS_DIR/uploader.log
+    MAX_LINES = 5000
+    FLUSH_INTERVAL_MS = 100
+
+    LEVELS = [("Все уровни", logging.DEBUG), ("Предупреждения и ошибки", logging.WARNING),
+              ("Только ошибки", logging.ERROR)]
+    PLATFORMS = [("Все платформы", None), ("YouTube", "youtube"),
+                 ("Instagram", "instagram"), ("TikTok", "tiktok")]
+
     def __init__(self):
         super().__init__()
+        self._pending = []
+        self._history = deque(maxlen=self.MAX_LINES)  # (уровень, платформа, текст) для фильтров
+        self.file_logger = self._make_file_logger()
         self.setup_ui()
+
+        # Сообщения копятся и выводятся пачкой, а не по одному на сигнал
+        self._flush_timer = QTimer(self)
+        self._flush_timer.setInterval(self.FLUSH_INTERVAL_MS)
+        self._flush_timer.timeout.connect(self.flush_logs)
+        self._flush_timer.start()
     
+    @staticmethod
+    def _make_file_logger():
+        logger = logging.getLogger("video_uploader.gui")
+        logger.setLevel(logging.DEBUG)
+        logger.propagate = False
+        if not logger.handlers:
+            file_handler = RotatingFileHandler(os.path.join(LOGS_DIR, "uploader.log"),
+                                               maxBytes=5 * 1024 * 1024, backupCount=5, encoding="utf-8")
+            file_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s"))
+            # Запись на диск пачками; ошибки сбрасываются сразу
+            logger.addHandler(MemoryHandler(500, flushLevel=logging.ERROR, target=file_handler))
+        return logger
+
+    @staticmethod
+    def classify(text):
+        """Уровень и платформа сообщения по его префиксу и тексту"""
+        if text.startswith(("❌", "⛔")):
+            level = logging.ERROR
+        elif text.startswith(("⚠️", "🔁")):
+            level = logging.WARNING
+        else:
+            level = logging.INFO
+        lowered = text[:80].lower()
+        platform = next((key for _, key in LogsTab.PLATFORMS[1:] if key in lowered), None)
+        return level, platform
+
     def setup_ui(self):
         layout = QVBoxLayout()
         
@@ -312,14 +559,26 @@ class LogsTab(QWidget):
         btn_clear.clicked.connect(self.clear_logs)
         btn_save = QPushButton("Сохранить логи в файл")
         btn_save.clicked.connect(self.save_logs)
+
+        self.level_filter = QComboBox()
+        for title, _ in self.LEVELS:
+            self.level_filter.addItem(title)
+        self.level_filter.currentIndexChanged.connect(self.refilter)
+        self.platform_filter = QComboBox()
+        for title, _ in self.PLATFORMS:
+            self.platform_filter.addItem(title)
+        self.platform_filter.currentIndexChanged.connect(self.refilter)
         
         btn_layout.addWidget(btn_clear)
         btn_layout.addWidget(btn_save)
         btn_layout.addStretch()
+        btn_layout.addWidget(self.level_filter)
+        btn_layout.addWidget(self.platform_filter)
         
-        # Текстовое поле для логов
-        self.log_text = QTextEdit()
+        # Текстовое поле для логов: простой текст с ограничением числа строк
+        self.log_text = QPlainTextEdit()
         self.log_text.setReadOnly(True)
+        self.log_text.setMaximumBlockCount(self.MAX_LINES)
         
         layout.addLayout(btn_layout)
         layout.addWidget(self.log_text)
@@ -327,17 +586,58 @@ class LogsTab(QWidget):
 
     @pyqtSlot(str)
     def append_log(self, text):
-        """Добавление текста в логи"""
-        self.log_text.append(text)
-        # Автопрокрутка к новому сообщению
-        cursor = self.log_text.textCursor()
-        cursor.movePosition(cursor.MoveOperation.End)
-        self.log_text.setTextCursor(cursor)
+        """Добавление текста в логи (выводится при следующем сбросе буфера)"""
+        self._pending.append(text)
+
+    def _accepts(self, level, platform):
+        min_level = self.LEVELS[self.level_filter.currentIndex()][1]
+        wanted = self.PLATFORMS[self.platform_filter.currentIndex()][1]
+        return level >= min_level and (wanted is None or platform == wanted)
+
+    def flush_logs(self):
+        """Вывод накопленных сообщений одним обновлением виджета"""
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, []
+
+        lines = []
+        for text in pending:
+            level, platform = self.classify(text)
+            self.file_logger.log(level, text)
+            self._history.append((level, platform, text))
+            if self._accepts(level, platform):
+                lines.append(text)
+        if not lines:
+            return
+
+        # Прокручиваем вниз, только если пользователь и так смотрел в конец
+        scrollbar = self.log_text.verticalScrollBar()
+        at_bottom = scrollbar.value() >= scrollbar.maximum() - 2
+        self.log_text.appendPlainText("\n".join(lines[-self.MAX_LINES:]))
+        if at_bottom:
+            scrollbar.setValue(scrollbar.maximum())
+
+    def refilter(self):
+        """Перерисовка виджета из истории по текущим фильтрам"""
+        self.flush_logs()
+        lines = [text for level, platform, text in self._history if self._accepts(level, platform)]
+        self.log_text.setPlainText("\n".join(lines))
+        scrollbar = self.log_text.verticalScrollBar()
+        scrollbar.setValue(scrollbar.maximum())
 
     def clear_logs(self):
-        """Очистка логов"""
+        """Очистка логов (файл на диске не трогаем)"""
+        self._pending = []
+        self._history.clear()
         self.log_text.clear()
 
+    def close_log(self):
+        """Сброс буфера и файла логов при закрытии окна"""
+        self._flush_timer.stop()
+        self.flush_logs()
+        for handler in self.file_logger.handlers:
+            handler.flush()
+
     def save_logs(self):
         """Сохранение логов в файл"""
         path, _ = QFileDialog.getSaveFileName(
@@ -1,3 +1,4 @@
+import os
 import sys
 from PyQt6.QtWidgets import QApplication
 from gui.main_window import MainWindow
@@ -9,7 +10,11 @@ def main():
     
     window = MainWindow()
     window.show()
-    sys.exit(app.exec())
+    code = app.exec()
+    if window.worker.isRunning() or window.worker.active_jobs:
+        # Потоки брошенных загрузок не дали бы процессу завершиться
+        os._exit(code)
+    sys.exit(code)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
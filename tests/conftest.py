@@ -0,0 +1,7 @@
+import os
+import sys
+import tempfile
+
+# core.config создаёт каталоги в домашнем каталоге при импорте — тесты работают во временном
+os.environ["HOME"] = tempfile.mkdtemp(prefix="video_uploader_tests_")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,88 @@
+"""Синтетические MP4 и WebM для тестов: только заголовки, без настоящих кадров"""
+
+import struct
+
+
+def box(box_type, body):
+    return struct.pack(">I4s", 8 + len(body), box_type) + body
+
+
+def children(data, start=0, end=None):
+    """Боксы внутри data: {тип: (начало содержимого, конец бокса)}"""
+    end = len(data) if end is None else end
+    found = {}
+    pos = start
+    while pos + 8 <= end:
+        size, box_type = struct.unpack_from(">I4s", data, pos)
+        found[box_type] = (pos + 8, pos + size)
+        pos += size
+    return found
+
+
+def find(data, *path):
+    """Содержимое бокса по пути типов, например find(data, b"moov", b"trak")"""
+    start, end = 0, len(data)
+    for box_type in path:
+        start, end = children(data, start, end)[box_type]
+    return start, end
+
+
+def chunk_offsets(data):
+    """Смещения чанков из stco или co64 первой дорожки"""
+    stbl = find(data, b"moov", b"trak", b"mdia", b"minf", b"stbl")
+    tables = children(data, *stbl)
+    box_type = b"stco" if b"stco" in tables else b"co64"
+    start, _ = tables[box_type]
+    count = struct.unpack_from(">I", data, start + 4)[0]
+    return box_type, list(struct.unpack_from(f">{count}{'I' if box_type == b'stco' else 'Q'}", data, start + 8))
+
+
+def moov(width=1080, height=1920, seconds=10, fps=30, codec=b"avc1", rotation_matrix=(1, 0, 0, 1),
+         offsets=(0,), offsets_box=b"stco"):
+    a, b, c, d = (value << 16 for value in rotation_matrix)
+    tkhd = (b"\0" * 40 + struct.pack(">9i", a, b, 0, c, d, 0, 0, 0, 1 << 30)
+            + struct.pack(">II", width << 16, height << 16))
+    fmt = "I" if offsets_box == b"stco" else "Q"
+    stbl = box(b"stbl",
+               box(b"stsd", b"\0" * 4 + struct.pack(">I", 1) + box(codec, b"\0" * 78))
+               + box(b"stts", b"\0" * 4 + struct.pack(">III", 1, seconds * fps, 1000))
+               + box(offsets_box, b"\0" * 4 + struct.pack(f">I{len(offsets)}{fmt}", len(offsets), *offsets)))
+    mdia = box(b"mdia",
+               box(b"mdhd", b"\0" * 12 + struct.pack(">II", fps * 1000, seconds * fps * 1000) + b"\0" * 4)
+               + box(b"hdlr", b"\0" * 8 + b"vide" + b"\0" * 12)
+               + box(b"minf", stbl))
+    return box(b"moov", box(b"mvhd", b"\0" * 12 + struct.pack(">II", 1000, seconds * 1000) + b"\0" * 80)
+               + box(b"trak", box(b"tkhd", tkhd) + mdia))
+
+
+def mp4(chunks=(b"frame-0", b"frame-1", b"frame-2"), moov_first=True, offsets_box=b"stco", **params):
+    """MP4 с mdat из chunks; stco указывает на начало каждого чанка"""
+    ftyp = box(b"ftyp", b"isom\0\0\0\0")
+    payload = b"".join(chunks)
+    # Длина moov не зависит от значений смещений, поэтому считаем её по заготовке
+    moov_size = len(moov(offsets=[0] * len(chunks), offsets_box=offsets_box, **params))
+    data_start = len(ftyp) + (moov_size if moov_first else 0) + 8
+    offsets, pos = [], data_start
+    for chunk in chunks:
+        offsets.append(pos)
+        pos += len(chunk)
+    header = moov(offsets=offsets, offsets_box=offsets_box, **params)
+    if moov_first:
+        return ftyp + header + box(b"mdat", payload)
+    return ftyp + box(b"mdat", payload) + header
+
+
+def _ebml(element_id, body):
+    size = len(body)
+    assert size < 0x7F
+    return element_id + bytes([0x80 | size]) + body
+
+
+def webm(width=1080, height=1920, duration_ms=12000.0, codec=b"V_VP9"):
+    header = _ebml(b"\x1a\x45\xdf\xa3", _ebml(b"\x42\x82", b"webm"))
+    info = _ebml(b"\x15\x49\xa9\x66", _ebml(b"\x2a\xd7\xb1", (1000000).to_bytes(3, "big"))
+                 + _ebml(b"\x44\x89", struct.pack(">d", duration_ms)))
+    video = _ebml(b"\xe0", _ebml(b"\xb0", width.to_bytes(2, "big")) + _ebml(b"\xba", height.to_bytes(2, "big")))
+    track = _ebml(b"\xae", _ebml(b"\x83", b"\x01") + _ebml(b"\x86", codec) + video)
+    tracks = _ebml(b"\x16\x54\xae\x6b", track)
+    return header + _ebml(b"\x18\x53\x80\x67", info + tracks)
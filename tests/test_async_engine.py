@@ -0,0 +1,53 @@
+import threading
+
+from core.config import Config
+from core.engine import EngineEvents, create_engine
+from core.job_queue import JobQueue
+
+
+class Recorder(EngineEvents):
+    def __init__(self):
+        self.finished = {}
+
+    def on_job_finished(self, job_id, result):
+        self.finished[job_id] = (result, threading.current_thread().name)
+
+
+class SlowSdkUploader:
+    """Блокирующий загрузчик вроде instagrapi"""
+
+    def __init__(self):
+        self.threads = []
+
+    def supports_async(self):
+        return False
+
+    def upload(self, video_path, description, tags, credentials, log_fn=print, progress_fn=None, publish_at=None):
+        self.threads.append(threading.current_thread().name)
+        return {"id": video_path}
+
+    def remote_ref(self, result):
+        return result["id"], None
+
+
+def test_sdk_uploads_and_queue_calls_use_separate_pools(tmp_path):
+    config = Config()
+    config.settings["engine"] = dict(config.settings["engine"], mode="asyncio", async_threads=2,
+                                     async_io_threads=1)
+    config.settings["preflight"] = {"enabled": False}
+    config.settings["sessions"] = dict(config.settings["sessions"], enabled=False)
+    config.settings["instagram"] = {}  # без лимитов платформы
+    events = Recorder()
+    engine = create_engine(config, JobQueue(str(tmp_path / "queue.db")), events=events)
+    uploader = SlowSdkUploader()
+    engine.uploader_for = lambda platform: uploader
+    for name in ("first", "second", "third"):
+        video = tmp_path / f"{name}.mp4"
+        video.write_bytes(name.encode() * 100)
+        engine.enqueue({"video": str(video), "description": name, "tags": "", "platforms": ["instagram"]})
+
+    engine.run_until_drained()
+
+    assert len(uploader.threads) == 3
+    assert all(name.startswith("engine-sdk") for name in uploader.threads)
+    assert all(result["ok"] and thread.startswith("engine-io") for result, thread in events.finished.values())
@@ -0,0 +1,129 @@
+import asyncio
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+import pytest
+
+from core.bandwidth import BandwidthBudget
+
+CHUNK = 10_000
+
+
+@pytest.fixture
+def budget():
+    budget = BandwidthBudget()
+    # 1 МБ/с: сто чанков в секунду
+    budget.configure({"max_mbps": 8, "weights": {"youtube": 2, "instagram": 1}})
+    return budget
+
+
+def test_without_limit_consume_returns_immediately():
+    budget = BandwidthBudget()
+    budget.configure({"max_mbps": 0})
+    started = time.monotonic()
+    with budget.stream("youtube") as stream:
+        stream.consume(10 ** 9)
+        asyncio.run(stream.consume_async(10 ** 9))
+
+    assert time.monotonic() - started < 0.5
+
+
+def test_consume_paces_to_limit(budget):
+    started = time.monotonic()
+    with budget.stream("youtube") as stream:
+        for _ in range(31):
+            stream.consume(CHUNK)
+
+    # Первый чанк уходит сразу, остальные 300 КБ — со скоростью 1 МБ/с
+    assert 0.25 < time.monotonic() - started < 1.0
+
+
+def test_async_consume_paces_to_limit(budget):
+    async def send():
+        with budget.stream("youtube") as stream:
+            for _ in range(31):
+                await stream.consume_async(CHUNK)
+
+    started = time.monotonic()
+    asyncio.run(send())
+
+    assert 0.25 < time.monotonic() - started < 1.0
+
+
+def test_weighted_shares(budget):
+    granted = []
+    lock = threading.Lock()
+
+    def send(platform):
+        with budget.stream(platform) as stream:
+            while True:
+                stream.consume(CHUNK)
+                with lock:
+                    if len(granted) >= 60:
+                        return
+                    granted.append(platform)
+
+    threads = [threading.Thread(target=send, args=(platform,)) for platform in ("youtube", "instagram")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # Поток с весом 2 получает вдвое больше чанков, чем поток с весом 1
+    assert 34 <= granted.count("youtube") <= 46
+
+
+def test_unpaced_streams_reserve_their_share(budget):
+    paced = budget.open("youtube")
+    assert budget.paced_rate() == budget.rate
+    unpaced = budget.open("instagram", paced=False)
+    assert budget.paced_rate() == pytest.approx(budget.rate * 2 / 3)
+    # Завершившаяся загрузка сразу отдаёт свою долю оставшимся
+    unpaced.close()
+    assert budget.paced_rate() == budget.rate
+    paced.close()
+
+
+def test_unknown_platform_gets_default_weight(budget):
+    assert budget.open("tiktok").weight == 1.0
+
+
+class RecordingBudget:
+    def __init__(self):
+        self.charged = []
+
+    @contextmanager
+    def stream(self, platform, paced=True):
+        yield self
+
+    def consume(self, nbytes):
+        self.charged.append(nbytes)
+
+
+def test_youtube_chunks_charged_to_budget(tmp_path, monkeypatch):
+    pytest.importorskip("googleapiclient")
+    from googleapiclient.discovery import build
+    from googleapiclient.http import HttpMockSequence
+    from uploaders import youtube_uploader
+    from uploaders.youtube_uploader import ResumableSessionStore, YouTubeUploader
+
+    video = tmp_path / "video.mp4"
+    video.write_bytes(b"v" * 3000)
+    secrets = tmp_path / "client_secrets.json"
+    secrets.write_text("{}")
+    http = HttpMockSequence([({"status": "200", "location": "https://upload.example/session"}, ""),
+                             ({"status": "200"}, json.dumps({"id": "abc123"}))])
+    service = build("youtube", "v3", http=http, developerKey="key", static_discovery=True)
+    budget = RecordingBudget()
+    monkeypatch.setattr(youtube_uploader, "bandwidth", budget)
+    uploader = YouTubeUploader()
+    uploader.sessions = ResumableSessionStore(str(tmp_path / "sessions"))
+    monkeypatch.setattr(uploader.clients, "get_service", lambda *args: service)
+
+    response = uploader.upload(str(video), "title", "", {"client_secrets_file": str(secrets),
+                                                        "token_file": str(tmp_path / "token.json")}, log_fn=None)
+
+    assert response == {"id": "abc123"}
+    assert budget.charged == [3000]
@@ -0,0 +1,70 @@
+import pytest
+
+from core.config import Config, ALL_ACCOUNTS, DEFAULT_ACCOUNT, account_file
+
+
+@pytest.fixture
+def config():
+    config = Config()
+    config.creds = {
+        "youtube": {"accounts": {DEFAULT_ACCOUNT: {}, "main": {}, "backup": {}}},
+        "tiktok": {"accounts": {"main": {}}},
+    }
+    config.settings["account_groups"] = {"brand": ["main", "backup"]}
+    return config
+
+
+def test_legacy_block_becomes_default_profile():
+    creds = Config.migrate_creds({"tiktok": {"cookies_file": "cookies.txt"}})
+
+    assert creds == {"tiktok": {"accounts": {DEFAULT_ACCOUNT: {"cookies_file": "cookies.txt"}}}}
+
+
+def test_empty_legacy_block_has_no_profiles():
+    creds = Config.migrate_creds({"instagram": {"username": "", "password": ""}})
+
+    assert creds == {"instagram": {"accounts": {}}}
+
+
+def test_migrated_creds_left_unchanged():
+    creds = Config.migrate_creds({"youtube": {"accounts": {"main": {"client_secrets_file": "secrets.json"}}}})
+
+    assert creds == {"youtube": {"accounts": {"main": {"client_secrets_file": "secrets.json"}}}}
+
+
+def test_default_profile_without_accounts(config):
+    assert config.resolve_targets(["youtube", "tiktok"]) == [("youtube", DEFAULT_ACCOUNT), ("tiktok", DEFAULT_ACCOUNT)]
+
+
+def test_explicit_accounts_skip_missing_profiles(config):
+    targets = config.resolve_targets(["youtube", "tiktok"], accounts=["main", "backup"])
+
+    assert targets == [("youtube", "main"), ("youtube", "backup"), ("tiktok", "main")]
+
+
+def test_all_accounts(config):
+    targets = config.resolve_targets(["youtube"], accounts=[ALL_ACCOUNTS])
+
+    assert targets == [("youtube", DEFAULT_ACCOUNT), ("youtube", "main"), ("youtube", "backup")]
+
+
+def test_group_expands_to_profiles(config):
+    assert config.resolve_targets(["youtube"], group="brand") == [("youtube", "main"), ("youtube", "backup")]
+
+
+def test_unknown_group_rejected(config):
+    with pytest.raises(ValueError):
+        config.resolve_targets(["youtube"], group="missing")
+
+
+def test_platform_without_selected_profiles_rejected(config):
+    with pytest.raises(ValueError):
+        config.resolve_targets(["tiktok"], accounts=["backup"])
+
+
+def test_youtube_token_file_per_profile(config):
+    main = config.get_platform_creds("youtube", "main")["token_file"]
+    default = config.get_platform_creds("youtube")["token_file"]
+
+    assert main == account_file("yt_token", "main")
+    assert main != default
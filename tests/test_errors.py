@@ -0,0 +1,61 @@
+import pytest
+
+from core.errors import (AUTH, PERMANENT, RATE_LIMITED, TRANSIENT, UploadError, backoff_delay, classify,
+                         classify_status)
+
+
+class Response(dict):
+    def __init__(self, status, **headers):
+        super().__init__(headers)
+        self.status = status
+
+
+class HttpError(Exception):
+    """Как googleapiclient.errors.HttpError: статус и заголовки в resp"""
+
+    def __init__(self, status, message="", **headers):
+        super().__init__(message)
+        self.resp = Response(status, **headers)
+
+
+class LoginRequired(Exception):
+    pass
+
+
+class PleaseWaitFewMinutes(LoginRequired):
+    """Подкласс наследует класс ошибки, если своего нет — а здесь он свой"""
+
+
+class TimeoutException(Exception):
+    pass
+
+
+@pytest.mark.parametrize("exc, expected", [
+    (UploadError("quota", RATE_LIMITED, 30), (RATE_LIMITED, 30)),
+    (HttpError(503, **{"retry-after": "12"}), (TRANSIENT, 12.0)),
+    (HttpError(429), (RATE_LIMITED, None)),
+    (HttpError(403, "reason: quotaExceeded"), (RATE_LIMITED, None)),
+    (HttpError(403, "forbidden"), (PERMANENT, None)),
+    (HttpError(401), (AUTH, None)),
+    (LoginRequired(), (AUTH, None)),
+    (PleaseWaitFewMinutes(), (RATE_LIMITED, None)),
+    (TimeoutException(), (TRANSIENT, None)),
+    (FileNotFoundError("video.mp4"), (PERMANENT, None)),
+    (ConnectionResetError(), (TRANSIENT, None)),
+    (ValueError("bad"), (PERMANENT, None)),
+])
+def test_classify(exc, expected):
+    assert classify(exc) == expected
+
+
+def test_classify_status():
+    assert classify_status(408) == (TRANSIENT, None)
+    assert classify_status(500, retry_after=5) == (TRANSIENT, 5)
+    assert classify_status(404) == (PERMANENT, None)
+
+
+def test_backoff_grows_with_jitter_and_cap():
+    for attempt, nominal in ((1, 10), (2, 20), (3, 40), (10, 300)):
+        delays = [backoff_delay(attempt, 10, 300) for _ in range(200)]
+        assert all(nominal * 0.5 <= delay <= nominal * 1.5 for delay in delays)
+        assert max(delays) - min(delays) > 0
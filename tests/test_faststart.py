@@ -0,0 +1,47 @@
+import pytest
+
+from core.faststart import faststart, FaststartError
+from core.probe import probe
+
+from media import box, chunk_offsets, find, mp4
+
+CHUNKS = (b"first-chunk", b"second", b"third-chunk-data")
+
+
+def chunks_at(data, offsets):
+    return [data[offset:offset + len(chunk)] for offset, chunk in zip(offsets, CHUNKS)]
+
+
+@pytest.mark.parametrize("offsets_box", [b"stco", b"co64"])
+def test_round_trip_moves_moov_and_offsets(tmp_path, offsets_box):
+    src = tmp_path / "src.mp4"
+    dst = tmp_path / "dst.mp4"
+    data = mp4(chunks=CHUNKS, moov_first=False, offsets_box=offsets_box)
+    src.write_bytes(data)
+    assert chunks_at(data, chunk_offsets(data)[1]) == list(CHUNKS)
+
+    faststart(str(src), str(dst))
+
+    out = dst.read_bytes()
+    assert len(out) == len(data)
+    assert find(out, b"moov")[0] < find(out, b"mdat")[0]
+    box_type, offsets = chunk_offsets(out)
+    assert box_type == offsets_box
+    # Смещения сдвинуты на размер moov и по-прежнему указывают на те же байты
+    assert chunks_at(out, offsets) == list(CHUNKS)
+    assert probe(str(dst))["faststart"] is True
+
+
+def test_already_faststart(tmp_path):
+    src = tmp_path / "src.mp4"
+    src.write_bytes(mp4(chunks=CHUNKS, moov_first=True))
+    with pytest.raises(FaststartError):
+        faststart(str(src), str(tmp_path / "dst.mp4"))
+
+
+def test_file_without_moov(tmp_path):
+    src = tmp_path / "src.mp4"
+    src.write_bytes(box(b"ftyp", b"isom\0\0\0\0") + box(b"mdat", b"".join(CHUNKS)))
+    with pytest.raises(FaststartError):
+        faststart(str(src), str(tmp_path / "dst.mp4"))
+    assert not (tmp_path / "dst.mp4").exists()
@@ -0,0 +1,95 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from core.config import Config, DEFAULT_ACCOUNT, IG_SESSION
+from uploaders import instagram_uploader
+from uploaders.instagram_uploader import InstagramClientPool
+
+
+class FakeClient:
+    """Клиент instagrapi: сессия — имя вошедшего пользователя в файле настроек"""
+
+    logins = []
+
+    def __init__(self):
+        self.user = None
+
+    def load_settings(self, path):
+        with open(path, "r", encoding="utf-8") as f:
+            self.user = json.load(f)["user"]
+
+    def dump_settings(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"user": self.user}, f)
+
+    def login(self, username, password):
+        # Как instagrapi: с загруженной сессией повторного входа нет
+        if self.user is None:
+            self.logins.append(username)
+            self.user = username
+
+    def account_info(self):
+        return SimpleNamespace(username=self.user)
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    monkeypatch.setattr(instagram_uploader, "Client", FakeClient)
+    FakeClient.logins = []
+    return InstagramClientPool()
+
+
+def write_session(path, user):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"user": user}, f)
+
+
+def read_session(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)["user"]
+
+
+def test_seed_session_reused_for_its_owner(pool, tmp_path):
+    seed = tmp_path / "session.json"
+    own = tmp_path / "alice.json"
+    write_session(seed, "Alice")
+
+    with pool.session("alice", "pw", str(own), seed_file=str(seed)) as cl:
+        assert cl.user == "Alice"
+
+    assert FakeClient.logins == []
+    assert read_session(own) == "Alice"
+
+
+def test_foreign_seed_session_is_not_copied(pool, tmp_path):
+    seed = tmp_path / "session.json"
+    own = tmp_path / "bob.json"
+    write_session(seed, "alice")
+
+    with pool.session("bob", "pw", str(own), seed_file=str(seed)) as cl:
+        assert cl.user == "bob"
+
+    assert FakeClient.logins == ["bob"]
+    assert read_session(own) == "bob"
+    assert read_session(seed) == "alice"
+
+
+def test_foreign_own_session_file_is_replaced(pool, tmp_path):
+    own = tmp_path / "bob.json"
+    write_session(own, "alice")
+
+    with pool.session("bob", "pw", str(own)) as cl:
+        assert cl.user == "bob"
+
+    assert FakeClient.logins == ["bob"]
+    assert read_session(own) == "bob"
+
+
+def test_only_default_profile_is_seeded_from_legacy_session():
+    config = Config()
+    config.creds = {"instagram": {"accounts": {DEFAULT_ACCOUNT: {"username": "alice"}, "second": {"username": "bob"}}}}
+
+    assert config.get_platform_creds("instagram", DEFAULT_ACCOUNT)["seed_session_file"] == IG_SESSION
+    assert "seed_session_file" not in config.get_platform_creds("instagram", "second")
@@ -0,0 +1,116 @@
+import queue
+import threading
+import time
+
+import pytest
+
+from core import isolation
+from core.errors import UploadError, TRANSIENT
+from core.isolation import UploaderSupervisor
+
+
+class FakeProcess:
+    """Дочерний процесс, который отвечает сообщениями из script: [(пауза, сообщение), ...]"""
+
+    script = []
+
+    def __init__(self, platform, metrics_settings):
+        self.platform = platform
+        self.retired = False
+        self.killed = threading.Event()
+        self.process = type("Process", (), {"exitcode": None})()
+
+    @property
+    def alive(self):
+        return not self.killed.is_set()
+
+    def memory(self):
+        return None
+
+    def submit(self, method, request_id, settings, args, kwargs, labels):
+        replies = queue.Queue()
+
+        def play():
+            for delay, message in self.script:
+                if self.killed.wait(delay):
+                    return
+                replies.put((message[0], request_id) + message[1:])
+
+        threading.Thread(target=play, daemon=True).start()
+        return replies
+
+    def send(self, *message):
+        pass
+
+    def finish(self, request_id):
+        pass
+
+    def retire(self):
+        self.retired = True
+
+    def kill(self):
+        self.retired = True
+        self.killed.set()
+
+
+@pytest.fixture
+def supervisor(monkeypatch):
+    monkeypatch.setattr(isolation, "UploaderProcess", FakeProcess)
+
+    def make(**settings):
+        return UploaderSupervisor(settings, {})
+    return make
+
+
+def run(supervisor, script):
+    FakeProcess.script = script
+    logs = []
+    result = supervisor.run("tiktok", "upload", {}, ("video.mp4",), logs.append)
+    return result, logs
+
+
+def test_heartbeats_do_not_hide_hung_call(supervisor):
+    script = [(0.05, ("heartbeat",))] * 40 + [(0, ("done", "id", None))]
+
+    started = time.monotonic()
+    with pytest.raises(UploadError) as error:
+        run(supervisor(stall_timeout=5, progress_timeout=0.3), script)
+
+    assert error.value.kind == TRANSIENT
+    assert "не сообщала о ходе работы" in str(error.value)
+    assert time.monotonic() - started < 1.5
+
+
+def test_progress_extends_deadline(supervisor):
+    script = [(0.1, ("progress", {"percent": i})) for i in range(8)] + [(0, ("done", "id", ("id", "url")))]
+
+    result, _ = run(supervisor(stall_timeout=5, progress_timeout=0.3), script)
+
+    assert result == ("id", ("id", "url"))
+
+
+def test_log_counts_as_progress(supervisor):
+    script = [(0.1, ("log", f"шаг {i}")) for i in range(8)] + [(0, ("done", "id", None))]
+
+    result, logs = run(supervisor(stall_timeout=5, progress_timeout=0.3), script)
+
+    assert result == ("id", None)
+    assert len(logs) == 8
+
+
+def test_silent_process_killed_by_stall_timeout(supervisor):
+    script = [(2, ("done", "id", None))]
+
+    with pytest.raises(UploadError) as error:
+        run(supervisor(stall_timeout=0.2, progress_timeout=5), script)
+
+    assert error.value.kind == TRANSIENT
+    assert "не отвечал" in str(error.value)
+
+
+def test_heartbeats_keep_call_alive_without_progress_timeout(supervisor):
+    script = [(0.05, ("heartbeat",))] * 10 + [(0, ("done", "id", None))]
+
+    result, _ = run(supervisor(stall_timeout=0.2), script)
+
+    assert result == ("id", None)
@@ -0,0 +1,66 @@
+from core.job_queue import JobQueue, JOB_DONE, JOB_FAILED, JOB_PENDING, JOB_RUNNING
+
+
+def open_queue(tmp_path):
+    return JobQueue(str(tmp_path / "queue.db"))
+
+
+def test_enqueue_and_claim_in_order(tmp_path):
+    queue = open_queue(tmp_path)
+    ids = queue.enqueue("video.mp4", "desc", "tags", ["youtube", "tiktok"])
+
+    first = queue.claim_next()
+    assert first["id"] == ids[0]
+    assert first["state"] == JOB_RUNNING
+    assert first["attempts"] == 1
+    assert queue.claim_next()["id"] == ids[1]
+    assert queue.claim_next() is None
+    assert queue.counts()[JOB_RUNNING] == 2
+
+
+def test_rejected_jobs_stay_pending(tmp_path):
+    queue = open_queue(tmp_path)
+    youtube, tiktok = queue.enqueue("video.mp4", "", "", ["youtube", "tiktok"])
+
+    job = queue.claim_next(accept=lambda job: job["platform"] == "tiktok")
+
+    assert job["id"] == tiktok
+    assert queue.get(youtube)["state"] == JOB_PENDING
+
+
+def test_reopen_recovers_running_jobs(tmp_path):
+    queue = open_queue(tmp_path)
+    done, running, pending = queue.enqueue("video.mp4", "", "", ["youtube", "tiktok", "instagram"])
+    queue.claim_next()
+    queue.mark_done(done, {"url": "https://example.com"})
+    queue.claim_next()
+    # Процесс упал или окно закрыли, не дожидаясь загрузки
+    queue.close()
+
+    queue = open_queue(tmp_path)
+
+    assert queue.get(done)["state"] == JOB_DONE
+    assert queue.get(running)["state"] == JOB_PENDING
+    assert queue.get(running)["attempts"] == 1
+    assert queue.get(pending)["state"] == JOB_PENDING
+    assert queue.recover() == 0
+
+
+def test_reschedule_and_retry_failed(tmp_path):
+    queue = open_queue(tmp_path)
+    delayed, failed = queue.enqueue("video.mp4", "", "", ["youtube", "tiktok"])
+    queue.claim_next()
+    queue.claim_next()
+    queue.reschedule(delayed, 3600, "timeout")
+    queue.mark_failed(failed, "bad credentials")
+
+    assert queue.claim_next() is None
+    assert 3590 < queue.next_due_in() <= 3600
+    assert queue.retry_failed() == 1
+    job = queue.claim_next()
+    assert job["id"] == failed
+    assert job["error"] is None
+    assert queue.get(failed)["state"] == JOB_RUNNING
+    queue.mark_failed(failed, "again")
+    assert queue.counts()[JOB_FAILED] == 1
+    assert queue.clear_finished() == 1
@@ -0,0 +1,58 @@
+import os
+
+import pytest
+
+from core.config import Config
+from core.engine import UploadEngine
+from core.job_queue import JobQueue
+from core.ledger import UploadLedger, hash_file
+from core.staging import StagingCache
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    ledger = UploadLedger(str(tmp_path / "ledger.db"))
+    yield ledger
+    ledger.close()
+
+
+def test_hash_cached_until_file_changes(ledger, tmp_path):
+    video = tmp_path / "video.mp4"
+    video.write_bytes(b"first")
+    first = ledger.file_hash(str(video))
+    assert first == hash_file(str(video))
+
+    # Тот же размер и mtime — хэш берётся из кэша, файл не читается
+    st = os.stat(video)
+    video.write_bytes(b"other")
+    os.utime(video, ns=(st.st_atime_ns, st.st_mtime_ns))
+    assert ledger.file_hash(str(video)) == first
+
+    os.utime(video, ns=(st.st_atime_ns, st.st_mtime_ns + 1))
+    assert ledger.file_hash(str(video)) == hash_file(str(video)) != first
+
+
+def test_lookup_per_platform_and_account(ledger):
+    ledger.record("abc", "youtube", "default", "id1", "https://youtu.be/id1", "video.mp4")
+
+    assert ledger.lookup("abc", "youtube", "default")["url"] == "https://youtu.be/id1"
+    assert ledger.lookup("abc", "youtube", "second") is None
+    assert ledger.lookup("abc", "tiktok", "default") is None
+    assert ledger.lookup("def", "youtube", "default") is None
+
+
+def test_uploaded_video_skipped_before_staging(tmp_path):
+    config = Config()
+    config.settings["staging"] = dict(config.settings["staging"], enabled=True)
+    engine = UploadEngine(config, JobQueue(str(tmp_path / "queue.db")))
+    video = tmp_path / "video.mp4"
+    video.write_bytes(os.urandom(1024))
+    engine.ledger.record(hash_file(str(video)), "tiktok", "default", "42", "https://tiktok.com/42", str(video))
+    job = {"id": 1, "video": str(video), "platform": "tiktok", "account": "default"}
+    try:
+        result = engine.prepare_job(job)
+    finally:
+        engine.shutdown()
+
+    assert result["skipped"] and result["url"] == "https://tiktok.com/42"
+    assert not os.path.exists(StagingCache.staged_path(str(video)))
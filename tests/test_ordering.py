@@ -0,0 +1,91 @@
+import time
+
+import pytest
+
+from core.engine import UploadEngine
+from core.job_queue import JobQueue
+from core.scheduler import Scheduler, DEFAULT_THROUGHPUT
+
+DAY = 24 * 3600
+
+
+class FakeConfig:
+    def get_platform_settings(self, platform):
+        return {}
+
+
+def make_job(job_id, priority=0, publish_at=None, size=0, platform="youtube"):
+    return {"id": job_id, "platform": platform, "account": "default",
+            "priority": priority, "publish_at": publish_at, "size": size}
+
+
+def test_order_priority_then_deadline_then_size():
+    scheduler = Scheduler(FakeConfig())
+    jobs = [
+        make_job(1, size=500 * 1024 * 1024),
+        make_job(2, size=1024),
+        make_job(3, publish_at=2000.0, size=500 * 1024 * 1024),
+        make_job(4, publish_at=1000.0, size=500 * 1024 * 1024),
+        make_job(5, priority=5, size=500 * 1024 * 1024),
+    ]
+
+    assert [job["id"] for job in sorted(jobs, key=scheduler.order)] == [5, 4, 3, 2, 1]
+
+
+def test_order_uses_measured_throughput():
+    scheduler = Scheduler(FakeConfig())
+    # Instagram вдесятеро медленнее: тот же файл на YouTube закончится раньше
+    scheduler.record_throughput("instagram", DEFAULT_THROUGHPUT // 10, 1.0)
+    slow = make_job(1, size=10 * 1024 * 1024, platform="instagram")
+    fast = make_job(2, size=10 * 1024 * 1024, platform="youtube")
+
+    assert sorted([slow, fast], key=scheduler.order)[0] is fast
+
+
+def test_queue_claims_urgent_jobs_first(tmp_path):
+    queue = JobQueue(str(tmp_path / "queue.db"))
+    scheduler = Scheduler(FakeConfig())
+    video = tmp_path / "video.mp4"
+    video.write_bytes(b"v" * 1024)
+    plain, = queue.enqueue_targets(str(video), "", "", [("youtube", "default")])
+    later, = queue.enqueue_targets(str(video), "", "", [("youtube", "default")], publish_at=2000.0)
+    sooner, = queue.enqueue_targets(str(video), "", "", [("youtube", "default")], publish_at=1000.0)
+    urgent, = queue.enqueue_targets(str(video), "", "", [("youtube", "default")], priority=10)
+
+    claimed = [queue.claim_next(order=scheduler.order)["id"] for _ in range(4)]
+    queue.close()
+
+    assert claimed == [urgent, sooner, later, plain]
+
+
+def test_scheduled_platform_uploads_early_as_scheduled():
+    job = make_job(1, publish_at=time.time() + DAY)
+
+    assert UploadEngine.publish_deferral(job) is None
+    assert UploadEngine.scheduled_publish(job) == job["publish_at"]
+
+
+def test_platform_without_scheduling_waits_for_publish_time():
+    job = make_job(1, publish_at=time.time() + DAY, platform="instagram")
+
+    until, _, error = UploadEngine.publish_deferral(job)
+
+    assert until == job["publish_at"]
+    assert error is None
+    assert UploadEngine.scheduled_publish(job) is None
+
+
+def test_upload_deferred_until_scheduling_window_opens():
+    # TikTok планирует публикацию не дальше чем на 10 дней вперёд
+    job = make_job(1, publish_at=time.time() + 30 * DAY, platform="tiktok")
+
+    until, _, _ = UploadEngine.publish_deferral(job)
+
+    assert until == pytest.approx(job["publish_at"] - 10 * DAY + 600)
+
+
+def test_past_publish_time_uploads_now():
+    job = make_job(1, publish_at=time.time() - 60)
+
+    assert UploadEngine.publish_deferral(job) is None
+    assert UploadEngine.scheduled_publish(job) is None
@@ -0,0 +1,100 @@
+import pytest
+
+from core.errors import PERMANENT, UploadError
+from core.preflight import preflight
+from core.probe import probe, ProbeError
+
+from media import box, mp4, webm
+
+
+def write(tmp_path, name, data):
+    path = tmp_path / name
+    path.write_bytes(data)
+    return str(path)
+
+
+def test_mp4_headers(tmp_path):
+    info = probe(write(tmp_path, "clip.mp4", mp4(width=1080, height=1920, seconds=12, fps=30)))
+    assert info["container"] == "mp4"
+    assert info["video_codec"] == "h264"
+    assert (info["width"], info["height"]) == (1080, 1920)
+    assert info["duration"] == 12
+    assert info["fps"] == 30
+    assert info["faststart"] is True
+
+
+def test_mp4_moov_at_end(tmp_path):
+    info = probe(write(tmp_path, "clip.mp4", mp4(moov_first=False)))
+    assert info["faststart"] is False
+    assert info["mdat_offset"] < info["moov_offset"]
+
+
+def test_mp4_rotation_swaps_dimensions(tmp_path):
+    data = mp4(width=1920, height=1080, rotation_matrix=(0, 1, -1, 0), codec=b"hvc1")
+    info = probe(write(tmp_path, "rotated.mp4", data))
+    assert info["rotation"] == 90
+    assert (info["width"], info["height"]) == (1080, 1920)
+    assert info["video_codec"] == "hevc"
+
+
+def test_webm_headers(tmp_path):
+    info = probe(write(tmp_path, "clip.webm", webm(width=720, height=1280, duration_ms=15000.0)))
+    assert info["container"] == "webm"
+    assert info["video_codec"] == "vp9"
+    assert (info["width"], info["height"]) == (720, 1280)
+    assert info["duration"] == 15
+    assert info["faststart"] is None
+
+
+@pytest.mark.parametrize("data", [
+    # 64-битный размер бокса без 16 байт заголовка
+    box(b"ftyp", b"isom\0\0\0\0") + b"\0\0\0\x01moov\0\0",
+    # Обрезанный moov: mvhd короче полей timescale/duration
+    box(b"ftyp", b"isom\0\0\0\0") + box(b"moov", box(b"mvhd", b"\0" * 4)),
+    # Нет moov
+    box(b"ftyp", b"isom\0\0\0\0") + box(b"mdat", b"\0" * 32),
+    # Неизвестный формат
+    b"not a video file",
+])
+def test_damaged_files_raise_probe_error(tmp_path, data):
+    with pytest.raises(ProbeError):
+        probe(write(tmp_path, "broken.mp4", data))
+
+
+def test_stts_count_past_box_end(tmp_path):
+    data = bytearray(mp4())
+    stts = data.find(b"stts")
+    # Число записей stts больше, чем помещается в бокс
+    data[stts + 8:stts + 12] = (1000).to_bytes(4, "big")
+    with pytest.raises(ProbeError):
+        probe(write(tmp_path, "broken.mp4", bytes(data)))
+
+
+def test_truncated_webm(tmp_path):
+    with pytest.raises(ProbeError):
+        probe(write(tmp_path, "broken.webm", webm()[:40]))
+
+
+def test_preflight_accepts_vertical_short(tmp_path):
+    info = preflight(write(tmp_path, "clip.mp4", mp4(seconds=20)), "instagram")
+    assert info["duration"] == 20
+
+
+@pytest.mark.parametrize("platform, data, reason", [
+    ("youtube", mp4(seconds=200), "длительность"),
+    ("youtube", mp4(width=1920, height=1080), "не вертикальное"),
+    ("instagram", webm(), "контейнер webm"),
+    ("tiktok", mp4(seconds=2), "меньше 3"),
+])
+def test_preflight_rejects(tmp_path, platform, data, reason):
+    with pytest.raises(UploadError) as error:
+        preflight(write(tmp_path, "clip", data), platform)
+    assert error.value.kind == PERMANENT
+    assert reason in str(error.value)
+
+
+def test_preflight_overrides_and_damaged_file(tmp_path):
+    path = write(tmp_path, "long.mp4", mp4(seconds=200))
+    assert preflight(path, "youtube", {"youtube": {"max_duration": 300}})["duration"] == 200
+    with pytest.raises(UploadError):
+        preflight(write(tmp_path, "broken.mp4", b"not a video file"), "youtube")
@@ -0,0 +1,113 @@
+import json
+from datetime import datetime, timezone
+
+import pytest
+
+from core import quota
+from core.quota import QuotaLedger, UPLOAD_COSTS
+from core.scheduler import Scheduler
+
+
+def utc(*args):
+    return datetime(*args, tzinfo=timezone.utc).timestamp()
+
+
+class FakeConfig:
+    def __init__(self, daily_quota=10000, creds=None):
+        self.settings = {"youtube": {"daily_quota": daily_quota}}
+        self.creds = creds or {}
+
+    def get_platform_settings(self, platform):
+        return self.settings.get(platform, {})
+
+    def get_platform_creds(self, platform, account="default"):
+        return dict(self.creds.get(account, {}))
+
+
+@pytest.fixture(params=["zoneinfo", "fallback"])
+def pacific(request, monkeypatch):
+    """Обе реализации тихоокеанского времени: через zoneinfo и по правилам США"""
+    if request.param == "fallback":
+        monkeypatch.setattr(quota, "PACIFIC", None)
+    elif quota.PACIFIC is None:
+        pytest.skip("нет базы часовых поясов")
+
+
+@pytest.mark.parametrize("now, reset", [
+    # Зима (PST, UTC-8): сброс в 08:00 UTC
+    (utc(2026, 1, 15, 12, 0), utc(2026, 1, 16, 8, 0)),
+    # Лето (PDT, UTC-7): сброс в 07:00 UTC
+    (utc(2026, 7, 1, 12, 0), utc(2026, 7, 2, 7, 0)),
+    # Ещё вчера по тихоокеанскому времени
+    (utc(2026, 7, 2, 6, 59), utc(2026, 7, 2, 7, 0)),
+    # Сутки перехода на летнее время: полночь ещё по PST, следующая — по PDT
+    (utc(2026, 3, 8, 7, 0), utc(2026, 3, 8, 8, 0)),
+    (utc(2026, 3, 8, 9, 0), utc(2026, 3, 9, 7, 0)),
+    # Переход на зимнее время
+    (utc(2026, 11, 1, 12, 0), utc(2026, 11, 2, 8, 0)),
+])
+def test_next_reset_is_pacific_midnight(pacific, now, reset):
+    assert quota.next_reset(now) == reset
+
+
+def test_quota_day_follows_pacific_date(pacific):
+    assert quota.quota_day(utc(2026, 7, 2, 6, 59)) == "2026-07-01"
+    assert quota.quota_day(utc(2026, 7, 2, 7, 0)) == "2026-07-02"
+
+
+def job(job_id, account="default"):
+    return {"id": job_id, "platform": "youtube", "account": account}
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    ledger = QuotaLedger(FakeConfig(daily_quota=UPLOAD_COSTS["youtube"] * 3), db_path=str(tmp_path / "ledger.db"))
+    yield ledger
+    ledger.close()
+
+
+def test_reserve_commit_refund(ledger):
+    project = ledger.project("youtube", "default")
+    for job_id in (1, 2, 3):
+        assert ledger.can_reserve(job(job_id))
+        ledger.reserve(job(job_id))
+    # Резерв идущих загрузок занял всю квоту
+    assert not ledger.can_reserve(job(4))
+    ledger.commit(job(1))
+    ledger.refund(job(2))
+    assert ledger.used(project) == UPLOAD_COSTS["youtube"]
+    assert ledger.can_reserve(job(4))
+    # Повторный commit снятого резерва ничего не списывает
+    ledger.commit(job(2))
+    assert ledger.used(project) == UPLOAD_COSTS["youtube"]
+
+
+def test_exhaust_blocks_project_until_reset(ledger):
+    assert not ledger.blocked_until(job(1))
+    wait = ledger.exhaust(job(1))
+    assert 0 < wait <= 25 * 3600
+    assert ledger.blocked_until(job(1)) == pytest.approx(quota.next_reset(), abs=1)
+    # Другой проект квоту не делит
+    assert not ledger.blocked_until(job(2, account="other"))
+
+
+def test_accounts_of_one_client_share_project(tmp_path):
+    secrets = tmp_path / "client_secrets.json"
+    secrets.write_text(json.dumps({"installed": {"project_id": "shorts-project"}}))
+    creds = {name: {"client_secrets_file": str(secrets)} for name in ("main", "backup")}
+    ledger = QuotaLedger(FakeConfig(creds=creds), db_path=str(tmp_path / "ledger.db"))
+    assert ledger.project("youtube", "main") == ledger.project("youtube", "backup") == "youtube:shorts-project"
+    ledger.close()
+
+
+def test_scheduler_commits_only_billed_jobs(ledger):
+    scheduler = Scheduler(ledger.config, ledger)
+    project = ledger.project("youtube", "default")
+    failed_early, uploaded = job(1), job(2)
+    scheduler.acquire(failed_early)
+    scheduler.release(failed_early)
+    assert ledger.used(project) == 0
+    scheduler.acquire(uploaded)
+    uploaded["billed"] = True
+    scheduler.release(uploaded)
+    assert ledger.used(project) == UPLOAD_COSTS["youtube"]
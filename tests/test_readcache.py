@@ -0,0 +1,93 @@
+import os
+import threading
+
+import pytest
+
+from core import readcache
+from core.readcache import SharedReadCache
+
+DATA = bytes(range(256)) * 4  # 1 КиБ, 64 блока по 16 байт
+
+
+@pytest.fixture(autouse=True)
+def small_blocks(monkeypatch):
+    monkeypatch.setattr(readcache, "BLOCK_SIZE", 16)
+
+
+@pytest.fixture
+def video(tmp_path):
+    path = tmp_path / "video.mp4"
+    path.write_bytes(DATA)
+    return str(path)
+
+
+def read_all(cache, path):
+    with cache.open(path) as reader:
+        return reader.read()
+
+
+def test_readers_share_one_disk_read(video):
+    cache = SharedReadCache()
+
+    assert read_all(cache, video) == DATA
+    assert read_all(cache, video) == DATA
+    assert cache.disk_reads == len(DATA) // 16
+
+
+def test_seek_and_partial_reads(video):
+    cache = SharedReadCache()
+    with cache.open(video) as reader:
+        assert reader.size == len(DATA)
+        reader.seek(100)
+        assert reader.read(50) == DATA[100:150]
+        reader.seek(-10, os.SEEK_END)
+        assert reader.read() == DATA[-10:]
+        assert reader.read(5) == b""
+
+
+def test_parallel_readers_get_same_bytes(video):
+    cache = SharedReadCache()
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(read_all(cache, video))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == [DATA] * 8
+    assert cache.disk_reads == len(DATA) // 16
+
+
+def test_memory_limit_evicts_oldest_blocks(video):
+    cache = SharedReadCache(max_bytes=256)
+    read_all(cache, video)
+    reads = cache.disk_reads
+
+    with cache.open(video) as reader:
+        # Последние блоки ещё в кэше, начало файла вытеснено
+        reader.seek(len(DATA) - 256)
+        reader.read()
+        assert cache.disk_reads == reads
+        reader.seek(0)
+        reader.read(16)
+        assert cache.disk_reads == reads + 1
+
+
+def test_changed_file_is_read_again(video):
+    cache = SharedReadCache()
+    read_all(cache, video)
+    st = os.stat(video)
+    with open(video, "wb") as f:
+        f.write(DATA[::-1])
+    os.utime(video, ns=(st.st_atime_ns, st.st_mtime_ns + 1))
+
+    assert read_all(cache, video) == DATA[::-1]
+
+
+def test_discard_frees_blocks(video):
+    cache = SharedReadCache()
+    read_all(cache, video)
+    cache.discard(video)
+
+    read_all(cache, video)
+    assert cache.disk_reads == 2 * len(DATA) // 16
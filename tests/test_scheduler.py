@@ -0,0 +1,162 @@
+import pytest
+
+from core import scheduler as scheduler_module
+from core.scheduler import CircuitBreaker, Scheduler, TokenBucket
+
+
+class FakeConfig:
+    def __init__(self, settings=None, **platforms):
+        self.settings = settings or {}
+        self.platforms = platforms
+
+    def get_platform_settings(self, platform):
+        return self.platforms.get(platform, {})
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(scheduler_module.time, "monotonic", clock)
+    return clock
+
+
+def job(platform="youtube", account="default", **fields):
+    return {"id": 1, "platform": platform, "account": account, "priority": 0, "publish_at": None, "size": 0,
+            **fields}
+
+
+def test_bucket_burst_and_refill(clock):
+    bucket = TokenBucket(rate_per_hour=60, burst=2)
+    bucket.consume()
+    bucket.consume()
+
+    assert not bucket.available()
+    assert bucket.wait_time() == pytest.approx(60)
+    clock.now += 30
+    assert bucket.wait_time() == pytest.approx(30)
+    clock.now += 30
+    assert bucket.available()
+    # Запас не копится сверх burst
+    clock.now += 3600
+    bucket.consume()
+    bucket.consume()
+    assert not bucket.available()
+
+
+def test_zero_rate_is_unlimited(clock):
+    bucket = TokenBucket(rate_per_hour=0)
+    for _ in range(100):
+        bucket.consume()
+
+    assert bucket.available()
+    assert bucket.wait_time() == 0
+
+
+def test_platform_concurrency_limit():
+    scheduler = Scheduler(FakeConfig(tiktok={"concurrency": 1}))
+    first = job("tiktok")
+    scheduler.acquire(first)
+
+    assert not scheduler.can_start(job("tiktok", "second"))
+    # Лимит одной платформы не держит задачи других
+    assert scheduler.can_start(job("youtube"))
+    scheduler.release(first)
+    assert scheduler.can_start(job("tiktok", "second"))
+
+
+def test_account_limits_are_separate():
+    scheduler = Scheduler(FakeConfig(instagram={"account_concurrency": 1}))
+    scheduler.acquire(job("instagram", "a"))
+
+    assert not scheduler.can_start(job("instagram", "a"))
+    assert scheduler.can_start(job("instagram", "b"))
+
+
+def test_rate_limit_refund_and_next_ready_in(clock):
+    scheduler = Scheduler(FakeConfig(tiktok={"rate_per_hour": 6}))
+    started = job("tiktok")
+    scheduler.acquire(started)
+    scheduler.release(started)
+
+    assert not scheduler.can_start(job("tiktok"))
+    assert scheduler.next_ready_in(5) == 5
+    assert scheduler.next_ready_in(3600) == pytest.approx(600)
+    # Задача, так и не обратившаяся к платформе, возвращает токен
+    scheduler.refund(started)
+    assert scheduler.can_start(job("tiktok"))
+
+
+def start(scheduler, job):
+    # Движок запускает только задачи, которые разрешил can_start
+    assert scheduler.can_start(job)
+    scheduler.acquire(job)
+
+
+def open_breaker(scheduler, clock, platform="tiktok"):
+    for _ in range(3):
+        scheduler.record_failure(platform)
+    clock.now += 60
+
+
+def test_breaker_opens_and_probes(clock):
+    scheduler = Scheduler(FakeConfig({"circuit_breaker": {"failure_threshold": 3, "cooldown": 60}}))
+    scheduler.record_failure("tiktok")
+    scheduler.record_failure("tiktok")
+    assert scheduler.record_failure("tiktok") == 60
+    assert not scheduler.can_start(job("tiktok"))
+    assert scheduler.next_ready_in(3600) == pytest.approx(60)
+
+    clock.now += 60
+    probe = job("tiktok")
+    assert scheduler.can_start(probe)
+    scheduler.acquire(probe)
+    # Пока идёт проба, остальные задачи платформы ждут
+    assert not scheduler.can_start(job("tiktok", "second"))
+    # Неудачная проба размыкает цепь на удвоенный срок
+    assert scheduler.record_failure("tiktok") == 120
+    scheduler.release(probe)
+    assert not scheduler.can_start(job("tiktok"))
+
+
+def test_successful_probe_closes_breaker(clock):
+    scheduler = Scheduler(FakeConfig())
+    open_breaker(scheduler, clock)
+    probe = job("tiktok")
+    start(scheduler, probe)
+    scheduler.record_success("tiktok")
+    scheduler.release(probe)
+
+    assert scheduler.breaker("tiktok").state == CircuitBreaker.CLOSED
+    assert scheduler.can_start(job("tiktok"))
+
+
+def test_probe_without_verdict_lets_next_job_probe(clock):
+    scheduler = Scheduler(FakeConfig())
+    open_breaker(scheduler, clock)
+    probe = job("tiktok")
+    start(scheduler, probe)
+    # Ошибка аккаунта или пропуск: ни record_success, ни record_failure
+    scheduler.release(probe)
+
+    assert scheduler.breaker("tiktok").state == CircuitBreaker.HALF_OPEN
+    assert scheduler.can_start(job("tiktok", "second"))
+
+
+def test_job_started_before_opening_does_not_end_probe(clock):
+    scheduler = Scheduler(FakeConfig())
+    early = job("tiktok", "early")
+    start(scheduler, early)
+    open_breaker(scheduler, clock)
+    probe = job("tiktok")
+    start(scheduler, probe)
+    scheduler.release(early)
+
+    assert not scheduler.can_start(job("tiktok", "second"))
@@ -0,0 +1,130 @@
+import time
+
+import pytest
+
+from core.config import Config, DEFAULT_ACCOUNT
+from core.errors import UploadError, AUTH
+from core.sessions import SessionManager, SESSION_OK, SESSION_ERROR, SESSION_MISSING
+
+
+class Events:
+    def __init__(self):
+        self.logs = []
+        self.statuses = []
+
+    def on_log(self, text):
+        self.logs.append(text)
+
+    def on_session_status(self, platform, status):
+        self.statuses.append((platform, status["state"]))
+
+
+class FakeUploader:
+    def __init__(self, result=(True, "ok")):
+        self.result = result
+        self.calls = []
+
+    def warm_up(self, credentials, log_fn=print, horizon=0, interactive=False):
+        self.calls.append({"credentials": credentials, "horizon": horizon, "interactive": interactive})
+        if isinstance(self.result, Exception):
+            raise self.result
+        return self.result
+
+
+@pytest.fixture
+def config():
+    config = Config()
+    config.creds = {"youtube": {"accounts": {DEFAULT_ACCOUNT: {"client_secrets_file": "secrets.json"}}}}
+    config.settings["sessions"] = {"refresh_interval": 300, "min_interval": 60}
+    return config
+
+
+def make_manager(config, uploader):
+    events = Events()
+    manager = SessionManager(config, lambda platform: uploader, events)
+    return manager, events
+
+
+def wait_status(manager, platform, state, timeout=2):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        status = manager.status(platform)
+        if status and status["state"] == state:
+            return status
+        time.sleep(0.01)
+    raise AssertionError(f"{platform}: нет статуса {state}, есть {manager.status(platform)}")
+
+
+def test_configured_account_warmed_up(config):
+    uploader = FakeUploader()
+    manager, events = make_manager(config, uploader)
+
+    manager.warm_up()
+    wait_status(manager, "youtube", SESSION_OK)
+    manager.stop()
+
+    assert len(uploader.calls) == 1
+    assert uploader.calls[0]["credentials"]["client_secrets_file"] == "secrets.json"
+    assert uploader.calls[0]["horizon"] == 300
+    assert uploader.calls[0]["interactive"] is False
+
+
+def test_unconfigured_platforms_marked_missing(config):
+    manager, events = make_manager(config, FakeUploader())
+
+    manager.warm_up()
+    manager.stop()
+
+    assert manager.status("tiktok")["state"] == SESSION_MISSING
+    assert manager.status("instagram")["state"] == SESSION_MISSING
+
+
+def test_interactive_passed_only_on_request(config):
+    uploader = FakeUploader()
+    manager, _ = make_manager(config, uploader)
+
+    manager.warm_up(platforms=["youtube"], force=True, interactive=True)
+    wait_status(manager, "youtube", SESSION_OK)
+    manager.stop()
+
+    assert uploader.calls[0]["interactive"] is True
+
+
+def test_failed_warm_up_reported(config):
+    uploader = FakeUploader(UploadError("нет refresh_token", AUTH))
+    manager, events = make_manager(config, uploader)
+
+    manager.warm_up(platforms=["youtube"])
+    status = wait_status(manager, "youtube", SESSION_ERROR)
+    manager.stop()
+
+    assert AUTH in status["message"]
+    assert any("нет refresh_token" in text for text in events.logs)
+
+
+def test_repeated_round_throttled_without_force(config):
+    uploader = FakeUploader()
+    manager, _ = make_manager(config, uploader)
+
+    manager.warm_up(platforms=["youtube"])
+    wait_status(manager, "youtube", SESSION_OK)
+    manager.warm_up(platforms=["youtube"])
+    manager.stop()
+
+    assert len(uploader.calls) == 1
+
+
+def test_youtube_upload_never_opens_browser(tmp_path, monkeypatch):
+    pytest.importorskip("googleapiclient")
+    from uploaders import youtube_uploader
+
+    def browser_login(*args, **kwargs):
+        raise AssertionError("вход через браузер посреди загрузки")
+
+    monkeypatch.setattr(youtube_uploader.InstalledAppFlow, "from_client_secrets_file", browser_login)
+    clients = youtube_uploader.YouTubeClientCache()
+
+    with pytest.raises(UploadError) as error:
+        clients.get_service(str(tmp_path / "secrets.json"), str(tmp_path / "token.json"))
+
+    assert error.value.kind == AUTH
@@ -0,0 +1,57 @@
+import threading
+import time
+
+import pytest
+
+from uploaders import tiktok_uploader
+from uploaders.tiktok_uploader import TikTokBrowserPool
+
+
+class FakeBrowser:
+    def __init__(self, cookies_file, browser, headless):
+        self.cookies_file = cookies_file
+        self.uploads = 0
+        self.idle_since = time.monotonic()
+        self.closed = threading.Event()
+
+    def close(self):
+        self.closed.set()
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    monkeypatch.setattr(tiktok_uploader, "BrowserSession", FakeBrowser)
+    pool = TikTokBrowserPool()
+    pool.configure({"browser_pool_size": 2, "max_idle_seconds": 0.2})
+    yield pool
+    pool.close_all()
+
+
+def test_browser_reused_by_same_account(pool):
+    with pool.session("a.txt") as first:
+        pass
+    with pool.session("a.txt") as second:
+        pass
+
+    assert second is first
+    assert not first.closed.is_set()
+
+
+def test_idle_browser_closed_without_new_jobs(pool):
+    with pool.session("a.txt") as browser:
+        pass
+
+    assert browser.closed.wait(2)
+    # Слот освобождён: следующий аккаунт получает новый браузер
+    with pool.session("b.txt") as other:
+        assert other is not browser
+
+
+def test_failed_upload_recycles_browser(pool):
+    with pytest.raises(RuntimeError):
+        with pool.session("a.txt") as browser:
+            raise RuntimeError("upload failed")
+
+    assert browser.closed.is_set()
+    with pool.session("a.txt") as fresh:
+        assert fresh is not browser
@@ -0,0 +1,69 @@
+import os
+import sys
+
+import pytest
+
+from core import transcode
+from core.ledger import hash_file
+from core.transcode import TranscodeStage
+
+from media import mp4
+
+
+@pytest.fixture
+def stage(tmp_path, monkeypatch):
+    renditions = tmp_path / "renditions"
+    renditions.mkdir()
+    monkeypatch.setattr(transcode, "RENDITIONS_DIR", str(renditions))
+    # Подставной ffmpeg: копирует вход в выход
+    ffmpeg = tmp_path / "ffmpeg"
+    ffmpeg.write_text(f"#!{sys.executable}\n"
+                      "import shutil, sys\n"
+                      "shutil.copyfile(sys.argv[sys.argv.index('-i') + 1], sys.argv[-1])\n")
+    ffmpeg.chmod(0o755)
+    # Лимит кэша меньше одной версии: каждая новая версия вытесняет остальные
+    stage = TranscodeStage({"ffmpeg": str(ffmpeg), "workers": 1, "cache_max_gb": 1e-9}, hash_file)
+    yield stage
+    stage.shutdown()
+
+
+def master(tmp_path, name, seconds):
+    path = tmp_path / name
+    path.write_bytes(mp4(width=2160, height=3840, seconds=seconds))
+    return str(path)
+
+
+def test_small_source_is_not_transcoded(stage, tmp_path):
+    path = tmp_path / "small.mp4"
+    path.write_bytes(mp4(width=720, height=1280))
+
+    assert stage.render(str(path), "tiktok") == str(path)
+    stage.release(str(path))
+
+
+def test_rendition_in_use_is_not_evicted(stage, tmp_path):
+    first = stage.render(master(tmp_path, "first.mp4", 10), "tiktok")
+    assert first != str(tmp_path / "first.mp4")
+
+    second = stage.render(master(tmp_path, "second.mp4", 11), "tiktok")
+
+    # Первую версию ещё загружает задача
+    assert os.path.exists(first) and os.path.exists(second)
+    stage.release(first)
+    stage.release(second)
+    third = stage.render(master(tmp_path, "third.mp4", 12), "tiktok")
+    assert not os.path.exists(first) and not os.path.exists(second)
+    assert os.path.exists(third)
+    stage.release(third)
+
+
+def test_prefetched_rendition_is_kept_until_rendered(stage, tmp_path):
+    prefetched = master(tmp_path, "prefetched.mp4", 10)
+    stage.prefetch(prefetched, "tiktok").result()
+
+    other = stage.render(master(tmp_path, "other.mp4", 11), "tiktok")
+    stage.release(other)
+    rendition = stage.render(prefetched, "tiktok")
+
+    assert os.path.exists(rendition)
+    stage.release(rendition)
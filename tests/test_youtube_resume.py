@@ -0,0 +1,112 @@
+import json
+
+import pytest
+
+pytest.importorskip("googleapiclient")
+from googleapiclient.discovery import build
+from googleapiclient.http import HttpMockSequence
+
+from uploaders import youtube_uploader
+from uploaders.youtube_uploader import ResumableSessionStore, YouTubeUploader
+
+SESSION_URI = "https://www.googleapis.com/upload/youtube/v3/videos?upload_id=session"
+VIDEO = b"v" * 3000
+UPLOADED = json.dumps({"id": "abc123"})
+
+
+@pytest.fixture
+def uploader(tmp_path, monkeypatch):
+    uploader = YouTubeUploader()
+    uploader.sessions = ResumableSessionStore(str(tmp_path / "sessions"))
+    secrets = tmp_path / "client_secrets.json"
+    secrets.write_text("{}")
+    video = tmp_path / "video.mp4"
+    video.write_bytes(VIDEO)
+    uploader.credentials = {"client_secrets_file": str(secrets), "token_file": str(tmp_path / "token.json")}
+    uploader.video = str(video)
+    uploader.key = uploader.sessions.make_key(uploader.video, uploader.credentials["token_file"])
+
+    def serve(*responses):
+        http = HttpMockSequence(list(responses))
+        service = build("youtube", "v3", http=http, developerKey="key", static_discovery=True)
+        monkeypatch.setattr(uploader.clients, "get_service", lambda *args: service)
+        return http
+
+    uploader.serve = serve
+    return uploader
+
+
+def upload(uploader):
+    progress = []
+    response = uploader.upload(uploader.video, "title", "", uploader.credentials, log_fn=None,
+                               progress_fn=progress.append)
+    return response, progress
+
+
+def test_resume_from_confirmed_offset(uploader):
+    uploader.sessions.save(uploader.key, SESSION_URI, 0, 1024 * 1024)
+    http = uploader.serve(({"status": "308", "range": "bytes=0-999"}, ""), ({"status": "200"}, UPLOADED))
+
+    response, progress = upload(uploader)
+
+    assert response == {"id": "abc123"}
+    (query_uri, query_method, _, query_headers), (put_uri, put_method, _, put_headers) = http.request_sequence
+    assert (query_uri, query_method) == (SESSION_URI, "PUT")
+    assert query_headers["Content-Range"] == f"bytes */{len(VIDEO)}"
+    assert (put_uri, put_method) == (SESSION_URI, "PUT")
+    assert put_headers["Content-Range"] == f"bytes 1000-{len(VIDEO) - 1}/{len(VIDEO)}"
+    # Продолженная сессия уже оплачена при создании
+    assert not any(info.get("billed") for info in progress)
+    assert uploader.sessions.load(uploader.key) is None
+
+
+def test_expired_session_starts_over(uploader):
+    uploader.sessions.save(uploader.key, SESSION_URI, 1000, 1024 * 1024)
+    new_uri = SESSION_URI + "-new"
+    http = uploader.serve(({"status": "404"}, ""), ({"status": "200", "location": new_uri}, ""),
+                          ({"status": "200"}, UPLOADED))
+
+    response, progress = upload(uploader)
+
+    assert response == {"id": "abc123"}
+    put_uri, _, _, put_headers = http.request_sequence[-1]
+    assert put_uri == new_uri
+    assert put_headers["Content-Range"] == f"bytes 0-{len(VIDEO) - 1}/{len(VIDEO)}"
+    assert any(info.get("billed") for info in progress)
+
+
+def test_session_already_complete(uploader):
+    uploader.sessions.save(uploader.key, SESSION_URI, 2048, 1024 * 1024)
+    http = uploader.serve(({"status": "200"}, UPLOADED))
+
+    response, _ = upload(uploader)
+
+    assert response == {"id": "abc123"}
+    assert len(http.request_sequence) == 1
+
+
+def test_store_keeps_one_file_per_session(tmp_path):
+    store = ResumableSessionStore(str(tmp_path))
+    store.save("a", "uri-a", 0, 100)
+    store.save("b", "uri-b", 0, 100)
+    created = store.load("a")["created_at"]
+    store.save("a", "uri-a", 500, 200)
+
+    assert len(list(tmp_path.glob("*.json"))) == 2
+    entry = store.load("a")
+    assert (entry["offset"], entry["chunksize"], entry["created_at"]) == (500, 200, created)
+    store.drop("a")
+    assert store.load("a") is None
+    assert store.load("b")["uri"] == "uri-b"
+
+
+def test_store_migrates_legacy_file(tmp_path, monkeypatch):
+    legacy = tmp_path / "yt_resumable.json"
+    legacy.write_text(json.dumps({"key": {"uri": "uri", "offset": 7, "chunksize": 1,
+                                          "created_at": youtube_uploader.time.time()}}))
+    monkeypatch.setattr(youtube_uploader, "YT_RESUMABLE_STORE", str(legacy))
+
+    store = ResumableSessionStore(str(tmp_path / "sessions"))
+
+    assert store.load("key")["offset"] == 7
+    assert not legacy.exists()
@@ -0,0 +1,104 @@
+"""
+Замер времени старта GUI и CLI
+
+Запускает чистый интерпретатор с `-X importtime` для каждой точки входа
+и печатает суммарное время импорта с разбивкой по пакетам верхнего уровня.
+С флагом --window дополнительно замеряет время до показа главного окна
+(Qt запускается с offscreen-платформой).
+
+    python -m tools.startup_time
+    python -m tools.startup_time --window --top 15
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TARGETS = {
+    "cli": "import cli",
+    "gui": "import gui.main_window",
+    "youtube sdk": "import uploaders.youtube_uploader",
+    "instagram sdk": "import uploaders.instagram_uploader",
+    "tiktok sdk": "import uploaders.tiktok_uploader",
+}
+
+WINDOW_SNIPPET = """
+import time
+start = time.perf_counter()
+from PyQt6.QtWidgets import QApplication
+app = QApplication([])
+from gui.main_window import MainWindow
+window = MainWindow()
+window.show()
+app.processEvents()
+print(f"{(time.perf_counter() - start) * 1000:.1f}")
+window.close()
+"""
+
+_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|\s*(\S+)")
+
+
+def import_breakdown(statement):
+    """
+    Время импорта по пакетам верхнего уровня.
+
+    Returns:
+        Tuple[float, Dict[str, float]]: (всего мс, {пакет: мс})
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr else statement)
+
+    packages = {}
+    for line in proc.stderr.splitlines():
+        match = _LINE.match(line)
+        if not match:
+            continue
+        # Суммируем собственное время модулей, чтобы вложенные импорты не считались дважды
+        top = match.group(3).split(".")[0]
+        packages[top] = packages.get(top, 0.0) + int(match.group(1)) / 1000
+    return sum(packages.values()), packages
+
+
+def window_time():
+    env = dict(os.environ, QT_QPA_PLATFORM=os.environ.get("QT_QPA_PLATFORM", "offscreen"))
+    proc = subprocess.run([sys.executable, "-c", WINDOW_SNIPPET], cwd=ROOT,
+                          capture_output=True, text=True, env=env)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr else "window")
+    return float(proc.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m tools.startup_time")
+    parser.add_argument("--top", type=int, default=8, help="сколько самых тяжёлых пакетов показать")
+    parser.add_argument("--window", action="store_true", help="замерить время до показа окна")
+    args = parser.parse_args(argv)
+
+    for name, statement in TARGETS.items():
+        try:
+            total, packages = import_breakdown(statement)
+        except RuntimeError as e:
+            print(f"{name:<14} не удалось: {e}")
+            continue
+        print(f"{name:<14} {total:8.1f} мс")
+        heaviest = sorted(packages.items(), key=lambda item: item[1], reverse=True)[:args.top]
+        for package, ms in heaviest:
+            print(f"    {package:<28} {ms:8.1f} мс")
+
+    if args.window:
+        try:
+            print(f"{'окно показано':<14} {window_time():8.1f} мс")
+        except RuntimeError as e:
+            print(f"{'окно':<14} не удалось: {e}")
+
+
+if __name__ == "__main__":
+    main()
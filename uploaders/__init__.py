@@ -1,5 +1,64 @@
-from .youtube_uploader import YouTubeUploader
-from .tiktok_uploader import TikTokUploader
-from .instagram_uploader import InstagramUploader
+"""
+Реестр загрузчиков с ленивой загрузкой
 
-__all__ = ['YouTubeUploader', 'TikTokUploader', 'InstagramUploader']
\ No newline at end of file
+Модуль загрузчика (а вместе с ним и тяжёлый SDK платформы) импортируется
+только при первом обращении к платформе, а не при импорте пакета.
+"""
+
+import importlib
+import threading
+
+_REGISTRY = {
+    'youtube': ('.youtube_uploader', 'YouTubeUploader'),
+    'tiktok': ('.tiktok_uploader', 'TikTokUploader'),
+    'instagram': ('.instagram_uploader', 'InstagramUploader'),
+}
+
+PLATFORMS = tuple(_REGISTRY)
+
+# Отложенная публикация: (минимум, максимум) секунд от загрузки до публикации
+# (None — без ограничения). Платформы без записи публикуют сразу после загрузки
+SCHEDULE_WINDOWS = {
+    'youtube': (0, None),
+    'tiktok': (20 * 60, 10 * 24 * 3600),
+}
+
+_instances = {}
+_lock = threading.Lock()
+
+
+def get_uploader_class(platform):
+    """Класс загрузчика платформы; модуль импортируется при первом вызове"""
+    if platform not in _REGISTRY:
+        raise ValueError(f"Неизвестная платформа: {platform}")
+    module_name, class_name = _REGISTRY[platform]
+    module = importlib.import_module(module_name, __name__)
+    return getattr(module, class_name)
+
+
+def get_uploader(platform):
+    """Общий экземпляр загрузчика платформы"""
+    with _lock:
+        if platform not in _instances:
+            _instances[platform] = get_uploader_class(platform)()
+        return _instances[platform]
+
+
+def close_all():
+    """Закрытие ресурсов всех уже созданных загрузчиков"""
+    with _lock:
+        instances = list(_instances.values())
+    for uploader in instances:
+        uploader.close()
+
+
+def __getattr__(name):
+    # Совместимость с `from uploaders import YouTubeUploader`
+    for platform, (_, class_name) in _REGISTRY.items():
+        if class_name == name:
+            return get_uploader_class(platform)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+__all__ = ['YouTubeUploader', 'TikTokUploader', 'InstagramUploader',
+           'PLATFORMS', 'SCHEDULE_WINDOWS', 'get_uploader', 'get_uploader_class', 'close_all']
@@ -4,8 +4,94 @@
 Определяет общий интерфейс для загрузчиков различных платформ.
 """
 
+import asyncio
+import functools
+import threading
+import time
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Tuple
+from typing import Dict, Any, Tuple, Callable, Optional
+
+
+class ProgressTracker:
+    """
+    Учёт переданных байт одной загрузки (видео × платформа).
+    
+    Считает сглаженную скорость и оставшееся время и передаёт их в progress_fn
+    словарем {bytes_sent, total_bytes, bytes_per_sec, eta, percent, billed}.
+    Вызовы прореживаются до одного в min_interval секунд, кроме финального.
+    billed — отправлен ли платный запрос API (см. mark_billed).
+    """
+    
+    SMOOTHING = 0.3
+    
+    def __init__(self, total_bytes: int, progress_fn: Optional[Callable[[Dict[str, Any]], None]] = None,
+                 min_interval: float = 0.5):
+        self.total_bytes = total_bytes
+        self.progress_fn = progress_fn
+        self.min_interval = min_interval
+        self.bytes_sent = 0
+        self.bytes_per_sec = 0.0
+        self.billed = False
+        self._started = time.monotonic()
+        self._last_time = self._started
+        self._last_bytes = 0
+        self._last_report = 0.0
+        self._lock = threading.Lock()
+    
+    def update(self, bytes_sent: int) -> None:
+        """Сообщить абсолютное количество переданных байт"""
+        with self._lock:
+            now = time.monotonic()
+            elapsed = now - self._last_time
+            if elapsed > 0 and bytes_sent > self._last_bytes:
+                rate = (bytes_sent - self._last_bytes) / elapsed
+                self.bytes_per_sec = rate if not self.bytes_per_sec else (
+                    self.SMOOTHING * rate + (1 - self.SMOOTHING) * self.bytes_per_sec)
+                self._last_time = now
+                self._last_bytes = bytes_sent
+            self.bytes_sent = bytes_sent
+            final = bytes_sent >= self.total_bytes
+            if not final and now - self._last_report < self.min_interval:
+                return
+            self._last_report = now
+            info = self.snapshot()
+        if self.progress_fn:
+            self.progress_fn(info)
+    
+    def mark_billed(self) -> None:
+        """
+        Загрузчик отправляет запрос, который расходует квоту API (core.quota):
+        движок списывает резерв квоты только после этого сигнала.
+        """
+        with self._lock:
+            self.billed = True
+            info = self.snapshot()
+        if self.progress_fn:
+            self.progress_fn(info)
+    
+    def advance(self, nbytes: int) -> None:
+        """Сообщить о передаче ещё nbytes байт"""
+        self.update(self.bytes_sent + nbytes)
+    
+    def finish(self) -> None:
+        """Отметить загрузку завершённой (для SDK без промежуточного прогресса)"""
+        if not self.bytes_per_sec:
+            elapsed = time.monotonic() - self._started
+            self.bytes_per_sec = self.total_bytes / elapsed if elapsed > 0 else 0.0
+        self.update(self.total_bytes)
+    
+    def snapshot(self) -> Dict[str, Any]:
+        remaining = max(0, self.total_bytes - self.bytes_sent)
+        eta = remaining / self.bytes_per_sec if self.bytes_per_sec else None
+        percent = int(self.bytes_sent / self.total_bytes * 100) if self.total_bytes else 100
+        return {
+            "bytes_sent": self.bytes_sent,
+            "total_bytes": self.total_bytes,
+            "bytes_per_sec": self.bytes_per_sec,
+            "eta": eta,
+            "percent": percent,
+            "billed": self.billed,
+        }
 
 
 class BaseUploader(ABC):
@@ -16,8 +102,14 @@ class BaseUploader(ABC):
     и реализовывать все абстрактные методы.
     """
     
+    # Настройки платформы из settings.json, см. configure()
+    settings: Dict[str, Any] = {}
+    
     @abstractmethod
-    def upload(self, video_path: str, description: str, tags: str, credentials: Dict[str, Any]) -> Any:
+    def upload(self, video_path: str, description: str, tags: str, credentials: Dict[str, Any],
+               log_fn: Callable[[str], None] = print,
+               progress_fn: Optional[Callable[[Dict[str, Any]], None]] = None,
+               publish_at: Optional[float] = None) -> Any:
         """
         Основной метод для загрузки видео на платформу.
         
@@ -26,6 +118,10 @@ class BaseUploader(ABC):
             description (str): Описание видео
             tags (str): Теги для видео (строка, разделенная пробелами или запятыми)
             credentials (Dict[str, Any]): Учетные данные для доступа к платформе
+            log_fn (Callable): Функция для вывода сообщений в лог
+            progress_fn (Callable, optional): Получает прогресс загрузки (см. ProgressTracker)
+            publish_at (float, optional): Время отложенной публикации (unix time); движок
+                передаёт его только платформам из uploaders.SCHEDULE_WINDOWS
             
         Returns:
             Any: Результат загрузки, специфичный для каждой платформы
@@ -52,6 +148,69 @@ class BaseUploader(ABC):
         """
         pass
     
+    def configure(self, settings: Dict[str, Any]) -> None:
+        """
+        Применение настроек платформы (секция settings.json).
+        
+        Args:
+            settings (Dict[str, Any]): Настройки загрузчика
+        """
+        self.settings = settings
+    
+    def supports_async(self) -> bool:
+        """Есть ли неблокирующая upload_async (для asyncio-движка)"""
+        return False
+    
+    async def upload_async(self, video_path: str, description: str, tags: str, credentials: Dict[str, Any],
+                           log_fn: Callable[[str], None] = print,
+                           progress_fn: Optional[Callable[[Dict[str, Any]], None]] = None,
+                           publish_at: Optional[float] = None, http: Any = None) -> Any:
+        """
+        Загрузка без блокировки цикла событий. Аргументы как у upload(),
+        http — общий aiohttp.ClientSession движка.
+        
+        По умолчанию upload() выполняется в пуле потоков цикла событий;
+        загрузчики с неблокирующим транспортом переопределяют метод
+        и supports_async().
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, functools.partial(
+            self.upload, video_path, description, tags, credentials,
+            log_fn=log_fn, progress_fn=progress_fn, publish_at=publish_at))
+    
+    def warm_up(self, credentials: Dict[str, Any], log_fn: Callable[[str], None] = print,
+                horizon: float = 0, interactive: bool = False) -> Tuple[bool, str]:
+        """
+        Подготовка авторизации заранее, до первой загрузки (см. core.sessions).
+        
+        Args:
+            credentials (Dict[str, Any]): Учетные данные платформы
+            log_fn (Callable): Функция для вывода сообщений в лог
+            horizon (float): Через сколько секунд будет следующий прогрев —
+                токены, истекающие раньше, обновляются сейчас
+            interactive (bool): Можно ли открыть браузер для входа
+            
+        Returns:
+            Tuple[bool, str]: (is_ready, message) — как у validate_credentials
+        """
+        return self.validate_credentials(credentials)
+    
+    def close(self) -> None:
+        """Освобождение долгоживущих ресурсов (сессий, браузеров)"""
+        pass
+    
+    def remote_ref(self, result: Any) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Идентификатор и ссылка на загруженное видео по результату upload().
+        
+        Args:
+            result (Any): Значение, которое вернул upload()
+            
+        Returns:
+            Tuple[Optional[str], Optional[str]]: (remote_id, url); None, если платформа их не сообщает
+        """
+        return None, None
+    
     def prepare_description(self, description: str, tags: str, max_length: int = None) -> str:
         """
         Подготовка описания с тегами.
@@ -105,6 +264,21 @@ class BaseUploader(ABC):
         if not os.path.exists(video_path):
             raise FileNotFoundError(f"Видеофайл не найден: {video_path}")
     
+    def make_progress(self, video_path: str, progress_fn=None) -> ProgressTracker:
+        """
+        Создание трекера прогресса для загрузки файла.
+        
+        Args:
+            video_path (str): Путь к видеофайлу
+            progress_fn (Callable, optional): Получатель прогресса
+            
+        Returns:
+            ProgressTracker: Трекер, уже сообщивший о старте (0 байт)
+        """
+        tracker = ProgressTracker(os.path.getsize(video_path), progress_fn)
+        tracker.update(0)
+        return tracker
+    
     def get_required_libraries(self) -> Dict[str, str]:
         """
         Возвращает список необходимых библиотек для работы загрузчика.
@@ -1,48 +1,188 @@
 import os
+import re
+import time
+import threading
+from contextlib import contextmanager
 
 try:
     from instagrapi import Client
+    from instagrapi.exceptions import LoginRequired
 except ImportError:
     Client = None
+    LoginRequired = None
 
+from core.bandwidth import bandwidth
+from core.config import IG_SESSIONS_DIR
+from core.metrics import metrics
 from .base import BaseUploader
 
-IG_SESSION = os.path.join(os.path.expanduser("~"), ".video_uploader", "session.json")
+# Как часто дёшево проверять, что сессия ещё жива
+REVALIDATE_INTERVAL = 30 * 60
+
+
+def session_path(username):
+    safe_name = re.sub(r"[^\w.-]", "_", username)
+    return os.path.join(IG_SESSIONS_DIR, f"{safe_name}.json")
+
+
+class InstagramClientPool:
+    """
+    Пул залогиненных клиентов instagrapi — по одному на аккаунт.
+
+    Клиент логинится один раз, сессия сохраняется в отдельный файл аккаунта
+    и переиспользуется всеми задачами. Client не потокобезопасен, поэтому
+    задачи одного аккаунта работают с ним по очереди.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._accounts = {}  # username -> {"client", "lock", "validated_at", "session_file"}
+
+    def _account(self, username):
+        with self._lock:
+            if username not in self._accounts:
+                self._accounts[username] = {"client": None, "lock": threading.Lock(),
+                                            "validated_at": 0.0, "session_file": None}
+            return self._accounts[username]
+
+    @contextmanager
+    def session(self, username, password, session_file=None, log_fn=None, max_age=REVALIDATE_INTERVAL,
+                seed_file=None):
+        """
+        Захват авторизованного клиента аккаунта на время загрузки. Сессия,
+        проверенная больше max_age секунд назад, перед выдачей проверяется.
+        seed_file — сессия для первого входа, если своего файла у аккаунта ещё нет.
+        """
+        account = self._account(username)
+        with account["lock"]:
+            account["session_file"] = session_file or session_path(username)
+            if account["client"] is None:
+                with metrics.span("login"):
+                    account["client"] = self._open(username, password, account["session_file"], seed_file, log_fn)
+                account["validated_at"] = time.time()
+            elif time.time() - account["validated_at"] > max_age:
+                with metrics.span("session_check"):
+                    self._revalidate(account, username, password, log_fn)
+            yield account["client"]
+
+    def _open(self, username, password, session_file, seed_file, log_fn):
+        cl = Client()
+        for path in (session_file, seed_file):
+            if path and os.path.exists(path):
+                try:
+                    cl.load_settings(path)
+                    # При загруженной сессии login() не ходит в сеть повторно
+                    cl.login(username, password)
+                    # Файл мог остаться от другого аккаунта — чужую сессию не берём и не сохраняем
+                    if cl.account_info().username.lower() == username.lower():
+                        if path != session_file:
+                            cl.dump_settings(session_file)
+                        return cl
+                except Exception:
+                    pass
+                cl = Client()
+
+        if log_fn:
+            log_fn(f"Instagram: вход в аккаунт {username}")
+        cl.login(username, password)
+        cl.dump_settings(session_file)
+        return cl
+
+    def _revalidate(self, account, username, password, log_fn):
+        cl = account["client"]
+        try:
+            cl.account_info()
+        except LoginRequired:
+            self._relogin(account, username, password, log_fn)
+        account["validated_at"] = time.time()
+
+    def _relogin(self, account, username, password, log_fn):
+        if log_fn:
+            log_fn(f"Instagram: сессия {username} истекла, повторный вход")
+        with metrics.span("login"):
+            cl = account["client"]
+            # Сохраняем идентификаторы устройства, чтобы вход не выглядел как новый телефон
+            uuids = cl.get_settings().get("uuids")
+            cl.set_settings({})
+            if uuids:
+                cl.set_uuids(uuids)
+            cl.login(username, password)
+            cl.dump_settings(account["session_file"])
+        account["validated_at"] = time.time()
+
+    def relogin(self, username, password, log_fn=None):
+        account = self._account(username)
+        with account["lock"]:
+            if account["client"] is not None:
+                self._relogin(account, username, password, log_fn)
+
+    def drop(self, username):
+        account = self._account(username)
+        with account["lock"]:
+            account["client"] = None
 
 
 class InstagramUploader(BaseUploader):
-    def upload(self, video_path, description, tags, credentials):
+    def __init__(self):
+        self.clients = InstagramClientPool()
+
+    def upload(self, video_path, description, tags, credentials, log_fn=print, progress_fn=None, publish_at=None):
+        # Отложенной публикации у instagrapi нет: движок ставит задачу в работу к сроку публикации
         if Client is None:
             raise RuntimeError("instagrapi не установлен. Установите: pip install instagrapi")
 
-        cl = Client()
-
         username = credentials.get("username")
         password = credentials.get("password")
 
         if not username or not password:
             raise RuntimeError("Введите Instagram username и password в настройках.")
 
-        # Пробуем использовать сохранённую сессию
-        if os.path.exists(IG_SESSION):
-            try:
-                cl.load_settings(IG_SESSION)
-                cl.login(username, password)
-            except Exception:
-                cl = Client()
-                cl.login(username, password)
-                cl.dump_settings(IG_SESSION)
-        else:
-            cl.login(username, password)
-            cl.dump_settings(IG_SESSION)
-
         caption = f"{description}\n{tags}" if tags else description
-        media = cl.clip_upload(video_path, caption)
-        return {"ok": True, "resp": str(media.model_dump())}
-    
+        session_file = credentials.get("session_file")
+        seed_file = credentials.get("seed_session_file")
+
+        # instagrapi не сообщает промежуточный прогресс — только старт и финиш
+        tracker = self.make_progress(video_path, progress_fn)
+        try:
+            with self.clients.session(username, password, session_file, log_fn, seed_file=seed_file) as cl:
+                media = self._clip_upload(cl, video_path, caption)
+        except LoginRequired:
+            # Сессия умерла между проверками — один повтор после входа
+            self.clients.relogin(username, password, log_fn)
+            with self.clients.session(username, password, session_file, log_fn, seed_file=seed_file) as cl:
+                media = self._clip_upload(cl, video_path, caption)
+        tracker.finish()
+        return {"ok": True, "resp": str(media.model_dump()), "id": str(media.pk), "code": media.code}
+
+    @staticmethod
+    def _clip_upload(cl, video_path, caption):
+        # clip_upload включает и передачу байтов, и ожидание обработки на сервере;
+        # темп задаёт instagrapi, поэтому доля канала только резервируется
+        with metrics.span("transfer") as span, bandwidth.stream("instagram", paced=False):
+            span.add_bytes(os.path.getsize(video_path))
+            return cl.clip_upload(video_path, caption)
+
+    def warm_up(self, credentials, log_fn=print, horizon=0, interactive=False):
+        if Client is None:
+            raise RuntimeError("instagrapi не установлен. Установите: pip install instagrapi")
+        ok, message = self.validate_credentials(credentials)
+        if not ok:
+            return ok, message
+        username = credentials["username"]
+        # Проверяем так, чтобы до следующего прогрева загрузкам не понадобилась своя проверка
+        with self.clients.session(username, credentials["password"], credentials.get("session_file"), log_fn,
+                                  max_age=max(0, REVALIDATE_INTERVAL - horizon),
+                                  seed_file=credentials.get("seed_session_file")):
+            pass
+        return True, f"сессия {username} активна"
+
+    def remote_ref(self, result):
+        code = result.get("code")
+        return result.get("id"), f"https://www.instagram.com/reel/{code}/" if code else None
+
     def validate_credentials(self, credentials):
         username = credentials.get("username")
         password = credentials.get("password")
         if not username or not password:
             return False, "Username or password missing"
-        return True, "OK"
\ No newline at end of file
+        return True, "OK"
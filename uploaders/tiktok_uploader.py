@@ -1,18 +1,223 @@
 import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
 
 try:
-    from tiktok_uploader.upload import upload_video
+    from tiktok_uploader import config as tiktok_config
+    from tiktok_uploader.upload import upload_videos
     from tiktok_uploader.auth import AuthBackend
+    from tiktok_uploader.browsers import get_browser
 except ImportError:
-    upload_video = None
+    upload_videos = None
     AuthBackend = None
 
+from core.bandwidth import bandwidth
+from core.metrics import metrics
 from .base import BaseUploader
 
+# Cookies, по которым TikTok узнаёт авторизованную сессию
+SESSION_COOKIES = ("sessionid", "sessionid_ss", "sid_tt")
+
+# Время отложенной публикации в TikTok выбирается с шагом 5 минут
+SCHEDULE_STEP = 5 * 60
+
+
+def schedule_time(publish_at):
+    """Время публикации для tiktok-uploader: UTC, округлено вверх до шага расписания"""
+    return datetime.fromtimestamp(-(-publish_at // SCHEDULE_STEP) * SCHEDULE_STEP, timezone.utc)
+
+
+def session_cookie_expiry(cookies_file):
+    """
+    Срок действия cookies сессии (unix-время) из файла Netscape (txt) или JSON.
+    0 — cookies сеансовые (срок неизвестен), None — cookies сессии в файле нет.
+    """
+    with open(cookies_file, "r", encoding="utf-8") as f:
+        text = f.read()
+    cookies = []
+    if text.lstrip().startswith(("[", "{")):
+        data = json.loads(text)
+        if isinstance(data, dict):
+            data = data.get("cookies", [])
+        for cookie in data:
+            expires = cookie.get("expiry") or cookie.get("expirationDate") or cookie.get("expires") or 0
+            cookies.append((cookie.get("name"), float(expires)))
+    else:
+        for line in text.splitlines():
+            if line.startswith("#HttpOnly_"):
+                line = line[len("#HttpOnly_"):]
+            elif line.startswith("#") or not line.strip():
+                continue
+            parts = line.split("\t")
+            if len(parts) >= 7:
+                cookies.append((parts[5], float(parts[4] or 0)))
+    expiries = [max(0.0, expires) for name, expires in cookies if name in SESSION_COOKIES]
+    return max(expiries) if expiries else None
+
+
+class BrowserSession:
+    """Живой браузер Selenium, авторизованный cookies одного аккаунта"""
+
+    def __init__(self, cookies_file, browser, headless):
+        self.cookies_file = cookies_file
+        self.auth = AuthBackend(cookies=cookies_file)
+        self.driver = get_browser(browser, headless=headless)
+        self.uploads = 0
+        self.idle_since = time.monotonic()
+
+    def close(self):
+        try:
+            self.driver.quit()
+        except Exception:
+            pass
+
+
+class TikTokBrowserPool:
+    """
+    Пул долгоживущих браузеров для TikTok.
+
+    Одновременно открыто не больше size браузеров — этим ограничена память.
+    Браузер переиспользуется следующими задачами того же аккаунта и
+    пересоздаётся после recycle_after загрузок, после ошибки или если
+    простаивал дольше max_idle_seconds. Простаивающие браузеры закрывает
+    фоновый поток, даже если новых задач TikTok больше нет.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._idle = []
+        self._total = 0
+        self.size = 1
+        self.browser = "chrome"
+        self.headless = True
+        self.recycle_after = 20
+        self.max_idle_seconds = 300
+        self._reaper = None
+
+    def configure(self, settings):
+        with self._cond:
+            self.size = max(1, int(settings.get("browser_pool_size", self.size)))
+            self.browser = settings.get("browser", self.browser)
+            self.headless = settings.get("headless", self.headless)
+            self.recycle_after = max(1, int(settings.get("recycle_after", self.recycle_after)))
+            self.max_idle_seconds = settings.get("max_idle_seconds", self.max_idle_seconds)
+            self._cond.notify_all()
+
+    @contextmanager
+    def session(self, cookies_file, log_fn=None):
+        session = self._acquire(cookies_file, log_fn)
+        ok = False
+        try:
+            yield session
+            ok = True
+        finally:
+            self._release(session, ok)
+
+    def _acquire(self, cookies_file, log_fn):
+        to_close = []
+        with self._cond:
+            while True:
+                to_close.extend(self._reap_idle())
+                session = next((s for s in self._idle if s.cookies_file == cookies_file), None)
+                if session is not None:
+                    self._idle.remove(session)
+                    break
+                if self._total < self.size:
+                    self._total += 1
+                    break
+                if self._idle:
+                    # Все слоты заняты простаивающими браузерами других аккаунтов — вытесняем старейший
+                    to_close.append(self._idle.pop(0))
+                    self._total -= 1
+                    continue
+                self._cond.wait()
+
+        for stale in to_close:
+            stale.close()
+        if session is not None:
+            return session
+
+        if log_fn:
+            log_fn(f"TikTok: запуск браузера ({'headless' if self.headless else 'с окном'})")
+        try:
+            with metrics.span("browser_start"):
+                return BrowserSession(cookies_file, self.browser, self.headless)
+        except Exception:
+            with self._cond:
+                self._total -= 1
+                self._cond.notify_all()
+            raise
+
+    def _release(self, session, ok):
+        session.uploads += 1
+        session.idle_since = time.monotonic()
+        recycle = not ok or session.uploads >= self.recycle_after
+        with self._cond:
+            close = recycle or self._total > self.size
+            if close:
+                self._total -= 1
+            else:
+                self._idle.append(session)
+                if self._reaper is None:
+                    self._reaper = threading.Thread(target=self._reap_loop, name="tiktok-browser-reaper",
+                                                    daemon=True)
+                    self._reaper.start()
+            self._cond.notify_all()
+        if close:
+            session.close()
+
+    def _reap_loop(self):
+        """Закрытие браузеров по истечении max_idle_seconds; поток живёт, пока есть простаивающие"""
+        while True:
+            with self._cond:
+                if not self._idle:
+                    self._reaper = None
+                    return
+                expires_in = min(s.idle_since for s in self._idle) + self.max_idle_seconds - time.monotonic()
+                if expires_in > 0:
+                    self._cond.wait(expires_in)
+                    continue
+                stale = self._reap_idle()
+                self._cond.notify_all()
+            for session in stale:
+                session.close()
+
+    def _reap_idle(self):
+        now = time.monotonic()
+        stale = [s for s in self._idle if now - s.idle_since > self.max_idle_seconds]
+        for session in stale:
+            self._idle.remove(session)
+            self._total -= 1
+        return stale
+
+    def close_all(self):
+        with self._cond:
+            sessions, self._idle = self._idle, []
+            self._total -= len(sessions)
+            self._cond.notify_all()
+        for session in sessions:
+            session.close()
+
 
 class TikTokUploader(BaseUploader):
-    def upload(self, video_path, description, tags, credentials, log_fn=print):
-        if upload_video is None or AuthBackend is None:
+    def __init__(self):
+        self.browsers = TikTokBrowserPool()
+        if upload_videos is not None:
+            # Браузер закрываем сами, когда он выходит из пула
+            tiktok_config["quit_on_end"] = False
+
+    def configure(self, settings):
+        super().configure(settings)
+        self.browsers.configure(settings)
+
+    def close(self):
+        self.browsers.close_all()
+
+    def upload(self, video_path, description, tags, credentials, log_fn=print, progress_fn=None, publish_at=None):
+        if upload_videos is None or AuthBackend is None:
             raise RuntimeError("tiktok-uploader не установлен. pip install tiktok-uploader")
 
         cookies_file = credentials.get("cookies_file")
@@ -25,18 +230,57 @@ class TikTokUploader(BaseUploader):
         if log_fn:
             log_fn(f"TikTok: загружаем {video_path} с cookies {cookies_file}")
         
-        # Прямой вызов upload_video как в рабочем примере
-        result = upload_video(
-            filename=video_path,
-            description=text,
-            cookies=cookies_file,
-            #headless=True
-        )
+        # Браузерная загрузка не сообщает промежуточный прогресс — только старт и финиш
+        tracker = self.make_progress(video_path, progress_fn)
+
+        video = {"path": video_path, "description": text}
+        if publish_at:
+            video["schedule"] = schedule_time(publish_at)
+            if log_fn:
+                log_fn(f"TikTok: публикация запланирована на {video['schedule'].astimezone():%d.%m %H:%M}")
+
+        # Файл отправляет браузер, поэтому доля канала только резервируется
+        with self.browsers.session(cookies_file, log_fn) as session, metrics.span("transfer") as span, \
+                bandwidth.stream("tiktok", paced=False):
+            span.add_bytes(os.path.getsize(video_path))
+            failed = upload_videos(
+                videos=[video],
+                auth=session.auth,
+                browser_agent=session.driver,
+                headless=self.browsers.headless,
+            )
+            if failed:
+                # Исключение внутри сессии отправит браузер на пересоздание
+                raise RuntimeError(f"TikTok: не удалось загрузить {video_path}")
+        tracker.finish()
         
-        return {"ok": True, "resp": str(result)}
+        return {"ok": True, "resp": str(video_path)}
     
+    def warm_up(self, credentials, log_fn=print, horizon=0, interactive=False):
+        if upload_videos is None or AuthBackend is None:
+            raise RuntimeError("tiktok-uploader не установлен. pip install tiktok-uploader")
+        ok, message = self.validate_credentials(credentials)
+        if not ok:
+            return ok, message
+        cookies_file = credentials["cookies_file"]
+        try:
+            expires = session_cookie_expiry(cookies_file)
+        except (OSError, ValueError, TypeError, AttributeError) as e:
+            return False, f"не удалось прочитать cookies: {e}"
+        if expires is None:
+            return False, "в cookies нет сессии TikTok (sessionid), экспортируйте их заново"
+        if expires and expires < time.time() + horizon:
+            return False, f"cookies сессии истекают {time.strftime('%d.%m %H:%M', time.localtime(expires))}"
+        if self.settings.get("prewarm_browser"):
+            # Браузер остаётся в пуле и достаётся первой задаче аккаунта
+            with self.browsers.session(cookies_file, log_fn):
+                pass
+        if not expires:
+            return True, "cookies сеансовые"
+        return True, f"cookies действительны до {time.strftime('%d.%m.%Y', time.localtime(expires))}"
+
     def validate_credentials(self, credentials):
         cookies_file = credentials.get("cookies_file")
         if not cookies_file or not os.path.exists(cookies_file):
             return False, "Cookies file not found"
-        return True, "OK"
\ No newline at end of file
+        return True, "OK"
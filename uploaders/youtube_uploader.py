@@ -1,49 +1,308 @@
 import os
+import json
+import hashlib
+import time
+import random
+import asyncio
+import functools
+import threading
 import mimetypes
+from datetime import datetime, timezone
 
 try:
     from google_auth_oauthlib.flow import InstalledAppFlow
     from google.auth.transport.requests import Request
     from google.oauth2.credentials import Credentials
     from googleapiclient.discovery import build
-    from googleapiclient.http import MediaFileUpload
+    from googleapiclient.errors import HttpError
+    from googleapiclient.http import MediaIoBaseUpload
+    import google_auth_httplib2
+    import httplib2
 except ImportError:
     InstalledAppFlow = None
     build = None
-    MediaFileUpload = None
+    HttpError = None
+    MediaIoBaseUpload = None
 
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from core.bandwidth import bandwidth
+from core.config import APP_DIR
+from core.errors import UploadError, classify_status, AUTH, TRANSIENT
+from core.metrics import metrics
+from core.readcache import open_shared
 from .base import BaseUploader
 
 SCOPES_YOUTUBE = ["https://www.googleapis.com/auth/youtube.upload", "https://www.googleapis.com/auth/youtube"]
 
+YT_RESUMABLE_DIR = os.path.join(APP_DIR, "yt_resumable")
+# Общий файл сессий прежних версий, переносится в YT_RESUMABLE_DIR
+YT_RESUMABLE_STORE = os.path.join(APP_DIR, "yt_resumable.json")
+
+# Resumable-сессия Google живёт около недели
+SESSION_TTL = 6 * 24 * 3600
+
+# Токен обновляется заранее, если до истечения осталось меньше этого
+TOKEN_REFRESH_MARGIN = 5 * 60
+HTTP_TIMEOUT = 120
+
+RETRIABLE_STATUSES = (500, 502, 503, 504)
+MAX_CHUNK_RETRIES = 8
+
+# Resumable-протокол для asyncio-движка (upload_async)
+UPLOAD_URL = "https://www.googleapis.com/upload/youtube/v3/videos"
+
+
+class ChunkSizer:
+    """
+    Подбор размера чанка по измеренной скорости.
+
+    Размер держится кратным 256 КиБ (требование протокола) и подстраивается
+    так, чтобы один чанк уходил примерно за target_seconds: на быстром канале
+    меньше запросов, на медленном — меньше потерь при обрыве.
+    """
+
+    GRANULARITY = 256 * 1024
+    MIN_SIZE = 1024 * 1024
+    MAX_SIZE = 128 * 1024 * 1024
+
+    def __init__(self, initial=8 * 1024 * 1024, target_seconds=5.0):
+        self.size = self._clamp(initial)
+        self.target_seconds = target_seconds
+
+    def _clamp(self, size):
+        size = max(self.MIN_SIZE, min(self.MAX_SIZE, int(size)))
+        return size - size % self.GRANULARITY
+
+    def update(self, sent_bytes, elapsed):
+        if sent_bytes <= 0 or elapsed <= 0:
+            return self.size
+        ideal = sent_bytes / elapsed * self.target_seconds
+        # Не больше чем вдвое за шаг, чтобы один удачный замер не раздул чанк
+        self.size = self._clamp(min(ideal, self.size * 2))
+        return self.size
+
+
+if MediaIoBaseUpload is not None:
+    class AdaptiveMediaUpload(MediaIoBaseUpload):
+        """
+        Загрузка из общего кэша чтения (core.readcache): блоки, уже прочитанные
+        при хэшировании и разборе заголовков, повторно с диска не читаются.
+        Размер чанка берётся из ChunkSizer, темп отправки — из общего
+        лимита скорости (core.bandwidth).
+        """
+
+        def __init__(self, reader, sizer, mimetype, stream):
+            self.sizer = sizer
+            self.bandwidth = stream
+            super().__init__(reader, mimetype, chunksize=sizer.size, resumable=True)
+
+        def chunksize(self):
+            return self.sizer.size
+
+        def has_stream(self):
+            # Иначе next_chunk читает поток напрямую, мимо getbytes() и лимита скорости
+            return False
+
+        def getbytes(self, begin, length):
+            # Библиотека читает чанк непосредственно перед отправкой
+            self.bandwidth.consume(max(0, min(length, self.size() - begin)))
+            return super().getbytes(begin, length)
+
+
+class ResumableSessionStore:
+    """
+    Хранилище resumable-сессий: URI сессии и последний подтверждённый
+    сервером байт для каждого (файл, аккаунт). Позволяет продолжить
+    загрузку после падения процесса или обрыва связи.
+
+    Каждая сессия — отдельный маленький JSON-файл, поэтому сохранение
+    смещения после чанка не переписывает сессии других загрузок.
+    """
+
+    def __init__(self, path=YT_RESUMABLE_DIR):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self._migrate_legacy()
+
+    @staticmethod
+    def make_key(video_path, token_file):
+        st = os.stat(video_path)
+        return f"{os.path.abspath(video_path)}|{st.st_size}|{int(st.st_mtime)}|{token_file}"
+
+    def _file(self, key):
+        return os.path.join(self.path, hashlib.sha1(key.encode("utf-8")).hexdigest() + ".json")
+
+    @staticmethod
+    def _read(path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _write(path, entry):
+        # Имя временного файла уникально: сессию могут сохранять два движка сразу
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def _migrate_legacy(self):
+        """Перенос сессий из общего файла прежних версий"""
+        if not os.path.exists(YT_RESUMABLE_STORE):
+            return
+        with open(YT_RESUMABLE_STORE, "r", encoding="utf-8") as f:
+            try:
+                sessions = json.load(f)
+            except ValueError:
+                sessions = {}
+        for key, entry in sessions.items():
+            self._write(self._file(key), entry)
+        os.remove(YT_RESUMABLE_STORE)
+
+    def load(self, key):
+        entry = self._read(self._file(key))
+        if entry and time.time() - entry.get("created_at", 0) < SESSION_TTL:
+            return entry
+        return None
+
+    def save(self, key, uri, offset, chunksize):
+        path = self._file(key)
+        now = time.time()
+        entry = self._read(path)
+        if entry and entry.get("uri") == uri:
+            created_at = entry["created_at"]
+        else:
+            # Новая сессия — попутно чистим протухшие
+            created_at = now
+            self._prune(now)
+        self._write(path, {"uri": uri, "offset": offset, "chunksize": chunksize,
+                           "created_at": created_at, "updated_at": now})
+
+    def drop(self, key):
+        try:
+            os.remove(self._file(key))
+        except FileNotFoundError:
+            pass
+
+    def _prune(self, now):
+        for name in os.listdir(self.path):
+            path = os.path.join(self.path, name)
+            if name.endswith(".json") and now - os.path.getmtime(path) > SESSION_TTL:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+
+class YouTubeClientCache:
+    """
+    Кэш авторизованных клиентов YouTube по аккаунтам (ключ — token_file).
+
+    Учётные данные читаются с диска один раз и обновляются только когда
+    до истечения токена остаётся меньше TOKEN_REFRESH_MARGIN. Объект
+    service со своим httplib2.Http (keep-alive соединения) создаётся один
+    раз на поток и аккаунт: httplib2 не потокобезопасен, поэтому общий
+    транспорт между потоками не делится.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._accounts = {}  # token_file -> {"creds": ..., "lock": Lock}
+        self._local = threading.local()
+
+    def _account(self, token_file):
+        with self._lock:
+            if token_file not in self._accounts:
+                self._accounts[token_file] = {"creds": None, "lock": threading.Lock()}
+            return self._accounts[token_file]
+
+    @staticmethod
+    def _expires_soon(creds, margin=TOKEN_REFRESH_MARGIN):
+        if not creds.valid:
+            return True
+        if creds.expiry is None:
+            return False
+        # expiry в google-auth — наивное UTC-время
+        expiry = creds.expiry.replace(tzinfo=timezone.utc).timestamp()
+        return expiry - time.time() < margin
+
+    def get_credentials(self, client_secrets, token_file, margin=TOKEN_REFRESH_MARGIN, interactive=True):
+        """
+        Действующие учётные данные аккаунта. Токен обновляется, если истекает
+        раньше чем через margin секунд; без refresh_token нужен вход через
+        браузер, который без interactive не открывается (UploadError AUTH).
+        """
+        account = self._account(token_file)
+        with account["lock"]:
+            creds = account["creds"]
+            if creds is None and os.path.exists(token_file):
+                creds = Credentials.from_authorized_user_file(token_file, SCOPES_YOUTUBE)
+
+            if not creds or self._expires_soon(creds, margin):
+                if creds and creds.refresh_token:
+                    creds.refresh(Request())
+                elif not interactive:
+                    raise UploadError("YouTube: нужен вход через браузер (нет refresh_token)", AUTH)
+                else:
+                    flow = InstalledAppFlow.from_client_secrets_file(client_secrets, SCOPES_YOUTUBE)
+                    creds = flow.run_local_server(port=0)
+
+                with open(token_file, "w", encoding="utf-8") as f:
+                    f.write(creds.to_json())
+
+            account["creds"] = creds
+            return creds
+
+    def get_service(self, client_secrets, token_file):
+        # Вход через браузер — только по действию пользователя (SessionManager), не посреди очереди
+        creds = self.get_credentials(client_secrets, token_file, interactive=False)
+        services = getattr(self._local, "services", None)
+        if services is None:
+            services = self._local.services = {}
+        cached = services.get(token_file)
+        # Пересоздаём клиент, только если сменился сам объект учётных данных
+        if cached is None or cached[0] is not creds:
+            http = google_auth_httplib2.AuthorizedHttp(creds, http=httplib2.Http(timeout=HTTP_TIMEOUT))
+            service = build("youtube", "v3", http=http, cache_discovery=False)
+            cached = services[token_file] = (creds, service)
+        return cached[1]
+
+    def invalidate(self, token_file):
+        account = self._account(token_file)
+        with account["lock"]:
+            account["creds"] = None
+        getattr(self._local, "services", {}).pop(token_file, None)
+
 
 class YouTubeUploader(BaseUploader):
-    def upload(self, video_path, description, tags, credentials):
+    def __init__(self):
+        self.sessions = ResumableSessionStore()
+        self.clients = YouTubeClientCache()
+        self._last_chunksize = ChunkSizer().size
+
+    @staticmethod
+    def _oauth_files(credentials):
         if InstalledAppFlow is None:
             raise RuntimeError("google libraries not installed. pip install google-auth-oauthlib google-api-python-client")
-        
+
         client_secrets = credentials.get("client_secrets_file")
-        token_file = credentials.get("token_file", os.path.join(os.path.expanduser("~"), ".video_uploader", "yt_token.json"))
-        
+        token_file = credentials.get("token_file", os.path.join(APP_DIR, "yt_token.json"))
+
         if not client_secrets or not os.path.exists(client_secrets):
             raise FileNotFoundError("OAuth client_secrets.json для YouTube не найден.")
-        
-        creds = None
-        if os.path.exists(token_file):
-            creds = Credentials.from_authorized_user_file(token_file, SCOPES_YOUTUBE)
-        
-        if not creds or not creds.valid:
-            if creds and creds.expired and creds.refresh_token:
-                creds.refresh(Request())
-            else:
-                flow = InstalledAppFlow.from_client_secrets_file(client_secrets, SCOPES_YOUTUBE)
-                creds = flow.run_local_server(port=0)
-            
-            with open(token_file, "w", encoding="utf-8") as f:
-                f.write(creds.to_json())
-        
-        youtube = build("youtube", "v3", credentials=creds, cache_discovery=False)
-        
+        return client_secrets, token_file
+
+    @classmethod
+    def _request_params(cls, video_path, description, tags, credentials, publish_at=None):
+        """Файлы OAuth, тело запроса и MIME-тип — общие для upload() и upload_async()"""
+        client_secrets, token_file = cls._oauth_files(credentials)
+
         body = {
             "snippet": {
                 "title": (description[:100] or "Shorts upload").strip(),
@@ -52,25 +311,282 @@ class YouTubeUploader(BaseUploader):
             },
             "status": {"privacyStatus": "public"}
         }
-        
+        if publish_at:
+            # Видео загружается закрытым и само становится публичным в publishAt
+            body["status"] = {
+                "privacyStatus": "private",
+                "publishAt": datetime.fromtimestamp(publish_at, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            }
+
         mime_type, _ = mimetypes.guess_type(video_path)
         if not mime_type:
             mime_type = "video/*"
-        
-        media = MediaFileUpload(video_path, chunksize=1048576, resumable=True, mimetype=mime_type)
-        request = youtube.videos().insert(part="snippet,status", body=body, media_body=media)
-        
-        response = None
+        return client_secrets, token_file, body, mime_type
+
+    def upload(self, video_path, description, tags, credentials, log_fn=print, progress_fn=None, publish_at=None):
+        client_secrets, token_file, body, mime_type = self._request_params(video_path, description, tags, credentials,
+                                                                           publish_at)
+
+        with metrics.span("auth"):
+            youtube = self.clients.get_service(client_secrets, token_file)
+
+        tracker = self.make_progress(video_path, progress_fn)
+        session_key = self.sessions.make_key(video_path, token_file)
+        saved = self.sessions.load(session_key)
+        sizer = ChunkSizer(initial=saved["chunksize"] if saved else self._last_chunksize)
+
+        with open_shared(video_path) as reader, metrics.span("transfer") as span, \
+                bandwidth.stream("youtube") as stream:
+            span.add_bytes(reader.size - (saved["offset"] if saved else 0))
+            media = AdaptiveMediaUpload(reader, sizer, mime_type, stream)
+            request = youtube.videos().insert(part="snippet,status", body=body, media_body=media)
+
+            response = None
+            if saved:
+                # Продолжаем прерванную сессию с подтверждённого сервером смещения
+                offset, response = self._resume_offset(request, saved["uri"], reader.size)
+                if offset is None:
+                    # Сессия на сервере истекла — начинаем загрузку заново
+                    self.sessions.drop(session_key)
+                else:
+                    request.resumable_uri = saved["uri"]
+                    request.resumable_progress = offset
+                    if log_fn:
+                        log_fn(f"YouTube: продолжаем загрузку {video_path} с {offset} байт")
+
+            if response is None:
+                response = self._upload_chunks(request, session_key, sizer, tracker)
+
+            tracker.finish()
+            self.sessions.drop(session_key)
+            self._last_chunksize = sizer.size
+            return response
+
+    def _resume_offset(self, request, uri, total):
+        """
+        Подтверждённое сервером смещение (PUT bytes */total) — как _query_offset
+        у upload_async, но через транспорт запроса googleapiclient.
+
+        Returns:
+            (offset, response): offset = None, если сессия истекла;
+            response — ответ с видео, если загрузка уже завершена
+        """
+        headers = {"Content-Range": f"bytes */{total}", "Content-Length": "0"}
+        resp, content = request.http.request(uri, "PUT", headers=headers)
+        if resp.status in (200, 201):
+            return total, request.postproc(resp, content)
+        if resp.status == 308:
+            received = resp.get("range")
+            return int(received.rsplit("-", 1)[1]) + 1 if received else 0, None
+        if resp.status in (404, 410):
+            return None, None
+        raise HttpError(resp, content, uri=uri)
+
+    def _upload_chunks(self, request, session_key, sizer, tracker):
+        """Цикл next_chunk с сохранением прогресса и повтором временных ошибок"""
+        failures = 0
         while True:
-            status, resp = request.next_chunk()
+            offset = request.resumable_progress
+            started = time.monotonic()
+            if request.resumable_uri is None:
+                # Первый next_chunk создаёт сессию — это и есть videos.insert
+                tracker.mark_billed()
+            try:
+                status, resp = request.next_chunk(num_retries=3)
+            except HttpError as e:
+                if e.resp.status not in RETRIABLE_STATUSES or failures >= MAX_CHUNK_RETRIES:
+                    raise
+                failures += 1
+                time.sleep(min(60, 2 ** failures) + random.random())
+                continue
+            except (OSError, ConnectionError):
+                if failures >= MAX_CHUNK_RETRIES:
+                    raise
+                failures += 1
+                time.sleep(min(60, 2 ** failures) + random.random())
+                continue
+
             if resp:
-                response = resp
-                break
-        
+                return resp
+
+            failures = 0
+            tracker.update(status.resumable_progress if status else request.resumable_progress)
+            sizer.update(request.resumable_progress - offset, time.monotonic() - started)
+            if request.resumable_uri:
+                self.sessions.save(session_key, request.resumable_uri,
+                                   request.resumable_progress, sizer.size)
+
+    def supports_async(self):
+        return aiohttp is not None and InstalledAppFlow is not None
+
+    async def upload_async(self, video_path, description, tags, credentials, log_fn=print, progress_fn=None,
+                           publish_at=None, http=None):
+        """
+        Resumable-загрузка через aiohttp без блокировки цикла событий.
+
+        Сессии хранятся в том же ResumableSessionStore, что и у upload(),
+        поэтому прерванную загрузку может продолжить любой из движков.
+        """
+        client_secrets, token_file, body, mime_type = self._request_params(video_path, description, tags, credentials,
+                                                                           publish_at)
+        loop = asyncio.get_running_loop()
+
+        async def token():
+            # Кэш обновляет токен заранее, поэтому обычно это просто чтение из памяти
+            creds = await loop.run_in_executor(None, functools.partial(
+                self.clients.get_credentials, client_secrets, token_file, interactive=False))
+            return creds.token
+
+        with metrics.span("auth"):
+            await token()
+
+        tracker = self.make_progress(video_path, progress_fn)
+        session_key = self.sessions.make_key(video_path, token_file)
+        saved = self.sessions.load(session_key)
+        sizer = ChunkSizer(initial=saved["chunksize"] if saved else self._last_chunksize)
+
+        with open_shared(video_path) as reader, metrics.span("transfer") as span, \
+                bandwidth.stream("youtube") as stream:
+            total = reader.size
+            uri, offset, response = None, 0, None
+            if saved:
+                offset, response = await self._query_offset(http, await token(), saved["uri"], total)
+                if offset is None:
+                    # Сессия на сервере истекла — начинаем загрузку заново
+                    self.sessions.drop(session_key)
+                    offset = 0
+                else:
+                    uri = saved["uri"]
+                    if log_fn:
+                        log_fn(f"YouTube: продолжаем загрузку {video_path} с {offset} байт")
+            span.add_bytes(total - offset)
+
+            if response is None:
+                if uri is None:
+                    tracker.mark_billed()
+                    uri = await self._start_session(http, await token(), body, total, mime_type)
+                response = await self._put_chunks(http, token, uri, reader, offset, mime_type,
+                                                  session_key, sizer, tracker, stream)
+
+        tracker.finish()
+        self.sessions.drop(session_key)
+        self._last_chunksize = sizer.size
         return response
-    
+
+    @staticmethod
+    async def _error(resp, action):
+        text = (await resp.text())[:500]
+        retry_after = resp.headers.get("Retry-After")
+        kind, retry_after = classify_status(resp.status, text, float(retry_after) if retry_after else None)
+        return UploadError(f"YouTube: {action}: HTTP {resp.status} {text}", kind, retry_after)
+
+    async def _start_session(self, http, token, body, total, mime_type):
+        headers = {
+            "Authorization": f"Bearer {token}",
+            "X-Upload-Content-Length": str(total),
+            "X-Upload-Content-Type": mime_type,
+        }
+        params = {"uploadType": "resumable", "part": "snippet,status"}
+        async with http.post(UPLOAD_URL, params=params, json=body, headers=headers) as resp:
+            if resp.status != 200 or "Location" not in resp.headers:
+                raise await self._error(resp, "создание сессии")
+            return resp.headers["Location"]
+
+    async def _query_offset(self, http, token, uri, total):
+        """
+        Подтверждённое сервером смещение (PUT bytes */total).
+
+        Returns:
+            (offset, response): offset = None, если сессия истекла;
+            response — ответ с видео, если загрузка уже завершена
+        """
+        headers = {"Authorization": f"Bearer {token}", "Content-Range": f"bytes */{total}"}
+        async with http.put(uri, headers=headers, data=b"") as resp:
+            if resp.status in (200, 201):
+                return total, await resp.json()
+            if resp.status == 308:
+                return self._next_offset(resp), None
+            if resp.status in (404, 410):
+                return None, None
+            raise await self._error(resp, "запрос смещения")
+
+    @staticmethod
+    def _next_offset(resp):
+        # Range: bytes=0-N — сервер принял байты по N включительно
+        received = resp.headers.get("Range")
+        return int(received.rsplit("-", 1)[1]) + 1 if received else 0
+
+    async def _put_chunks(self, http, token, uri, reader, offset, mime_type, session_key, sizer, tracker, stream):
+        """Отправка чанков с сохранением прогресса и повтором временных ошибок"""
+        loop = asyncio.get_running_loop()
+        total = reader.size
+        failures = 0
+        while True:
+            size = min(sizer.size, total - offset)
+            data = await loop.run_in_executor(None, self._read_chunk, reader, offset, size)
+            headers = {
+                "Authorization": f"Bearer {await token()}",
+                "Content-Type": mime_type,
+                "Content-Range": f"bytes {offset}-{offset + len(data) - 1}/{total}",
+            }
+            started = time.monotonic()
+            # Ожидание доли канала входит в замер: размер чанка подстраивается под выделенную скорость
+            await stream.consume_async(len(data))
+            try:
+                async with http.put(uri, data=data, headers=headers) as resp:
+                    if resp.status in (200, 201):
+                        return await resp.json()
+                    if resp.status == 308:
+                        new_offset = self._next_offset(resp)
+                    else:
+                        error = await self._error(resp, "отправка чанка")
+                        if resp.status not in RETRIABLE_STATUSES:
+                            raise error
+                        new_offset = None
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                error = UploadError(f"YouTube: обрыв соединения: {e}", TRANSIENT)
+                new_offset = None
+
+            if new_offset is None:
+                if failures >= MAX_CHUNK_RETRIES:
+                    raise error
+                failures += 1
+                await asyncio.sleep(min(60, 2 ** failures) + random.random())
+                # Часть чанка могла дойти — спрашиваем сервер, откуда продолжать
+                offset, response = await self._query_offset(http, await token(), uri, total)
+                if response is not None:
+                    return response
+                if offset is None:
+                    raise UploadError("YouTube: resumable-сессия истекла во время загрузки", TRANSIENT)
+                continue
+
+            failures = 0
+            sizer.update(new_offset - offset, time.monotonic() - started)
+            offset = new_offset
+            tracker.update(offset)
+            await loop.run_in_executor(None, self.sessions.save, session_key, uri, offset, sizer.size)
+
+    @staticmethod
+    def _read_chunk(reader, offset, size):
+        reader.seek(offset)
+        return reader.read(size)
+
+    def warm_up(self, credentials, log_fn=print, horizon=0, interactive=False):
+        client_secrets, token_file = self._oauth_files(credentials)
+        with metrics.span("auth"):
+            creds = self.clients.get_credentials(client_secrets, token_file,
+                                                 margin=horizon + TOKEN_REFRESH_MARGIN, interactive=interactive)
+        if creds.expiry is None:
+            return True, "токен действителен"
+        expiry = creds.expiry.replace(tzinfo=timezone.utc).astimezone()
+        return True, f"токен действителен до {expiry:%H:%M}"
+
+    def remote_ref(self, result):
+        video_id = result.get("id") if isinstance(result, dict) else None
+        return video_id, f"https://www.youtube.com/shorts/{video_id}" if video_id else None
+
     def validate_credentials(self, credentials):
         client_secrets = credentials.get("client_secrets_file")
         if not client_secrets or not os.path.exists(client_secrets):
             return False, "Client secrets file not found"
-        return True, "OK"
\ No newline at end of file
+        return True, "OK"